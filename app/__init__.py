@@ -1,7 +1,16 @@
 from flask import Flask
 from flask_login import LoginManager
 from config import config
-from app.models import db, User
+from app.models import db
+from app.cache import init_cache
+from app import counters  # noqa: F401  registers the dashboard counter listeners
+from app.analytics import deck_natures  # noqa: F401  registers the deck nature tag sync
+from app.sqlite_tuning import init_sqlite
+from app.instrumentation import init_instrumentation
+from app.jobs import init_jobs
+from app.assets import init_assets
+from app.analytics.rating_series import init_rating_series
+from app.user_cache import init_user_cache, load_user as load_cached_user
 
 login_manager = LoginManager()
 
@@ -12,12 +21,19 @@ def create_app(config_name='default'):
 
     # Initialize extensions
     db.init_app(app)
+    init_sqlite(app)
+    init_instrumentation(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
+    init_cache(app)
+    init_user_cache(app)
+    init_jobs(app)
+    init_assets(app)
+    init_rating_series(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
 
     # Register blueprints
     from app.auth import auth_bp
@@ -55,8 +71,10 @@ def create_app(config_name='default'):
         """Handle internal server error"""
         return render_template('errors/500.html'), 500
 
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # Schema is managed by `python migrate.py upgrade`; only development and
+    # testing create missing tables on boot
+    if app.config.get('SCHEMA_AUTO_CREATE'):
+        with app.app_context():
+            db.create_all()
 
     return app
@@ -1,47 +1,198 @@
 """
 Admin routes
 """
-from flask import render_template, redirect, url_for, flash
+import csv
+import io
+import json
+import os
+import uuid
+from flask import render_template, redirect, url_for, flash, request, jsonify, Response, current_app, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy import func, or_, select
 from app.admin import admin_bp
 from app.decorators import admin_required
-from app.models import db, User, Tournament, Player, Match
+from app.counters import get_counters, refresh_counters
+from app.instrumentation import request_log, summarize
+from app.jobs import enqueue
+from app.tournament.importer import READERS, detect_format
+from app.tournament.tasks import IMPORT_RESULTS
+from app.models import db, User, Job
+
+USERS_PER_PAGE = 50
+USER_ROLES = ('viewer', 'player', 'organizer', 'admin')
+USER_EXPORT_COLUMNS = ('id', 'username', 'email', 'role', 'created_at', 'last_login')
+EXPORT_CHUNK_SIZE = 1000
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+RECENT_IMPORTS = 10
 
 @admin_bp.route('/dashboard')
 @login_required
 @admin_required
 def dashboard():
     """Admin dashboard"""
-    # Get statistics
-    total_users = User.query.count()
-    total_tournaments = Tournament.query.count() if hasattr(db.Model, 'Tournament') else 0
-    total_players = Player.query.count() if hasattr(db.Model, 'Player') else 0
-    total_matches = Match.query.count() if hasattr(db.Model, 'Match') else 0
+    # Get statistics (counters row plus pending deltas)
+    counters = get_counters()
 
     # Get recent users
-    recent_users = User.query.order_by(User.created_at.desc()).limit(10).all() if hasattr(User, 'created_at') else []
+    recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
 
     return render_template('admin/dashboard.html',
-                          total_users=total_users,
-                          total_tournaments=total_tournaments,
-                          total_players=total_players,
-                          total_matches=total_matches,
-                          recent_users=recent_users)
+                          total_users=counters.users,
+                          total_tournaments=counters.tournaments,
+                          total_players=counters.players,
+                          total_matches=counters.matches,
+                          counters_refreshed_at=counters.refreshed_at,
+                          recent_users=recent_users,
+                          instrumentation_enabled=current_app.config.get('SQL_INSTRUMENTATION', False),
+                          endpoint_stats=summarize())
+
+@admin_bp.route('/counters/refresh', methods=['POST'])
+@login_required
+@admin_required
+def refresh_dashboard_counters():
+    """Recount dashboard statistics from the underlying tables"""
+    refresh_counters(db.session.connection())
+    db.session.commit()
+    flash('統計數據已重新計算', 'success')
+    return redirect(url_for('admin.dashboard'))
+
+@admin_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_results_upload():
+    """Upload a CSV/JSON Lines/XML file of historical results; the import runs as a background job"""
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('請選擇檔案', 'error')
+            return redirect(url_for('admin.import_results_upload'))
+        fmt = detect_format(upload.filename)
+        if fmt not in READERS:
+            flash(f'匯入失敗：不支援的檔案格式 {fmt}', 'error')
+            return redirect(url_for('admin.import_results_upload'))
+
+        # Workers read the file from IMPORT_UPLOAD_DIR, so it must be shared with them
+        directory = current_app.config.get('IMPORT_UPLOAD_DIR') or os.path.join(current_app.instance_path, 'imports')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{uuid.uuid4().hex}.{fmt}')
+        upload.save(path)
+        # Format errors will not go away on retry
+        job = enqueue(IMPORT_RESULTS, {'path': path, 'fmt': fmt, 'organizer_id': current_user.id,
+                                       'filename': upload.filename}, max_attempts=1)
+        db.session.commit()
+        flash(f'已排入匯入工作 #{job.id}，完成後會重新計算全部 ELO', 'success')
+        return redirect(url_for('admin.import_results_upload'))
+
+    jobs = Job.query.filter_by(name=IMPORT_RESULTS).order_by(Job.id.desc()).limit(RECENT_IMPORTS).all()
+    imports = [{**job.to_dict(), 'filename': json.loads(job.payload).get('filename')} for job in jobs]
+    return render_template('admin/import.html', imports=imports)
+
+@admin_bp.route('/instrumentation/export')
+@login_required
+@admin_required
+def export_instrumentation():
+    """Export recorded request profiles as JSON or CSV"""
+    records = request_log.records()
+    if request.args.get('format') == 'csv':
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['timestamp', 'endpoint', 'method', 'path', 'status', 'total_ms',
+                         'sql_count', 'sql_ms', 'render_ms', 'slowest_ms', 'slowest_statement'])
+        for r in records:
+            slowest = r['slowest'][0] if r['slowest'] else {'ms': '', 'statement': ''}
+            writer.writerow([r['timestamp'], r['endpoint'], r['method'], r['path'], r['status'],
+                             f"{r['total_ms']:.2f}", r['sql_count'], f"{r['sql_ms']:.2f}",
+                             f"{r['render_ms']:.2f}", slowest['ms'] and f"{slowest['ms']:.2f}",
+                             slowest['statement']])
+        return Response(output.getvalue(), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=request_profiles.csv'})
+    return jsonify({'endpoints': summarize(records), 'requests': records})
+
+def csv_safe(value):
+    """Quote a user-controlled text cell that a spreadsheet would run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def filtered_users(search, role):
+    """User query filtered by email/username substring and exact role"""
+    query = select(User)
+    if search:
+        pattern = f"%{search}%"
+        query = query.where(or_(User.email.ilike(pattern), User.username.ilike(pattern)))
+    if role in USER_ROLES:
+        query = query.where(User.role == role)
+    return query
 
 @admin_bp.route('/users')
 @login_required
 @admin_required
 def users():
-    """Manage users"""
-    all_users = User.query.all()
-    return render_template('admin/users.html', users=all_users)
+    """Manage users, with search and keyset pagination on id"""
+    search = request.args.get('q', '').strip()
+    role = request.args.get('role', 'all')
+    after = request.args.get('after', type=int)
+
+    query = filtered_users(search, role)
+    if after:
+        query = query.where(User.id > after)
+    page_users = db.session.scalars(query.order_by(User.id).limit(USERS_PER_PAGE + 1)).all()
+
+    next_after = None
+    if len(page_users) > USERS_PER_PAGE:
+        page_users = page_users[:USERS_PER_PAGE]
+        next_after = page_users[-1].id
+
+    # Unfiltered total comes from the counters row; filtered totals need a COUNT
+    if search or role in USER_ROLES:
+        total = db.session.scalar(select(func.count()).select_from(filtered_users(search, role).subquery()))
+    else:
+        total = get_counters().users
+
+    return render_template('admin/users.html',
+                          users=page_users,
+                          total=total,
+                          search=search,
+                          role_filter=role,
+                          roles=USER_ROLES,
+                          is_first_page=after is None,
+                          next_after=next_after)
+
+@admin_bp.route('/users/export.csv')
+@login_required
+@admin_required
+def export_users():
+    """Stream matching users as CSV; rows come from a server-side cursor in chunks"""
+    search = request.args.get('q', '').strip()
+    role = request.args.get('role', 'all')
+    stmt = (
+        filtered_users(search, role)
+        .with_only_columns(*(getattr(User, column) for column in USER_EXPORT_COLUMNS))
+        .order_by(User.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    def generate():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(USER_EXPORT_COLUMNS)
+        for chunk in db.session.execute(stmt).partitions():
+            writer.writerows([csv_safe(value) for value in row] for row in chunk)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+        yield output.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=users.csv'})
 
 @admin_bp.route('/user/<int:user_id>/promote/<role>')
 @login_required
 @admin_required
 def promote_user(user_id, role):
     """Promote user to a specific role"""
-    if role not in ['viewer', 'player', 'organizer', 'admin']:
+    if role not in USER_ROLES:
         flash('Invalid role', 'error')
         return redirect(url_for('admin.users'))
 
@@ -0,0 +1,62 @@
+"""
+Deck nature tags
+Deck.natures stays the comma-separated field that people edit; a
+before_flush listener mirrors it into deck_natures (one row per deck and
+tag, indexed by tag), so filtering decks by nature is an index lookup
+instead of loading every deck and splitting strings.
+"""
+from typing import List, Optional
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app.models import Deck, DeckNature
+
+NATURE_MAX_LENGTH = 50
+
+
+def parse_natures(value: Optional[str]) -> List[str]:
+    """Distinct, non-empty tags of a natures string, in order"""
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip()[:NATURE_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def rebuild_deck_natures(conn) -> int:
+    """Rewrite deck_natures from decks.natures (caller commits); returns the tag rows written"""
+    table = DeckNature.__table__
+    conn.execute(table.delete())
+    rows = [
+        {'deck_id': deck_id, 'name': name}
+        for deck_id, natures in conn.execute(select(Deck.id, Deck.natures).where(Deck.natures.isnot(None)))
+        for name in parse_natures(natures)
+    ]
+    if rows:
+        conn.execute(table.insert(), rows)
+    return len(rows)
+
+
+def filter_by_nature(query, nature: Optional[str]):
+    """Restrict a query over Deck to decks tagged with a nature (no-op when empty)"""
+    if not nature:
+        return query
+    return query.join(DeckNature, (DeckNature.deck_id == Deck.id) & (DeckNature.name == nature))
+
+
+def nature_names(session) -> List[str]:
+    """Every tag in use, read from the tag index"""
+    return list(session.execute(select(DeckNature.name).distinct().order_by(DeckNature.name)).scalars())
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_deck_natures(session, flush_context, instances):
+    for deck in list(session.new) + list(session.dirty):
+        if not isinstance(deck, Deck):
+            continue
+        if deck not in session.new and not inspect(deck).attrs.natures.history.has_changes():
+            continue
+        wanted = parse_natures(deck.natures)
+        current = {tag.name: tag for tag in deck.nature_tags}
+        if list(current) != wanted:
+            deck.nature_tags = [current.get(name) or DeckNature(name=name) for name in wanted]
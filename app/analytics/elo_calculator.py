@@ -2,10 +2,18 @@
 PTCG ELO Rating Calculator
 Ported from PTCG_Stat/elo_calculator.py - DO NOT MODIFY ORIGINAL
 """
+from bisect import bisect_right
 from collections import defaultdict
 from datetime import datetime
-from typing import Dict, Tuple, List
-from app.models import db, Player, Match, Tournament, TournamentPlayer, ELOHistory, Deck
+from typing import Dict, Iterable, Tuple, List, Optional
+from app.models import (db, Player, Match, Tournament, TournamentPlayer, ELOHistory, ELOHistorySummary,
+                        ELOHistoryArchive, Deck)
+from sqlalchemy import bindparam, func, select
+from app.analytics import head_to_head
+from app.analytics.export import record_deletions
+from app.analytics.rating_as_of import record_checkpoints
+from app.analytics.head_to_head import apply_tally, tally_results
+from app.analytics.rating_series import append_on_commit, get_rating_series, rating_series_cache
 
 # ELO Parameters
 STARTING_ELO = 1500.0
@@ -14,6 +22,7 @@ K_FACTOR_ESTABLISHED = 24  # 15-29 games
 K_FACTOR_VETERAN = 16  # 30+ games
 DOUBLE_LOSS_PENALTY = 8
 DECK_K_FACTOR = 24  # Fixed K-factor for decks
+REPLAY_BATCH_SIZE = 5000  # elo_history rows per INSERT during a full replay
 
 
 def get_k_factor(games_played: int) -> int:
@@ -31,6 +40,19 @@ def expected_score(rating_a: float, rating_b: float) -> float:
     return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
 
 
+def deck_match_change(deck1_elo: float, deck2_elo: float, result: str) -> Optional[float]:
+    """ELO change for deck 1 (deck 2 gets the negation); None if the result does not rate decks"""
+    if result == 'player1':
+        deck1_actual = 1.0
+    elif result == 'player2':
+        deck1_actual = 0.0
+    elif result == 'draw':
+        deck1_actual = 0.5
+    else:
+        return None
+    return DECK_K_FACTOR * (deck1_actual - expected_score(deck1_elo, deck2_elo))
+
+
 class ELOCalculator:
     """Calculate and update ELO ratings for players and decks"""
 
@@ -56,54 +78,61 @@ class ELOCalculator:
         player2 = tp2.player
 
         # Initialize ratings if needed
-        if player1.id not in self.player_ratings:
-            self.player_ratings[player1.id] = player1.elo
-            self.player_games[player1.id] = player1.games_played
-            self.player_wins[player1.id] = player1.wins
-            self.player_losses[player1.id] = player1.losses
-            self.player_peak_elo[player1.id] = player1.peak_elo
-
-        if player2.id not in self.player_ratings:
-            self.player_ratings[player2.id] = player2.elo
-            self.player_games[player2.id] = player2.games_played
-            self.player_wins[player2.id] = player2.wins
-            self.player_losses[player2.id] = player2.losses
-            self.player_peak_elo[player2.id] = player2.peak_elo
-
+        for player in (player1, player2):
+            if player.id not in self.player_ratings:
+                self.seed_player(player.id, player.elo, player.games_played,
+                                 player.wins, player.losses, player.peak_elo)
+
+        return self.apply_result(player1.id, player2.id, match.result)
+
+    def seed_player(self, player_id: int, elo: float = STARTING_ELO, games: int = 0,
+                    wins: int = 0, losses: int = 0, peak_elo: float = STARTING_ELO):
+        """Set a player's starting state before their first match in this run"""
+        self.player_ratings[player_id] = elo
+        self.player_games[player_id] = games
+        self.player_wins[player_id] = wins
+        self.player_losses[player_id] = losses
+        self.player_peak_elo[player_id] = peak_elo
+
+    def apply_result(self, player1_id: int, player2_id: int, result: str) -> Tuple[float, float]:
+        """
+        Apply one result between two seeded players.
+        Returns: (p1_elo_change, p2_elo_change)
+        """
         # Get current ratings
-        p1_elo_before = self.player_ratings[player1.id]
-        p2_elo_before = self.player_ratings[player2.id]
+        p1_elo_before = self.player_ratings[player1_id]
+        p2_elo_before = self.player_ratings[player2_id]
 
         # Handle double loss
-        if match.result == 'double_loss':
-            self.player_ratings[player1.id] -= DOUBLE_LOSS_PENALTY
-            self.player_ratings[player2.id] -= DOUBLE_LOSS_PENALTY
-            self.player_games[player1.id] += 1
-            self.player_games[player2.id] += 1
-            self.player_losses[player1.id] += 1
-            self.player_losses[player2.id] += 1
+        if result == 'double_loss':
+            self.player_ratings[player1_id] -= DOUBLE_LOSS_PENALTY
+            self.player_ratings[player2_id] -= DOUBLE_LOSS_PENALTY
+            self.player_games[player1_id] += 1
+            self.player_games[player2_id] += 1
+            self.player_losses[player1_id] += 1
+            self.player_losses[player2_id] += 1
             return -DOUBLE_LOSS_PENALTY, -DOUBLE_LOSS_PENALTY
 
         # Normal match
-        p1_k = get_k_factor(self.player_games[player1.id])
-        p2_k = get_k_factor(self.player_games[player2.id])
+        p1_k = get_k_factor(self.player_games[player1_id])
+        p2_k = get_k_factor(self.player_games[player2_id])
 
         # Calculate expected scores
         p1_expected = expected_score(p1_elo_before, p2_elo_before)
         p2_expected = 1 - p1_expected
 
         # Determine actual scores
-        if match.result == 'player1':
+        if result == 'player1':
             p1_actual = 1.0
             p2_actual = 0.0
-            self.player_wins[player1.id] += 1
-            self.player_losses[player2.id] += 1
-        elif match.result == 'player2':
+            self.player_wins[player1_id] += 1
+            self.player_losses[player2_id] += 1
+        elif result == 'player2':
             p1_actual = 0.0
             p2_actual = 1.0
-            self.player_wins[player2.id] += 1
-            self.player_losses[player1.id] += 1
-        elif match.result == 'draw':
+            self.player_wins[player2_id] += 1
+            self.player_losses[player1_id] += 1
+        elif result == 'draw':
             p1_actual = 0.5
             p2_actual = 0.5
         else:
@@ -114,20 +143,20 @@ class ELOCalculator:
         p2_change = p2_k * (p2_actual - p2_expected)
 
         # Update ratings
-        self.player_ratings[player1.id] += p1_change
-        self.player_ratings[player2.id] += p2_change
+        self.player_ratings[player1_id] += p1_change
+        self.player_ratings[player2_id] += p2_change
 
         # Update peak ELO
-        self.player_peak_elo[player1.id] = max(self.player_peak_elo[player1.id], self.player_ratings[player1.id])
-        self.player_peak_elo[player2.id] = max(self.player_peak_elo[player2.id], self.player_ratings[player2.id])
+        self.player_peak_elo[player1_id] = max(self.player_peak_elo[player1_id], self.player_ratings[player1_id])
+        self.player_peak_elo[player2_id] = max(self.player_peak_elo[player2_id], self.player_ratings[player2_id])
 
         # Increment game counts
-        self.player_games[player1.id] += 1
-        self.player_games[player2.id] += 1
+        self.player_games[player1_id] += 1
+        self.player_games[player2_id] += 1
 
         return p1_change, p2_change
 
-    def update_tournament_elo(self, tournament: Tournament):
+    def update_tournament_elo(self, tournament: Tournament, commit: bool = True):
         """
         Calculate and update ELO for all players in a completed tournament.
         Creates ELOHistory records for tracking.
@@ -145,6 +174,8 @@ class ELOCalculator:
         self.player_peak_elo = {}
 
         # Calculate ELO changes for each match
+        head_to_head_results = []
+        series = []  # (history, opponent elo before, score) for the rating series cache
         for match in matches:
             if match.result == 'bye':
                 continue
@@ -188,6 +219,14 @@ class ELOCalculator:
             )
             db.session.add(history1)
             db.session.add(history2)
+            p1_score = {'player1': 1.0, 'draw': 0.5}.get(match.result, 0.0)
+            p2_score = {'player2': 1.0, 'draw': 0.5}.get(match.result, 0.0)
+            series.append((history1, p2_elo_before, p1_score))
+            series.append((history2, p1_elo_before, p2_score))
+
+            head_to_head_results.append(
+                (player1.id, player2.id, match.result, match.completed_at or match.created_at)
+            )
 
         # Update final player ratings in database
         for player_id, final_elo in self.player_ratings.items():
@@ -199,9 +238,22 @@ class ELOCalculator:
                 player.wins = self.player_wins[player_id]
                 player.losses = self.player_losses[player_id]
 
-        db.session.commit()
+        # Fold this tournament into the lifetime head-to-head records
+        apply_tally(tally_results(head_to_head_results))
 
-    def calculate_deck_elo(self, tournament: Tournament):
+        # Extend cached rating series once the new history rows commit
+        db.session.flush()
+        record_checkpoints(db.session.connection(), [tournament.id])
+        series_rows = defaultdict(list)
+        for history, opponent_elo, score in series:
+            series_rows[history.player_id].append((history.id, history.timestamp, history.elo_before,
+                                                   history.elo_after, opponent_elo, score))
+        append_on_commit(db.session, series_rows)
+
+        if commit:
+            db.session.commit()
+
+    def calculate_deck_elo(self, tournament: Tournament, commit: bool = True):
         """
         Calculate and update ELO for decks used in a tournament.
         """
@@ -240,27 +292,15 @@ class ELOCalculator:
                 deck_games[deck2.id] = deck2.games_played
                 deck_wins[deck2.id] = deck2.wins
 
-            # Get current ratings
-            deck1_elo = deck_ratings[deck1.id]
-            deck2_elo = deck_ratings[deck2.id]
-
-            # Calculate expected score
-            deck1_expected = expected_score(deck1_elo, deck2_elo)
-
-            # Determine actual score
+            deck1_change = deck_match_change(deck_ratings[deck1.id], deck_ratings[deck2.id], match.result)
+            if deck1_change is None:
+                continue
             if match.result == 'player1':
-                deck1_actual = 1.0
                 deck_wins[deck1.id] += 1
             elif match.result == 'player2':
-                deck1_actual = 0.0
                 deck_wins[deck2.id] += 1
-            elif match.result == 'draw':
-                deck1_actual = 0.5
-            else:
-                continue
 
             # Update deck ratings
-            deck1_change = DECK_K_FACTOR * (deck1_actual - deck1_expected)
             deck_ratings[deck1.id] += deck1_change
             deck_ratings[deck2.id] -= deck1_change
 
@@ -275,23 +315,144 @@ class ELOCalculator:
                 deck.games_played = deck_games[deck_id]
                 deck.wins = deck_wins[deck_id]
 
-        db.session.commit()
-
-
-def calculate_radar_attributes(player: Player) -> Dict[str, float]:
+        if commit:
+            db.session.commit()
+
+
+def replay_query():
+    """Rated results of every completed tournament, oldest tournament first"""
+    tp1 = TournamentPlayer.__table__.alias('tp1')
+    tp2 = TournamentPlayer.__table__.alias('tp2')
+    matches = Match.__table__
+    tournaments = Tournament.__table__
+    return (
+        select(matches.c.id, matches.c.tournament_id, matches.c.result,
+               tp1.c.player_id, tp2.c.player_id, tp1.c.deck_id, tp2.c.deck_id,
+               func.coalesce(matches.c.completed_at, matches.c.created_at))
+        .select_from(
+            matches
+            .join(tp1, matches.c.player1_id == tp1.c.id)
+            .join(tp2, matches.c.player2_id == tp2.c.id)
+            .join(tournaments, matches.c.tournament_id == tournaments.c.id)
+        )
+        .where(tournaments.c.status == 'completed',
+               matches.c.result.isnot(None), matches.c.result != 'bye')
+        .order_by(tournaments.c.date, tournaments.c.id, matches.c.round_number, matches.c.id)
+    )
+
+
+def replay_all_elo(conn) -> Dict[str, int]:
+    """
+    Recompute every player and deck rating from scratch by replaying all
+    completed tournaments in date order. Rewrites elo_history (stamped with
+    the match time) and head_to_head, and clears compacted history, which
+    the next compaction run rebuilds; exports get a tombstone for the old
+    rows. Marks every completed tournament rated. Used after bulk imports,
+    where tournaments may predate ones already rated. Caller commits.
+    """
+    calculator = ELOCalculator()
+    deck_ratings, deck_games, deck_wins = {}, {}, {}
+    history_table = ELOHistory.__table__
+    history = []
+    match_count = 0
+
+    # Replayed rows are new rows to exports; tombstone everything written before them
+    record_deletions(conn, 'elo_history')
+    record_deletions(conn, 'elo_history_summary')
+    conn.execute(history_table.delete())
+    conn.execute(ELOHistorySummary.__table__.delete())
+    conn.execute(ELOHistoryArchive.__table__.delete())
+    rating_series_cache.clear()
+    for match_id, tournament_id, result, p1_id, p2_id, d1_id, d2_id, played_at in conn.execute(replay_query()):
+        match_count += 1
+        for player_id in (p1_id, p2_id):
+            if player_id not in calculator.player_ratings:
+                calculator.seed_player(player_id)
+        p1_before = calculator.player_ratings[p1_id]
+        p2_before = calculator.player_ratings[p2_id]
+        p1_change, p2_change = calculator.apply_result(p1_id, p2_id, result)
+        for player_id, before, change in ((p1_id, p1_before, p1_change), (p2_id, p2_before, p2_change)):
+            history.append({
+                'player_id': player_id, 'match_id': match_id, 'tournament_id': tournament_id,
+                'elo_before': before, 'elo_after': calculator.player_ratings[player_id],
+                'elo_change': change, 'timestamp': played_at
+            })
+        if len(history) >= REPLAY_BATCH_SIZE:
+            conn.execute(history_table.insert(), history)
+            history = []
+
+        # Deck ratings follow calculate_deck_elo: double losses are not rated
+        if not d1_id or not d2_id or result == 'double_loss':
+            continue
+        for deck_id in (d1_id, d2_id):
+            if deck_id not in deck_ratings:
+                deck_ratings[deck_id], deck_games[deck_id], deck_wins[deck_id] = STARTING_ELO, 0, 0
+        deck1_change = deck_match_change(deck_ratings[d1_id], deck_ratings[d2_id], result)
+        if deck1_change is None:
+            continue
+        if result == 'player1':
+            deck_wins[d1_id] += 1
+        elif result == 'player2':
+            deck_wins[d2_id] += 1
+        deck_ratings[d1_id] += deck1_change
+        deck_ratings[d2_id] -= deck1_change
+        deck_games[d1_id] += 1
+        deck_games[d2_id] += 1
+    if history:
+        conn.execute(history_table.insert(), history)
+
+    # Reset everyone, then write the replayed totals for rated players/decks
+    players = Player.__table__
+    conn.execute(players.update().values(elo=STARTING_ELO, peak_elo=STARTING_ELO,
+                                         games_played=0, wins=0, losses=0))
+    if calculator.player_ratings:
+        conn.execute(
+            players.update().where(players.c.id == bindparam('b_id')).values(
+                elo=bindparam('b_elo'), peak_elo=bindparam('b_peak'), games_played=bindparam('b_games'),
+                wins=bindparam('b_wins'), losses=bindparam('b_losses')),
+            [{'b_id': player_id, 'b_elo': elo, 'b_peak': calculator.player_peak_elo[player_id],
+              'b_games': calculator.player_games[player_id], 'b_wins': calculator.player_wins[player_id],
+              'b_losses': calculator.player_losses[player_id]}
+             for player_id, elo in calculator.player_ratings.items()]
+        )
+
+    tournaments = Tournament.__table__
+    conn.execute(tournaments.update()
+                 .where(tournaments.c.status == 'completed', tournaments.c.rated_at.is_(None))
+                 .values(rated_at=datetime.utcnow()))
+
+    decks = Deck.__table__
+    conn.execute(decks.update().values(elo=STARTING_ELO, games_played=0, wins=0))
+    if deck_ratings:
+        conn.execute(
+            decks.update().where(decks.c.id == bindparam('b_id')).values(
+                elo=bindparam('b_elo'), games_played=bindparam('b_games'), wins=bindparam('b_wins')),
+            [{'b_id': deck_id, 'b_elo': elo, 'b_games': deck_games[deck_id], 'b_wins': deck_wins[deck_id]}
+             for deck_id, elo in deck_ratings.items()]
+        )
+
+    record_checkpoints(conn)
+    head_to_head.rebuild(conn)
+    return {'matches': match_count, 'players': len(calculator.player_ratings), 'decks': len(deck_ratings)}
+
+
+def calculate_radar_attributes(player: Player, elo_values: Optional[List[float]] = None,
+                               with_clutch: bool = True) -> Dict[str, float]:
     """
     Calculate 5 radar chart attributes for a player (0-100 scale).
     Based on PTCG_Stat RadarChart.gs logic.
+    elo_values: sorted ratings of all rated players, when scoring many at once.
+    Without with_clutch the stored clutch is kept and the rating series is not read.
     """
     import math
 
-    # Get all players for percentile calculations
-    all_players = Player.query.filter(Player.games_played > 0).all()
+    # Ratings of all players for percentile calculations
+    if elo_values is None:
+        elo_values = sorted(p.elo for p in Player.query.filter(Player.games_played > 0))
 
     # 1. Skill (ELO percentile)
-    if all_players:
-        elo_values = sorted([p.elo for p in all_players])
-        percentile_rank = sum(1 for elo in elo_values if elo <= player.elo) / len(elo_values)
+    if elo_values:
+        percentile_rank = bisect_right(elo_values, player.elo) / len(elo_values)
         skill = percentile_rank * 100
     else:
         skill = 50.0
@@ -306,14 +467,12 @@ def calculate_radar_attributes(player: Player) -> Dict[str, float]:
     else:
         experience = 0.0
 
-    # 4. Clutch (Win rate vs higher-rated opponents)
-    # Get matches where opponent had higher ELO
-    clutch_wins = 0
-    clutch_games = 0
-
-    # This requires match history - simplified for now
-    # In full implementation, would query ELOHistory
-    clutch = 50.0  # Placeholder
+    # 4. Clutch (Win rate vs higher-rated opponents, 50 without such matches)
+    if with_clutch:
+        clutch_rate = get_rating_series(player.id).clutch()
+        clutch = clutch_rate * 100 if clutch_rate is not None else 50.0
+    else:
+        clutch = player.clutch if player.clutch is not None else 50.0
 
     # 5. Top Cut (Tournament top 4 finish rate × 100)
     # Would require tournament placement tracking
@@ -328,16 +487,24 @@ def calculate_radar_attributes(player: Player) -> Dict[str, float]:
     }
 
 
-def update_all_radar_attributes():
-    """Update radar attributes for all players"""
+def update_all_radar_attributes(commit: bool = True, player_ids: Optional[Iterable[int]] = None):
+    """
+    Update radar attributes for all players. Clutch only changes with a
+    player's own matches, so with player_ids (e.g. a tournament's field)
+    only those players' rating series are read.
+    """
     players = Player.query.filter(Player.games_played > 0).all()
+    elo_values = sorted(p.elo for p in players)
+    clutch_ids = set(player_ids) if player_ids is not None else None
 
     for player in players:
-        attributes = calculate_radar_attributes(player)
+        attributes = calculate_radar_attributes(player, elo_values,
+                                                with_clutch=clutch_ids is None or player.id in clutch_ids)
         player.skill = attributes['skill']
         player.consistency = attributes['consistency']
         player.experience = attributes['experience']
         player.clutch = attributes['clutch']
         player.top_cut = attributes['top_cut']
 
-    db.session.commit()
+    if commit:
+        db.session.commit()
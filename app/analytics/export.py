@@ -0,0 +1,194 @@
+"""
+Bulk data export
+Streams raw tables for offline analysis as NDJSON or CSV, and as Parquet
+from the CLI when pyarrow is installed. Rows are fetched with yield_per,
+which uses a server-side cursor on PostgreSQL, so memory stays flat however
+large the table is.
+
+Every dataset filters on updated_at, the time the row was last written
+(not the match or tournament time, which imports and replays backdate),
+so nightly syncs can pull only the rows in (since, until]. Rows removed by
+replays and compaction are listed in the deletions dataset; a tombstone
+without row_id means every row of its dataset written before deleted_at
+is gone. Apply deletions before the other datasets of the same window.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from sqlalchemy import literal, select
+from app.models import Deck, ELOHistory, ELOHistorySummary, ExportTombstone, Match, TournamentPlayer
+
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = ('ndjson', 'csv')
+
+# Rows are stamped when written but become visible at commit; the upper
+# bound trails the clock so a transaction still open at export time (an
+# import or a replay) does not commit rows behind the cursor
+EXPORT_SETTLE = timedelta(minutes=5)
+
+
+class Dataset(NamedTuple):
+    columns: List
+    changed_at: object  # column used for since/until filters
+
+
+DATASETS: Dict[str, Dataset] = {
+    'matches': Dataset(
+        columns=[Match.id, Match.tournament_id, Match.round_number, Match.player1_id, Match.player2_id,
+                 Match.result, Match.p1_game_wins, Match.p2_game_wins, Match.created_at, Match.completed_at,
+                 Match.updated_at],
+        changed_at=Match.updated_at,
+    ),
+    'elo_history': Dataset(
+        columns=[ELOHistory.id, ELOHistory.player_id, ELOHistory.match_id, ELOHistory.tournament_id,
+                 ELOHistory.elo_before, ELOHistory.elo_after, ELOHistory.elo_change, ELOHistory.timestamp,
+                 ELOHistory.updated_at],
+        changed_at=ELOHistory.updated_at,
+    ),
+    'elo_history_summary': Dataset(
+        columns=[ELOHistorySummary.id, ELOHistorySummary.player_id, ELOHistorySummary.tournament_id,
+                 ELOHistorySummary.elo_before, ELOHistorySummary.elo_after, ELOHistorySummary.elo_change,
+                 ELOHistorySummary.matches_played, ELOHistorySummary.first_timestamp, ELOHistorySummary.timestamp,
+                 ELOHistorySummary.last_history_id, ELOHistorySummary.updated_at],
+        changed_at=ELOHistorySummary.updated_at,
+    ),
+    'tournament_players': Dataset(
+        columns=[TournamentPlayer.id, TournamentPlayer.tournament_id, TournamentPlayer.player_id,
+                 TournamentPlayer.deck_id, TournamentPlayer.points, TournamentPlayer.wins,
+                 TournamentPlayer.losses, TournamentPlayer.ties, TournamentPlayer.byes,
+                 TournamentPlayer.game_wins, TournamentPlayer.game_losses, TournamentPlayer.dropped,
+                 TournamentPlayer.dropped_round, TournamentPlayer.updated_at],
+        changed_at=TournamentPlayer.updated_at,
+    ),
+    'decks': Dataset(
+        columns=[Deck.id, Deck.name, Deck.parent_id, Deck.natures, Deck.elo, Deck.games_played,
+                 Deck.wins, Deck.created_at, Deck.updated_at],
+        changed_at=Deck.updated_at,
+    ),
+    'deletions': Dataset(
+        columns=[ExportTombstone.id, ExportTombstone.dataset, ExportTombstone.row_id, ExportTombstone.deleted_at],
+        changed_at=ExportTombstone.deleted_at,
+    ),
+}
+
+
+def record_deletions(conn, dataset: str, row_ids=None):
+    """
+    Tombstone rows before deleting them: row_ids is a SELECT of their ids,
+    or None when the whole dataset is being rewritten
+    """
+    table = ExportTombstone.__table__
+    now = datetime.utcnow()
+    if row_ids is None:
+        conn.execute(table.insert().values(dataset=dataset, row_id=None, deleted_at=now))
+        return
+    row_ids = row_ids.subquery()
+    conn.execute(table.insert().from_select(
+        ['dataset', 'row_id', 'deleted_at'],
+        select(literal(dataset), *row_ids.c, literal(now, table.c.deleted_at.type))
+    ))
+
+
+def export_until() -> datetime:
+    """Upper bound for an export started now; the next pull passes it as since"""
+    return datetime.utcnow() - EXPORT_SETTLE
+
+
+def column_names(dataset: str) -> List[str]:
+    return [column.key for column in DATASETS[dataset].columns]
+
+
+def export_query(dataset: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """SELECT for a dataset, optionally limited to rows changed in (since, until]"""
+    spec = DATASETS[dataset]
+    stmt = select(*spec.columns)
+    if since is not None:
+        stmt = stmt.where(spec.changed_at > since)
+    if until is not None:
+        stmt = stmt.where(spec.changed_at <= until)
+    return stmt.order_by(spec.columns[0]).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+
+def iter_chunks(session, dataset: str, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> Iterator[list]:
+    """Lists of row tuples, EXPORT_CHUNK_SIZE at a time"""
+    yield from session.execute(export_query(dataset, since, until)).partitions()
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def stream_ndjson(session, dataset: str, since=None, until=None) -> Iterator[str]:
+    names = column_names(dataset)
+    for chunk in iter_chunks(session, dataset, since, until):
+        yield ''.join(
+            json.dumps(dict(zip(names, map(_json_value, row))), ensure_ascii=False) + '\n'
+            for row in chunk
+        )
+
+
+def stream_csv(session, dataset: str, since=None, until=None) -> Iterator[str]:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(column_names(dataset))
+    for chunk in iter_chunks(session, dataset, since, until):
+        writer.writerows(chunk)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+    yield output.getvalue()
+
+
+STREAMERS = {
+    'ndjson': stream_ndjson,
+    'csv': stream_csv,
+}
+
+
+def parquet_schema(dataset: str):
+    """Arrow schema from the SQLAlchemy column types"""
+    import pyarrow as pa
+
+    arrow_types = {
+        'Integer': pa.int64(),
+        'Float': pa.float64(),
+        'String': pa.string(),
+        'Text': pa.string(),
+        'Boolean': pa.bool_(),
+        'Date': pa.date32(),
+        'DateTime': pa.timestamp('us'),
+    }
+    return pa.schema([
+        (column.key, arrow_types.get(type(column.type).__name__, pa.string()))
+        for column in DATASETS[dataset].columns
+    ])
+
+
+def write_parquet(session, dataset: str, path: str, since=None, until=None) -> int:
+    """Write a dataset to a Parquet file, one row group per chunk. Requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(dataset)
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in iter_chunks(session, dataset, since, until):
+            columns = zip(*chunk)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(list(values), type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            rows += len(chunk)
+    return rows
+
+
+def parse_since(value: Optional[str]) -> Optional[datetime]:
+    """ISO date or datetime; None when empty. Raises ValueError when malformed."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
@@ -0,0 +1,124 @@
+"""
+Head-to-head records
+Maintains the head_to_head aggregate so any pair of players can be
+answered with a single primary-key lookup instead of joining matches to
+tournament_players twice over all history.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import func, or_, select, tuple_
+from app.models import db, Player, Match, Tournament, TournamentPlayer, HeadToHead
+
+COUNTER_FIELDS = ('low_wins', 'high_wins', 'draws', 'double_losses', 'matches_played')
+
+
+def empty_counts() -> dict:
+    counts = dict.fromkeys(COUNTER_FIELDS, 0)
+    counts['last_played_at'] = None
+    return counts
+
+
+def tally_results(results: Iterable[Tuple[int, int, str, Optional[datetime]]]) -> Dict[Tuple[int, int], dict]:
+    """
+    Aggregate (player1_id, player2_id, result, played_at) tuples into
+    per-pair counter deltas. Byes and unreported results are ignored.
+    """
+    tally = defaultdict(empty_counts)
+    for player1_id, player2_id, result, played_at in results:
+        if player2_id is None or player1_id == player2_id:
+            continue
+        if result not in ('player1', 'player2', 'draw', 'double_loss'):
+            continue
+
+        key = HeadToHead.pair_key(player1_id, player2_id)
+        counts = tally[key]
+        counts['matches_played'] += 1
+        if result == 'draw':
+            counts['draws'] += 1
+        elif result == 'double_loss':
+            counts['double_losses'] += 1
+        else:
+            winner_id = player1_id if result == 'player1' else player2_id
+            counts['low_wins' if winner_id == key[0] else 'high_wins'] += 1
+
+        if played_at and (counts['last_played_at'] is None or played_at > counts['last_played_at']):
+            counts['last_played_at'] = played_at
+    return tally
+
+
+def apply_tally(tally: Dict[Tuple[int, int], dict]):
+    """Add counter deltas to head_to_head rows in the current session (caller commits)"""
+    if not tally:
+        return
+    existing = {
+        (row.player_low_id, row.player_high_id): row
+        for row in HeadToHead.query.filter(
+            tuple_(HeadToHead.player_low_id, HeadToHead.player_high_id).in_(list(tally))
+        ).all()
+    }
+    for key, counts in tally.items():
+        row = existing.get(key)
+        if row is None:
+            row = HeadToHead(player_low_id=key[0], player_high_id=key[1],
+                             **dict.fromkeys(COUNTER_FIELDS, 0))
+            db.session.add(row)
+        for field in COUNTER_FIELDS:
+            setattr(row, field, getattr(row, field) + counts[field])
+        if counts['last_played_at'] and (row.last_played_at is None or counts['last_played_at'] > row.last_played_at):
+            row.last_played_at = counts['last_played_at']
+
+
+def completed_results_query():
+    """(player1_id, player2_id, result, played_at) for every match in a completed tournament"""
+    tp1 = TournamentPlayer.__table__.alias('tp1')
+    tp2 = TournamentPlayer.__table__.alias('tp2')
+    matches = Match.__table__
+    tournaments = Tournament.__table__
+    return (
+        select(tp1.c.player_id, tp2.c.player_id, matches.c.result,
+               func.coalesce(matches.c.completed_at, matches.c.created_at))
+        .select_from(
+            matches
+            .join(tp1, matches.c.player1_id == tp1.c.id)
+            .join(tp2, matches.c.player2_id == tp2.c.id)
+            .join(tournaments, matches.c.tournament_id == tournaments.c.id)
+        )
+        .where(tournaments.c.status == 'completed', matches.c.result.isnot(None))
+    )
+
+
+def rebuild(conn):
+    """Recompute the whole table from match history (used by the backfill migration)"""
+    tally = tally_results(conn.execute(completed_results_query()))
+    conn.execute(HeadToHead.__table__.delete())
+    if tally:
+        conn.execute(HeadToHead.__table__.insert(), [
+            {'player_low_id': low, 'player_high_id': high, **counts}
+            for (low, high), counts in tally.items()
+        ])
+
+
+def get_record(player_id: int, opponent_id: int) -> dict:
+    """Head-to-head record from player_id's point of view (one primary-key lookup)"""
+    key = HeadToHead.pair_key(player_id, opponent_id)
+    row = db.session.get(HeadToHead, key)
+    if row is None:
+        row = HeadToHead(player_low_id=key[0], player_high_id=key[1], **dict.fromkeys(COUNTER_FIELDS, 0))
+    return row.record_for(player_id)
+
+
+def top_opponents(player_id: int, limit: int = 5) -> List[Tuple[Player, dict]]:
+    """Most frequently played opponents with the player's record against each"""
+    rows = (
+        HeadToHead.query
+        .filter(or_(HeadToHead.player_low_id == player_id, HeadToHead.player_high_id == player_id))
+        .order_by(HeadToHead.matches_played.desc())
+        .limit(limit)
+        .all()
+    )
+    records = [row.record_for(player_id) for row in rows]
+    opponents = {
+        p.id: p for p in Player.query.filter(Player.id.in_([r['opponent_id'] for r in records])).all()
+    } if records else {}
+    return [(opponents[r['opponent_id']], r) for r in records if r['opponent_id'] in opponents]
@@ -0,0 +1,102 @@
+"""
+ELO history compaction
+Keeps elo_history small by rolling whole tournaments older than a horizon
+into one elo_history_summary row per player, and moving their raw rows
+to elo_history_archive. Summary rows carry elo_after and a timestamp
+just like raw rows, so rating_events() gives as-of lookups one combined
+timeline. Replays rebuild from matches and are unaffected.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import func, select, union_all
+from app.analytics.export import record_deletions
+from app.analytics.rating_as_of import record_checkpoints
+from app.models import ELOHistory, ELOHistorySummary, ELOHistoryArchive
+
+COMPACT_BATCH_TOURNAMENTS = 200
+
+
+def compactable_tournaments(conn, cutoff: datetime) -> List[int]:
+    """Tournaments whose every hot history row is older than the cutoff"""
+    return list(conn.execute(
+        select(ELOHistory.tournament_id)
+        .where(ELOHistory.tournament_id.isnot(None))
+        .group_by(ELOHistory.tournament_id)
+        .having(func.max(ELOHistory.timestamp) < cutoff)
+        .order_by(ELOHistory.tournament_id)
+    ).scalars())
+
+
+def summarize_rows(rows) -> List[dict]:
+    """
+    Fold (id, player_id, tournament_id, elo_before, elo_after, elo_change, timestamp)
+    rows, sorted by player, tournament, time and id, into one summary per player and tournament
+    """
+    summaries: Dict[tuple, dict] = {}
+    for row_id, player_id, tournament_id, elo_before, elo_after, elo_change, timestamp in rows:
+        summary = summaries.get((player_id, tournament_id))
+        if summary is None:
+            summaries[(player_id, tournament_id)] = {
+                'player_id': player_id, 'tournament_id': tournament_id,
+                'elo_before': elo_before, 'elo_after': elo_after, 'elo_change': elo_change,
+                'matches_played': 1, 'first_timestamp': timestamp, 'timestamp': timestamp,
+                'last_history_id': row_id
+            }
+        else:
+            summary['elo_after'] = elo_after
+            summary['elo_change'] += elo_change
+            summary['matches_played'] += 1
+            summary['timestamp'] = timestamp
+            summary['last_history_id'] = row_id
+    return list(summaries.values())
+
+
+def compact_history(conn, cutoff: datetime, archive: bool = True) -> Dict[str, int]:
+    """
+    Compact every tournament whose history is entirely older than cutoff.
+    Raw rows are copied to elo_history_archive (or dropped when archive is
+    False) and deleted from elo_history, leaving export tombstones. Caller commits.
+    """
+    hot = ELOHistory.__table__
+    stats = {'tournaments': 0, 'summaries': 0, 'rows': 0}
+    tournament_ids = compactable_tournaments(conn, cutoff)
+    for start in range(0, len(tournament_ids), COMPACT_BATCH_TOURNAMENTS):
+        batch = tournament_ids[start:start + COMPACT_BATCH_TOURNAMENTS]
+        in_batch = hot.c.tournament_id.in_(batch)
+        rows = conn.execute(
+            select(hot.c.id, hot.c.player_id, hot.c.tournament_id, hot.c.elo_before, hot.c.elo_after,
+                   hot.c.elo_change, hot.c.timestamp)
+            .where(in_batch)
+            .order_by(hot.c.player_id, hot.c.tournament_id, hot.c.timestamp, hot.c.id)
+        )
+        summaries = summarize_rows(rows)
+        if summaries:
+            conn.execute(ELOHistorySummary.__table__.insert(), summaries)
+        if archive:
+            columns = [c.name for c in hot.columns]
+            conn.execute(ELOHistoryArchive.__table__.insert().from_select(
+                columns, select(*(hot.c[name] for name in columns)).where(in_batch)
+            ))
+        record_deletions(conn, 'elo_history', select(hot.c.id).where(in_batch))
+        stats['rows'] += conn.execute(hot.delete().where(in_batch)).rowcount
+        record_checkpoints(conn, batch)
+        stats['tournaments'] += len(batch)
+        stats['summaries'] += len(summaries)
+    return stats
+
+
+def compact_older_than(conn, days: int, archive: bool = True) -> Dict[str, int]:
+    return compact_history(conn, datetime.utcnow() - timedelta(days=days), archive)
+
+
+def rating_events():
+    """
+    (player_id, timestamp, seq, elo_after) for every raw and compacted history
+    row; order by (timestamp, seq) for the rating sequence. Compacted
+    tournaments contribute one event at their last match.
+    """
+    return union_all(
+        select(ELOHistory.player_id, ELOHistory.timestamp, ELOHistory.id.label('seq'), ELOHistory.elo_after),
+        select(ELOHistorySummary.player_id, ELOHistorySummary.timestamp,
+               ELOHistorySummary.last_history_id.label('seq'), ELOHistorySummary.elo_after)
+    ).subquery('rating_events')
@@ -0,0 +1,192 @@
+"""
+Metagame statistics
+Per deck and tournament: entries, share of the field, top-cut conversion
+and match win rate, written to metagame_tournament when a tournament is
+rated and summed per season into metagame_season. Trend queries read these
+small tables instead of grouping tournament_players across every event.
+Archetypes are top-level decks; variants roll up into their parent.
+Rewrites bump the metagame generation, so cached trends follow them.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from app.cache import bump_generation, METAGAME
+from app.models import Deck, DeckNature, MetagameSeason, MetagameTournament, Season, Tournament
+
+TOP_CUT_SIZE = 8
+METAGAME_BATCH_TOURNAMENTS = 200
+TREND_DEFAULT_LIMIT = 10
+GROUPS = ('deck', 'archetype')
+PERIODS = ('tournament', 'season')
+
+
+def archetype_ids(session) -> Dict[int, int]:
+    """Deck id -> id of its top-level ancestor"""
+    parents = dict(session.execute(select(Deck.id, Deck.parent_id)).all())
+    roots = {}
+    for deck_id in parents:
+        root, seen = deck_id, set()
+        while parents.get(root) and root not in seen:
+            seen.add(root)
+            root = parents[root]
+        roots[deck_id] = root
+    return roots
+
+
+def rates(entries: int, players: int, top_cut: int, wins: int, losses: int, ties: int) -> dict:
+    """Share, conversion and win rate from counts"""
+    games = wins + losses + ties
+    return {
+        'share': entries / players if players else 0.0,
+        'conversion': top_cut / entries if entries else 0.0,
+        'win_rate': wins / games if games else 0.0,
+    }
+
+
+def tournament_rows(tournament: Tournament, archetypes: Dict[int, int]) -> List[dict]:
+    """metagame_tournament rows for a tournament with participants and matches loaded"""
+    from app.tournament.standings import compute_standings  # app.tournament imports this module
+    standings = compute_standings(tournament, include_dropped=True)
+    top_cut = {row['player'].id for row in standings[:TOP_CUT_SIZE] if not row['dropped']}
+    totals = defaultdict(lambda: dict.fromkeys(('entries', 'top_cut', 'wins', 'losses', 'ties'), 0))
+    for tp in tournament.participants:
+        if tp.deck_id is None:
+            continue
+        deck = totals[tp.deck_id]
+        deck['entries'] += 1
+        deck['top_cut'] += tp.id in top_cut
+        deck['wins'] += tp.wins or 0
+        deck['losses'] += tp.losses or 0
+        deck['ties'] += tp.ties or 0
+    players = sum(deck['entries'] for deck in totals.values())
+    return [
+        {'tournament_id': tournament.id, 'deck_id': deck_id, 'archetype_id': archetypes.get(deck_id, deck_id),
+         'season_id': tournament.season_id, 'date': tournament.date, 'players': players,
+         **counts, **rates(players=players, **counts)}
+        for deck_id, counts in totals.items()
+    ]
+
+
+def refresh_season(conn, season_id: int):
+    """Rewrite metagame_season for one season from its tournament rows"""
+    mt = MetagameTournament.__table__
+    conn.execute(MetagameSeason.__table__.delete().where(MetagameSeason.season_id == season_id))
+    grouped = conn.execute(
+        select(mt.c.deck_id, mt.c.archetype_id, func.count(), func.sum(mt.c.entries), func.sum(mt.c.top_cut),
+               func.sum(mt.c.wins), func.sum(mt.c.losses), func.sum(mt.c.ties))
+        .where(mt.c.season_id == season_id)
+        .group_by(mt.c.deck_id, mt.c.archetype_id)
+    ).all()
+    players = sum(row[3] for row in grouped)
+    now = datetime.utcnow()
+    rows = [
+        {'season_id': season_id, 'deck_id': deck_id, 'archetype_id': archetype_id, 'tournaments': tournaments,
+         'entries': entries, 'players': players, 'top_cut': top_cut, 'wins': wins, 'losses': losses,
+         'ties': ties, 'updated_at': now, **rates(entries, players, top_cut, wins, losses, ties)}
+        for deck_id, archetype_id, tournaments, entries, top_cut, wins, losses, ties in grouped
+    ]
+    if rows:
+        conn.execute(MetagameSeason.__table__.insert(), rows)
+
+
+def record_tournament(session, tournament: Tournament):
+    """Write a completed tournament's metagame rows and refresh its season (caller commits)"""
+    conn = session.connection()
+    conn.execute(MetagameTournament.__table__.delete().where(MetagameTournament.tournament_id == tournament.id))
+    rows = tournament_rows(tournament, archetype_ids(session))
+    if rows:
+        conn.execute(MetagameTournament.__table__.insert(), rows)
+    if tournament.season_id:
+        refresh_season(conn, tournament.season_id)
+    bump_generation(METAGAME, session=session)
+
+
+def rebuild_metagame(session) -> Dict[str, int]:
+    """Recompute every completed tournament and season (after bulk imports; caller commits)"""
+    conn = session.connection()
+    conn.execute(MetagameTournament.__table__.delete())
+    conn.execute(MetagameSeason.__table__.delete())
+    archetypes = archetype_ids(session)
+    tournament_ids = list(session.execute(
+        select(Tournament.id).where(Tournament.status == 'completed').order_by(Tournament.id)
+    ).scalars())
+    stats = {'tournaments': 0, 'rows': 0, 'seasons': 0}
+    for start in range(0, len(tournament_ids), METAGAME_BATCH_TOURNAMENTS):
+        batch = session.execute(
+            select(Tournament)
+            .where(Tournament.id.in_(tournament_ids[start:start + METAGAME_BATCH_TOURNAMENTS]))
+            .options(selectinload(Tournament.participants), selectinload(Tournament.matches))
+        ).scalars().all()
+        rows = [row for tournament in batch for row in tournament_rows(tournament, archetypes)]
+        if rows:
+            conn.execute(MetagameTournament.__table__.insert(), rows)
+        stats['tournaments'] += len(batch)
+        stats['rows'] += len(rows)
+    for season_id in session.execute(
+        select(MetagameTournament.season_id).where(MetagameTournament.season_id.isnot(None)).distinct()
+    ).scalars():
+        refresh_season(conn, season_id)
+        stats['seasons'] += 1
+    bump_generation(METAGAME, session=session)
+    return stats
+
+
+def _trend_stmt(model, group: str, start: Optional[date], end: Optional[date], nature: Optional[str]):
+    """Counts per period and group key, summed so archetypes combine their variants"""
+    key = (model.deck_id if group == 'deck' else model.archetype_id).label('key')
+    if model is MetagameTournament:
+        period_columns = [model.tournament_id.label('period_id'), model.date.label('date')]
+        stmt = select(*period_columns, key)
+        if start is not None:
+            stmt = stmt.where(model.date >= start)
+        if end is not None:
+            stmt = stmt.where(model.date <= end)
+    else:
+        period_columns = [model.season_id.label('period_id'), Season.start_date.label('date')]
+        stmt = select(*period_columns, key).join(Season, Season.id == model.season_id)
+        if start is not None:
+            stmt = stmt.where(func.coalesce(Season.end_date, Season.start_date) >= start)
+        if end is not None:
+            stmt = stmt.where(Season.start_date <= end)
+    if nature:
+        stmt = stmt.join(DeckNature, (DeckNature.deck_id == key) & (DeckNature.name == nature))
+    return stmt.add_columns(
+        func.sum(model.entries).label('entries'), func.max(model.players).label('players'),
+        func.sum(model.top_cut).label('top_cut'), func.sum(model.wins).label('wins'),
+        func.sum(model.losses).label('losses'), func.sum(model.ties).label('ties'),
+    ).group_by(*period_columns, key)
+
+
+def metagame_trend(session, group: str = 'deck', period: str = 'tournament',
+                   deck_ids: Optional[Iterable[int]] = None, start: Optional[date] = None,
+                   end: Optional[date] = None, nature: Optional[str] = None,
+                   limit: int = TREND_DEFAULT_LIMIT) -> List[dict]:
+    """
+    Share/conversion/win-rate series per deck or archetype over a date range.
+    Without deck_ids, the `limit` most-played keys in the range are returned.
+    The nature filter applies to the group key: with group='archetype' it
+    matches the archetype deck's own tags, not those of its variants.
+    """
+    model = MetagameTournament if period == 'tournament' else MetagameSeason
+    stmt = _trend_stmt(model, group, start, end, nature).subquery()
+    if deck_ids:
+        keys = list(deck_ids)
+    else:
+        keys = list(session.execute(
+            select(stmt.c.key).group_by(stmt.c.key).order_by(func.sum(stmt.c.entries).desc(), stmt.c.key).limit(limit)
+        ).scalars())
+    if not keys:
+        return []
+
+    names = dict(session.execute(select(Deck.id, Deck.name).where(Deck.id.in_(keys))).all())
+    series = {key: {'id': key, 'name': names.get(key), 'points': []} for key in keys}
+    for row in session.execute(select(stmt).where(stmt.c.key.in_(keys)).order_by(stmt.c.date, stmt.c.period_id)):
+        series[row.key]['points'].append({
+            f'{period}_id': row.period_id,
+            'date': row.date.isoformat(),
+            'entries': row.entries,
+            **rates(row.entries, row.players, row.top_cut, row.wins, row.losses, row.ties),
+        })
+    return list(series.values())
@@ -0,0 +1,129 @@
+"""
+Player name search
+In-memory n-gram index over normalized player names for as-you-type
+lookups at registration desks. Names are NFKC-normalized and casefolded,
+so full-width/half-width forms and Latin case all match, and CJK names
+are indexed character by character.
+"""
+import heapq
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Set
+from app.models import db, Player
+from app.cache import generation, PLAYER_NAMES
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+INDEX_MAX_AGE = 60  # seconds; picks up changes committed by other workers
+
+
+def normalize_name(name: str) -> str:
+    """NFKC-normalize, casefold and drop whitespace/punctuation"""
+    if not name:
+        return ''
+    normalized = unicodedata.normalize('NFKC', name).casefold()
+    return ''.join(ch for ch in normalized if unicodedata.category(ch)[0] in ('L', 'N'))
+
+
+def bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class PlayerNameIndex:
+    """
+    Initial, unigram and bigram posting lists over normalized names.
+    Single-character queries (common for CJK surnames) use the initial and
+    unigram postings; longer queries are scored by bigram overlap, which also
+    tolerates small typos, with bonuses for prefix and substring hits.
+    """
+
+    def __init__(self, players=()):
+        self.names: Dict[int, str] = {}
+        self.normalized: Dict[int, str] = {}
+        self.initials: Dict[str, List[int]] = defaultdict(list)
+        self.unigrams: Dict[str, List[int]] = defaultdict(list)
+        self.bigrams: Dict[str, List[int]] = defaultdict(list)
+        for player_id, name in players:
+            self.add(player_id, name)
+
+    def add(self, player_id: int, name: str):
+        key = normalize_name(name)
+        self.names[player_id] = name
+        self.normalized[player_id] = key
+        if key:
+            self.initials[key[0]].append(player_id)
+        for ch in set(key):
+            self.unigrams[ch].append(player_id)
+        for gram in bigrams(key):
+            self.bigrams[gram].append(player_id)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+        q = normalize_name(query)
+        if not q:
+            return []
+
+        if len(q) == 1:
+            return self._search_character(q, limit)
+
+        scores = defaultdict(float)
+        grams = bigrams(q)
+        for gram in grams:
+            for player_id in self.bigrams.get(gram, ()):
+                scores[player_id] += 1.0 / len(grams)
+
+        for player_id in scores:
+            key = self.normalized[player_id]
+            if key.startswith(q):
+                scores[player_id] += 1.0
+            elif q in key:
+                scores[player_id] += 0.5
+
+        ranked = heapq.nsmallest(limit, scores.items(),
+                                 key=lambda item: (-item[1], len(self.normalized[item[0]]), item[0]))
+        return self._results(ranked)
+
+    def _search_character(self, ch: str, limit: int) -> List[dict]:
+        """Names starting with the character first, then names containing it"""
+        def by_length(player_id):
+            return len(self.normalized[player_id]), player_id
+
+        ranked = [(player_id, 1.5) for player_id in heapq.nsmallest(limit, self.initials.get(ch, ()), key=by_length)]
+        if len(ranked) < limit:
+            seen = {player_id for player_id, _ in ranked}
+            rest = (player_id for player_id in self.unigrams.get(ch, ()) if player_id not in seen)
+            ranked += [(player_id, 0.5) for player_id in heapq.nsmallest(limit - len(ranked), rest, key=by_length)]
+        return self._results(ranked)
+
+    def _results(self, ranked) -> List[dict]:
+        return [
+            {'id': player_id, 'name': self.names[player_id], 'score': round(score, 3)}
+            for player_id, score in ranked
+        ]
+
+
+_index = None
+_index_generation = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_index() -> PlayerNameIndex:
+    """Current index, rebuilt when player names change or it gets too old"""
+    global _index, _index_generation, _index_built_at
+    current = generation(PLAYER_NAMES)
+    if _index is not None and _index_generation == current and time.monotonic() - _index_built_at < INDEX_MAX_AGE:
+        return _index
+    with _index_lock:
+        if _index is None or _index_generation != current or time.monotonic() - _index_built_at >= INDEX_MAX_AGE:
+            rows = db.session.query(Player.id, Player.name).all()
+            _index = PlayerNameIndex(rows)
+            _index_generation = current
+            _index_built_at = time.monotonic()
+    return _index
+
+
+def search_players(query: str, limit: int = DEFAULT_LIMIT) -> List[dict]:
+    """Top player matches for a prefix or fuzzy name query"""
+    return get_index().search(query, max(1, min(limit, MAX_LIMIT)))
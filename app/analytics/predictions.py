@@ -0,0 +1,82 @@
+"""
+Round win probabilities
+For every table of a published round: each side's expected score from the
+players' current ratings, shifted by their decks' rating gap when both
+registered a deck, and the rating swing each player would see on a win,
+draw or loss under their current K-factor. One query loads the round with
+both players' and decks' ratings, the math is a single pass over its rows,
+and the result is cached until ratings, player names or the round's matches
+change.
+"""
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from app.analytics.elo_calculator import expected_score, get_k_factor
+from app.cache import fragment_cache, cache_key, RATINGS, PLAYER_NAMES, TOURNAMENTS
+from app.models import db, Deck, Match, Player, TournamentPlayer
+
+
+def round_rows(session, tournament_id: int, round_number: int):
+    """Paired matches of a round with both players' and decks' ratings, in table order"""
+    sides = []
+    for seat in (Match.player1_id, Match.player2_id):
+        tp, player, deck = aliased(TournamentPlayer), aliased(Player), aliased(Deck)
+        sides.append((seat, tp, player, deck))
+    stmt = select(Match.id)
+    for seat, tp, player, deck in sides:
+        stmt = (
+            stmt.add_columns(tp.id, player.id, player.name, player.elo, player.games_played, deck.name, deck.elo)
+            .join(tp, tp.id == seat)
+            .join(player, player.id == tp.player_id)
+            .outerjoin(deck, deck.id == tp.deck_id)
+        )
+    return session.execute(
+        stmt.where(Match.tournament_id == tournament_id, Match.round_number == round_number,
+                   Match.player2_id.isnot(None))
+        .order_by(Match.id)
+    ).all()
+
+
+def _side(tp_id, player_id, name, elo, games_played, deck, deck_elo, win_probability, rating_expected) -> dict:
+    k = get_k_factor(games_played or 0)
+    return {
+        'tournament_player_id': tp_id, 'player_id': player_id, 'name': name,
+        'elo': round(elo or 0.0, 1), 'deck': deck, 'deck_elo': round(deck_elo, 1) if deck_elo is not None else None,
+        'win_probability': round(win_probability, 4),
+        # Rating changes use player ratings only, as in ELOCalculator.apply_result
+        'swing': {'win': round(k * (1 - rating_expected), 2),
+                  'draw': round(k * (0.5 - rating_expected), 2),
+                  'loss': round(-k * rating_expected, 2)},
+    }
+
+
+def predict_round(session, tournament_id: int, round_number: int) -> List[dict]:
+    """One entry per paired table: both sides' win probability (expected score) and rating swing"""
+    tables = []
+    for table, row in enumerate(round_rows(session, tournament_id, round_number), start=1):
+        match_id, p1, p2 = row[0], row[1:8], row[8:15]
+        elo1, elo2 = p1[3] or 0.0, p2[3] or 0.0
+        rating_expected = expected_score(elo1, elo2)
+        # Deck ratings share the player scale; their gap shifts the matchup
+        deck_gap = p1[6] - p2[6] if p1[6] is not None and p2[6] is not None else None
+        expected = expected_score(elo1 + deck_gap, elo2) if deck_gap is not None else rating_expected
+        tables.append({
+            'table': table, 'match_id': match_id,
+            'deck_expected': round(expected_score(p1[6], p2[6]), 4) if deck_gap is not None else None,
+            'player1': _side(*p1, expected, rating_expected),
+            'player2': _side(*p2, 1 - expected, 1 - rating_expected),
+        })
+    return tables
+
+
+def round_predictions(tournament_id: int, round_number: int, session=None) -> Optional[List[dict]]:
+    """Cached predict_round(); None while the round has no pairings (not cached)"""
+    # Re-pairing a round or reporting its results changes the matches behind the same key parts
+    key = cache_key(f'round_predictions:{tournament_id}:{round_number}', RATINGS, PLAYER_NAMES, TOURNAMENTS)
+    tables = fragment_cache.get(key)
+    if tables is None:
+        tables = predict_round(session or db.session, tournament_id, round_number)
+        if not tables:
+            return None
+        fragment_cache.set(key, tables)
+    return tables
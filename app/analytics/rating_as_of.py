@@ -0,0 +1,147 @@
+"""
+Point-in-time ratings
+A player's rating at a moment is elo_after of their last history event at
+or before it, taken from raw elo_history or, for compacted tournaments,
+elo_history_summary. A single player's lookup is one seek per table on
+the (player_id, timestamp) indexes.
+
+Leaderboards read rating_checkpoints instead: one row per player and
+tournament with the rating after it, written when a tournament is rated,
+compacted or replayed. A historical board is the latest checkpoint at or
+before the moment for every player, in one pass over the checkpoints,
+plus the raw rows of tournaments that were under way at that moment.
+"""
+from datetime import datetime, time
+from typing import Iterable, List, Optional
+from sqlalchemy import and_, case, func, or_, select, tuple_, union_all
+from sqlalchemy.orm import aliased
+from app.models import ELOHistory, ELOHistorySummary, Player, RatingCheckpoint
+
+AS_OF_LEADERBOARD_LIMIT = 100
+
+
+def latest_event_ids(player_id, at: datetime):
+    """
+    Correlatable scalar subqueries for the id of a player's last raw and
+    last summary event at or before `at`
+    """
+    raw = (
+        select(ELOHistory.id)
+        .where(ELOHistory.player_id == player_id, ELOHistory.timestamp <= at)
+        .order_by(ELOHistory.timestamp.desc(), ELOHistory.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    summary = (
+        select(ELOHistorySummary.id)
+        .where(ELOHistorySummary.player_id == player_id, ELOHistorySummary.timestamp <= at)
+        .order_by(ELOHistorySummary.timestamp.desc(), ELOHistorySummary.last_history_id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return raw, summary
+
+
+def _as_of_select(player_id, at: datetime, *columns):
+    """SELECT of columns plus the as-of elo for player_id; None when there is no event yet"""
+    raw, summary = aliased(ELOHistory), aliased(ELOHistorySummary)
+    raw_id, summary_id = latest_event_ids(player_id, at)
+    # The later of the two events wins; summaries order by their last raw row
+    raw_is_later = or_(
+        summary.id.is_(None),
+        and_(raw.id.isnot(None),
+             tuple_(raw.timestamp, raw.id) > tuple_(summary.timestamp, summary.last_history_id))
+    )
+    elo = case((raw_is_later, raw.elo_after), else_=summary.elo_after).label('elo')
+    return (
+        select(*columns, elo)
+        .outerjoin(raw, raw.id == raw_id)
+        .outerjoin(summary, summary.id == summary_id)
+    ), elo
+
+
+def rating_as_of(session, player_id: int, at: datetime) -> Optional[float]:
+    """A player's rating at `at`; None if they had no rated match by then"""
+    stmt, _ = _as_of_select(player_id, at, Player.id)
+    row = session.execute(stmt.where(Player.id == player_id)).one_or_none()
+    return row.elo if row else None
+
+
+def record_checkpoints(conn, tournament_ids: Optional[Iterable[int]] = None):
+    """
+    Rewrite the rating checkpoints of the given tournaments (default: all)
+    from their raw or compacted history. Caller commits.
+    """
+    checkpoints = RatingCheckpoint.__table__
+    by_player = (ELOHistory.player_id, ELOHistory.tournament_id)
+    raw = select(
+        ELOHistory.player_id, ELOHistory.tournament_id,
+        func.min(ELOHistory.timestamp).over(partition_by=by_player).label('first_timestamp'),
+        ELOHistory.timestamp, ELOHistory.id.label('seq'), ELOHistory.elo_after,
+        func.row_number().over(partition_by=by_player,
+                               order_by=(ELOHistory.timestamp.desc(), ELOHistory.id.desc())).label('position')
+    ).where(ELOHistory.tournament_id.isnot(None))
+    compacted = select(
+        ELOHistorySummary.player_id, ELOHistorySummary.tournament_id, ELOHistorySummary.first_timestamp,
+        ELOHistorySummary.timestamp, ELOHistorySummary.last_history_id, ELOHistorySummary.elo_after
+    )
+    delete = checkpoints.delete()
+    if tournament_ids is not None:
+        tournament_ids = list(tournament_ids)
+        raw = raw.where(ELOHistory.tournament_id.in_(tournament_ids))
+        compacted = compacted.where(ELOHistorySummary.tournament_id.in_(tournament_ids))
+        delete = delete.where(checkpoints.c.tournament_id.in_(tournament_ids))
+    raw = raw.subquery()
+    conn.execute(delete)
+    conn.execute(checkpoints.insert().from_select(
+        ['player_id', 'tournament_id', 'first_timestamp', 'timestamp', 'seq', 'elo_after'],
+        union_all(
+            select(raw.c.player_id, raw.c.tournament_id, raw.c.first_timestamp, raw.c.timestamp, raw.c.seq,
+                   raw.c.elo_after).where(raw.c.position == 1),
+            compacted
+        )
+    ))
+
+
+def leaderboard_as_of(session, at: datetime, limit: int = AS_OF_LEADERBOARD_LIMIT) -> List[dict]:
+    """Top players by rating at `at`, among players with a rated match by then"""
+    # A tournament under way at `at` has its checkpoint later; its matches so
+    # far come from raw history (compacted ones count at their last match)
+    running = (select(RatingCheckpoint.tournament_id)
+               .where(RatingCheckpoint.first_timestamp <= at, RatingCheckpoint.timestamp > at))
+    events = union_all(
+        select(RatingCheckpoint.player_id, RatingCheckpoint.timestamp, RatingCheckpoint.seq,
+               RatingCheckpoint.elo_after)
+        .where(RatingCheckpoint.timestamp <= at),
+        select(ELOHistory.player_id, ELOHistory.timestamp, ELOHistory.id, ELOHistory.elo_after)
+        .where(ELOHistory.tournament_id.in_(running), ELOHistory.timestamp <= at)
+    ).subquery()
+    latest = select(
+        events.c.player_id, events.c.elo_after.label('elo'),
+        func.row_number().over(partition_by=events.c.player_id,
+                               order_by=(events.c.timestamp.desc(), events.c.seq.desc())).label('position')
+    ).subquery()
+    rows = session.execute(
+        select(Player.id, Player.name, Player.elo.label('current_elo'), latest.c.elo)
+        .join(latest, latest.c.player_id == Player.id)
+        .where(latest.c.position == 1)
+        .order_by(latest.c.elo.desc(), Player.id)
+        .limit(limit)
+    )
+    return [
+        {'rank': rank, 'player_id': row.id, 'name': row.name, 'elo': row.elo, 'current_elo': row.current_elo}
+        for rank, row in enumerate(rows, start=1)
+    ]
+
+
+def parse_as_of(value: Optional[str]) -> Optional[datetime]:
+    """
+    ISO date or datetime; a bare date means the end of that day, so it
+    includes the day's tournaments. None when empty; ValueError when malformed.
+    """
+    if not value:
+        return None
+    at = datetime.fromisoformat(value)
+    if 'T' not in value and ' ' not in value.strip():
+        at = datetime.combine(at.date(), time.max)
+    return at
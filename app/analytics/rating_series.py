@@ -0,0 +1,259 @@
+"""
+Per-player rating series cache
+A player's full rating history as packed float arrays (match time, rating
+before and after, opponent rating, score), loaded once from elo_history
+and elo_history_archive and then appended to as update_tournament_elo
+commits new rows. Charts, clutch and streak/volatility stats read the
+arrays instead of each running their own ORDER BY over the history.
+
+Series are kept in an LRU bounded by RATING_SERIES_CACHE_BYTES. Each read
+checks the player's latest history row with one index seek, so series
+extended or rewritten by another process are topped up or reloaded.
+"""
+import statistics
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, case, event, literal, select, tuple_, union_all
+from sqlalchemy.orm import Session, aliased
+from app.models import db, ELOHistory, ELOHistoryArchive, Match, TournamentPlayer
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+ENTRY_OVERHEAD = 600  # approximate bytes per series beyond its arrays
+
+
+def epoch(value: datetime) -> float:
+    """Seconds since the epoch for a naive UTC datetime"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RatingSeries:
+    """One player's rated matches in time order"""
+
+    __slots__ = ('timestamps', 'elo_before', 'elo', 'opponent_elo', 'scores', 'last_id', 'last_at')
+
+    def __init__(self):
+        self.timestamps = array('d')
+        self.elo_before = array('d')
+        self.elo = array('d')
+        self.opponent_elo = array('d')
+        self.scores = array('d')
+        self.last_id = None
+        self.last_at = None
+
+    def __len__(self):
+        return len(self.elo)
+
+    def append(self, history_id: int, timestamp: datetime, elo_before: float, elo_after: float,
+               opponent_elo: float, score: float):
+        self.timestamps.append(epoch(timestamp))
+        self.elo_before.append(elo_before)
+        self.elo.append(elo_after)
+        self.opponent_elo.append(opponent_elo)
+        self.scores.append(score)
+        self.last_id, self.last_at = history_id, timestamp
+
+    @property
+    def last_key(self) -> Optional[Tuple[datetime, int]]:
+        """(timestamp, id) of the latest row, the order key of elo_history"""
+        return (self.last_at, self.last_id) if self.last_id is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        return ENTRY_OVERHEAD + sum(a.itemsize * len(a) for a in
+                                    (self.timestamps, self.elo_before, self.elo, self.opponent_elo, self.scores))
+
+    def clutch(self) -> Optional[float]:
+        """Score rate (draws count half) against higher-rated opponents; None without such matches"""
+        games = [score for before, opponent, score in zip(self.elo_before, self.opponent_elo, self.scores)
+                 if opponent > before]
+        return sum(games) / len(games) if games else None
+
+    def volatility(self) -> float:
+        """Standard deviation of per-match rating changes"""
+        changes = [after - before for before, after in zip(self.elo_before, self.elo)]
+        return statistics.pstdev(changes) if len(changes) > 1 else 0.0
+
+    def current_streak(self) -> int:
+        """Consecutive wins (positive) or losses (negative) up to the latest match; draws end a streak"""
+        streak = 0
+        for score in reversed(self.scores):
+            if score == 1.0 and streak >= 0:
+                streak += 1
+            elif score == 0.0 and streak <= 0:
+                streak -= 1
+            else:
+                break
+        return streak
+
+    def to_dict(self) -> dict:
+        return {
+            'timestamps': [datetime.fromtimestamp(t, timezone.utc).replace(tzinfo=None).isoformat()
+                           for t in self.timestamps],
+            'elo': self.elo.tolist(),
+            'opponent_elo': self.opponent_elo.tolist(),
+            'scores': self.scores.tolist(),
+        }
+
+
+class RatingSeriesCache:
+    """Thread-safe LRU of RatingSeries by player id, bounded by total array bytes"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._data: 'OrderedDict[int, RatingSeries]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, player_id: int) -> Optional[RatingSeries]:
+        with self._lock:
+            series = self._data.get(player_id)
+            if series is not None:
+                self._data.move_to_end(player_id)
+            return series
+
+    def put(self, player_id: int, series: RatingSeries):
+        with self._lock:
+            self._pop(player_id)
+            self._data[player_id] = series
+            self.nbytes += series.nbytes
+            self._evict()
+
+    def extend(self, player_id: int, rows):
+        """Append series_rows()-shaped rows to a cached series"""
+        with self._lock:
+            series = self._data.get(player_id)
+            if series is None:
+                return
+            self.nbytes -= series.nbytes
+            for row in rows:
+                if series.last_key is not None and (row[1], row[0]) <= series.last_key:
+                    # Out of order (e.g. a backdated import): reload on next read
+                    del self._data[player_id]
+                    return
+                series.append(*row)
+            self.nbytes += series.nbytes
+            self._evict()
+
+    def discard(self, player_id: int):
+        with self._lock:
+            self._pop(player_id)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _pop(self, player_id: int):
+        series = self._data.pop(player_id, None)
+        if series is not None:
+            self.nbytes -= series.nbytes
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and len(self._data) > 1:
+            _, series = self._data.popitem(last=False)
+            self.nbytes -= series.nbytes
+
+
+rating_series_cache = RatingSeriesCache()
+
+
+def _series_select(model, player_id: int, after: Optional[Tuple[datetime, int]] = None):
+    """Rows of one history table for a player, with the opponent's rating and the player's score"""
+    opponent = aliased(model)
+    tp1 = aliased(TournamentPlayer)
+    is_player1 = tp1.player_id == model.player_id
+    score = case(
+        (Match.result == 'draw', literal(0.5)),
+        (and_(Match.result == 'player1', is_player1), literal(1.0)),
+        (and_(Match.result == 'player2', ~is_player1), literal(1.0)),
+        else_=literal(0.0)
+    )
+    stmt = (
+        select(model.id, model.timestamp, model.elo_before, model.elo_after,
+               opponent.elo_before.label('opponent_elo'), score.label('score'))
+        .join(opponent, and_(opponent.match_id == model.match_id, opponent.player_id != model.player_id))
+        .join(Match, Match.id == model.match_id)
+        .join(tp1, tp1.id == Match.player1_id)
+        .where(model.player_id == player_id)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(model.timestamp, model.id) > tuple_(*after))
+    return stmt
+
+
+def series_rows(session, player_id: int, after: Optional[Tuple[datetime, int]] = None) -> List[tuple]:
+    """(history_id, timestamp, elo_before, elo_after, opponent_elo, score) in time order, archive included"""
+    rows = union_all(_series_select(ELOHistoryArchive, player_id, after),
+                     _series_select(ELOHistory, player_id, after)).subquery()
+    return [tuple(row) for row in session.execute(select(rows).order_by(rows.c.timestamp, rows.c.id))]
+
+
+def latest_history(session, player_id: int) -> Optional[Tuple[int, datetime, float]]:
+    """(id, timestamp, elo_after) of a player's latest raw history row, hot or archived"""
+    for model in (ELOHistory, ELOHistoryArchive):
+        row = session.execute(
+            select(model.id, model.timestamp, model.elo_after)
+            .where(model.player_id == player_id)
+            .order_by(model.timestamp.desc(), model.id.desc())
+            .limit(1)
+        ).first()
+        if row is not None:
+            return tuple(row)
+    return None
+
+
+def get_rating_series(player_id: int, session=None) -> RatingSeries:
+    """A player's rating series from the cache, loading or topping it up as needed"""
+    session = session or db.session
+    latest = latest_history(session, player_id)
+
+    def current(series):
+        if latest is None:
+            return series.last_id is None
+        return series.last_id == latest[0] and series.elo[-1] == latest[2]
+
+    series = rating_series_cache.get(player_id)
+    if series is not None:
+        if current(series):
+            return series
+        # Newer rows from another process: fetch only those
+        if series.last_key is not None and latest is not None and (latest[1], latest[0]) > series.last_key:
+            rating_series_cache.extend(player_id, series_rows(session, player_id, series.last_key))
+            series = rating_series_cache.get(player_id)
+            if series is not None and current(series):
+                return series
+
+    series = RatingSeries()
+    for row in series_rows(session, player_id):
+        series.append(*row)
+    rating_series_cache.put(player_id, series)
+    return series
+
+
+def append_on_commit(session, rows: Dict[int, list]):
+    """Queue series rows by player id; they are appended to cached series once the session commits"""
+    pending = session.info.setdefault('rating_series_rows', {})
+    for player_id, player_rows in rows.items():
+        pending.setdefault(player_id, []).extend(player_rows)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_series_rows(session):
+    pending = session.info.pop('rating_series_rows', None)
+    for player_id, rows in (pending or {}).items():
+        rating_series_cache.extend(player_id, rows)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_series_rows(session):
+    session.info.pop('rating_series_rows', None)
+
+
+def init_rating_series(app):
+    rating_series_cache.max_bytes = app.config.get('RATING_SERIES_CACHE_BYTES', DEFAULT_MAX_BYTES)
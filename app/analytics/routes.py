@@ -1,20 +1,63 @@
 """
 Analytics routes
 """
-from flask import render_template, request
+from datetime import date, datetime
+from flask import render_template, request, jsonify, abort, Response, stream_with_context
+from flask_login import login_required
 from app.analytics import analytics_bp
-from app.models import Player, Deck, ELOHistory, Tournament
+from app.analytics.export import DATASETS, STREAMERS, export_until, parse_since
+from app.analytics.head_to_head import get_record, top_opponents
+from app.analytics.player_search import search_players, DEFAULT_LIMIT
+from app.analytics.rating_series import get_rating_series
+from app.analytics.deck_natures import filter_by_nature, nature_names
+from app.analytics.metagame import metagame_trend, GROUPS, PERIODS, TREND_DEFAULT_LIMIT
+from app.analytics.rating_as_of import leaderboard_as_of, rating_as_of, parse_as_of, AS_OF_LEADERBOARD_LIMIT
+from app.cache import fragment_cache, cache_key, RATINGS, DECKS, METAGAME
+from app.sqlite_tuning import read_session
+from app.models import Player, Deck, ELOHistory, ELOHistorySummary, Tournament, Season, MetagameSeason
 from sqlalchemy import func
 
+ELO_HISTORY_ROWS = 50
+
 @analytics_bp.route('/leaderboard')
 def leaderboard():
     """Display player leaderboard"""
     # Filter parameters
     status_filter = request.args.get('status', 'all')  # all, official, provisional
     min_games = int(request.args.get('min_games', 0))
+    nature = request.args.get('nature') or None
+    try:
+        as_of = parse_as_of(request.args.get('as_of'))
+    except ValueError:
+        abort(400)
+
+    # Build query (read-only analytics connection when configured)
+    session = read_session()
+    # Decks have no rating history, so their board is always live
+    decks = (
+        filter_by_nature(session.query(Deck), nature)
+        .filter(Deck.games_played >= 5)
+        .order_by(Deck.elo.desc())
+        .limit(20)
+        .all()
+    )
+    natures = nature_names(session)
+
+    if as_of is not None:
+        # Historical boards only change when ratings are replayed
+        history = fragment_cache.get_or_set(cache_key(f'leaderboard_as_of:{as_of.isoformat()}', RATINGS),
+                                            lambda: leaderboard_as_of(session, as_of))
+        return render_template('analytics/leaderboard.html',
+                              players=[],
+                              history=history,
+                              as_of=as_of,
+                              decks=decks,
+                              natures=natures,
+                              nature=nature,
+                              status_filter=status_filter,
+                              min_games=min_games)
 
-    # Build query
-    query = Player.query
+    query = session.query(Player)
 
     if status_filter == 'official':
         query = query.filter(Player.games_played >= 10)
@@ -27,30 +70,42 @@ def leaderboard():
     # Order by ELO
     players = query.order_by(Player.elo.desc()).limit(100).all()
 
-    # Deck leaderboard
-    decks = Deck.query.filter(Deck.games_played >= 5).order_by(Deck.elo.desc()).limit(20).all()
-
     return render_template('analytics/leaderboard.html',
                           players=players,
+                          history=None,
+                          as_of=None,
                           decks=decks,
+                          natures=natures,
+                          nature=nature,
                           status_filter=status_filter,
                           min_games=min_games)
 
 @analytics_bp.route('/profile/<int:player_id>')
 def profile(player_id):
     """Display player profile"""
-    player = Player.query.get_or_404(player_id)
+    session = read_session()
+    player = session.get(Player, player_id)
+    if player is None:
+        abort(404)
 
-    # Get ELO history
-    elo_history = ELOHistory.query.filter_by(player_id=player_id).order_by(ELOHistory.timestamp.desc()).limit(50).all()
+    # Get ELO history: recent raw rows, then per-tournament summaries of compacted history
+    elo_history = session.query(ELOHistory).filter_by(player_id=player_id).order_by(ELOHistory.timestamp.desc()).limit(ELO_HISTORY_ROWS).all()
+    if len(elo_history) < ELO_HISTORY_ROWS:
+        elo_history += (
+            session.query(ELOHistorySummary)
+            .filter_by(player_id=player_id)
+            .order_by(ELOHistorySummary.timestamp.desc())
+            .limit(ELO_HISTORY_ROWS - len(elo_history))
+            .all()
+        )
 
     # Get recent tournaments
     from app.models import TournamentPlayer
-    tournament_participations = TournamentPlayer.query.filter_by(player_id=player_id).order_by(TournamentPlayer.id.desc()).limit(10).all()
+    tournament_participations = session.query(TournamentPlayer).filter_by(player_id=player_id).order_by(TournamentPlayer.id.desc()).limit(10).all()
 
     # Get deck usage statistics
     deck_stats = (
-        TournamentPlayer.query
+        session.query(TournamentPlayer)
         .filter_by(player_id=player_id)
         .filter(TournamentPlayer.deck_id.isnot(None))
         .join(Deck)
@@ -68,4 +123,147 @@ def profile(player_id):
                           player=player,
                           elo_history=elo_history,
                           tournament_participations=tournament_participations,
-                          deck_stats=deck_stats)
+                          deck_stats=deck_stats,
+                          frequent_opponents=top_opponents(player_id))
+
+@analytics_bp.route('/profile/<int:player_id>/vs/<int:opponent_id>')
+def head_to_head(player_id, opponent_id):
+    """Head-to-head record between two players"""
+    if player_id == opponent_id:
+        abort(404)
+    players = {p.id: p for p in Player.query.filter(Player.id.in_([player_id, opponent_id])).all()}
+    if len(players) != 2:
+        abort(404)
+
+    return render_template('analytics/head_to_head.html',
+                          player=players[player_id],
+                          opponent=players[opponent_id],
+                          record=get_record(player_id, opponent_id))
+
+@analytics_bp.route('/api/head-to-head/<int:player_id>/<int:opponent_id>')
+def head_to_head_api(player_id, opponent_id):
+    """Head-to-head record as JSON, from player_id's point of view"""
+    if player_id == opponent_id:
+        abort(404)
+    return jsonify(get_record(player_id, opponent_id))
+
+@analytics_bp.route('/api/players/search')
+def player_search_api():
+    """Prefix/fuzzy player name search for as-you-type lookups"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    return jsonify({'query': query, 'results': search_players(query, limit)})
+
+@analytics_bp.route('/api/players/<int:player_id>/rating')
+def rating_as_of_api(player_id):
+    """A player's rating as of ?as_of=ISO date/datetime (default: now)"""
+    try:
+        as_of = parse_as_of(request.args.get('as_of')) or datetime.utcnow()
+    except ValueError:
+        abort(400)
+    session = read_session()
+    player = session.get(Player, player_id)
+    if player is None:
+        abort(404)
+    elo = rating_as_of(session, player_id, as_of)
+    return jsonify({'player_id': player_id, 'name': player.name, 'as_of': as_of.isoformat(),
+                    'elo': elo, 'rated': elo is not None})
+
+@analytics_bp.route('/api/players/<int:player_id>/rating-series')
+def rating_series_api(player_id):
+    """A player's full rating series for charts, with clutch, volatility and streak stats"""
+    session = read_session()
+    if session.get(Player, player_id) is None:
+        abort(404)
+    series = get_rating_series(player_id, session)
+    clutch = series.clutch()
+    return jsonify({'player_id': player_id, **series.to_dict(), 'stats': {
+        'matches': len(series),
+        'clutch': round(clutch * 100, 1) if clutch is not None else None,
+        'volatility': round(series.volatility(), 2),
+        'streak': series.current_streak(),
+    }})
+
+@analytics_bp.route('/api/leaderboard')
+def leaderboard_as_of_api():
+    """Top players by rating as of ?as_of=ISO date/datetime; ?limit= up to 1000"""
+    try:
+        as_of = parse_as_of(request.args.get('as_of'))
+    except ValueError:
+        abort(400)
+    limit = max(1, min(request.args.get('limit', AS_OF_LEADERBOARD_LIMIT, type=int), 1000))
+    if as_of is None:
+        as_of = datetime.utcnow()
+        history = leaderboard_as_of(read_session(), as_of, limit)
+    else:
+        history = fragment_cache.get_or_set(cache_key(f'leaderboard_as_of:{as_of.isoformat()}:{limit}', RATINGS),
+                                            lambda: leaderboard_as_of(read_session(), as_of, limit))
+    return jsonify({'as_of': as_of.isoformat(), 'players': history})
+
+@analytics_bp.route('/api/metagame/trend')
+def metagame_trend_api():
+    """
+    Deck usage share, top-cut conversion and win rate over time.
+    ?group=deck|archetype, ?period=tournament|season, ?start=&end= ISO dates,
+    ?deck= (repeatable) or the ?limit= most-played, ?nature= tag filter
+    (on the archetype deck's own tags when grouped by archetype)
+    """
+    group = request.args.get('group', 'deck')
+    period = request.args.get('period', 'tournament')
+    if group not in GROUPS or period not in PERIODS:
+        abort(400)
+    try:
+        start, end = (date.fromisoformat(request.args[name]) if request.args.get(name) else None
+                      for name in ('start', 'end'))
+    except ValueError:
+        abort(400)
+    deck_ids = sorted(set(request.args.getlist('deck', type=int)))
+    nature = request.args.get('nature') or None
+    limit = max(1, min(request.args.get('limit', TREND_DEFAULT_LIMIT, type=int), 50))
+
+    # Metagame rows change when a tournament is rated or results are imported; names and tags with the decks
+    key = cache_key(f'metagame_trend:{group}:{period}:{start}:{end}:{deck_ids}:{nature}:{limit}',
+                    METAGAME, DECKS)
+    series = fragment_cache.get_or_set(key, lambda: metagame_trend(
+        read_session(), group, period, deck_ids, start, end, nature, limit))
+    return jsonify({'group': group, 'period': period,
+                    'start': start.isoformat() if start else None, 'end': end.isoformat() if end else None,
+                    'series': series})
+
+@analytics_bp.route('/api/metagame/seasons/<int:season_id>')
+def metagame_season_api(season_id):
+    """One season's metagame breakdown by deck, most played first"""
+    session = read_session()
+    season = session.get(Season, season_id)
+    if season is None:
+        abort(404)
+    rows = (session.query(MetagameSeason, Deck.name)
+            .join(Deck, Deck.id == MetagameSeason.deck_id)
+            .filter(MetagameSeason.season_id == season_id)
+            .order_by(MetagameSeason.entries.desc(), MetagameSeason.deck_id)
+            .all())
+    return jsonify({'season_id': season_id, 'name': season.name, 'decks': [{
+        'deck_id': row.deck_id, 'name': name, 'archetype_id': row.archetype_id,
+        'tournaments': row.tournaments, 'entries': row.entries, 'top_cut': row.top_cut,
+        'wins': row.wins, 'losses': row.losses, 'ties': row.ties,
+        'share': row.share, 'conversion': row.conversion, 'win_rate': row.win_rate,
+    } for row, name in rows]})
+
+@analytics_bp.route('/export/<dataset>.<fmt>')
+@login_required
+def export_dataset(dataset, fmt):
+    """Stream a raw table as NDJSON or CSV; ?since=ISO-timestamp for incremental pulls"""
+    if dataset not in DATASETS or fmt not in STREAMERS:
+        abort(404)
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError:
+        abort(400)
+    # Rows are bounded a settle window behind the request time; pass X-Export-Until as the next since
+    until = export_until()
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    body = STREAMERS[fmt](read_session(), dataset, since, until)
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={dataset}.{fmt}',
+        'X-Export-Until': until.isoformat()
+    })
@@ -0,0 +1,157 @@
+"""
+Static asset pipeline
+build_assets() copies every file under the static folder to
+build/<path>.<content hash>.<ext>, writes .gz (and .br when the brotli
+package is installed) siblings for text assets, and records the mapping in
+build/manifest.json. Templates call asset_url() instead of
+url_for('static', ...) to link the hashed name, which is served with a
+far-future immutable Cache-Control header and the best precompressed
+variant the client accepts. A repeat visit then needs no static requests.
+Without a manifest, asset_url() falls back to the plain static URL.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from typing import Dict, Optional
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# Encodings in order of preference, with the sibling file suffix
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(filename: str, digest: str) -> str:
+    """css/main.css -> css/main.<digest>.css"""
+    root, ext = os.path.splitext(filename)
+    return f'{root}.{digest}{ext}'
+
+
+def _compress(path: str):
+    """Write .gz/.br siblings of a file, keeping only variants that are smaller"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+def build_assets(static_root: str, build_dir: str = 'build', clean: bool = True) -> Dict[str, str]:
+    """
+    Fingerprint and precompress every file under static_root into
+    static_root/build_dir and write the manifest. Returns the manifest
+    ({source path: hashed path}, both relative to static_root).
+    """
+    output_root = os.path.join(static_root, build_dir)
+    if clean and os.path.isdir(output_root):
+        shutil.rmtree(output_root)
+    manifest = {}
+    for directory, subdirs, files in os.walk(static_root):
+        if os.path.abspath(directory) == os.path.abspath(static_root):
+            subdirs[:] = [d for d in subdirs if d != build_dir]
+        for name in sorted(files):
+            source = os.path.join(directory, name)
+            filename = os.path.relpath(source, static_root).replace(os.sep, '/')
+            target_name = f'{build_dir}/{hashed_name(filename, content_hash(source))}'
+            target = os.path.join(static_root, *target_name.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            if name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                _compress(target)
+            manifest[filename] = target_name
+    with open(os.path.join(output_root, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """The build manifest, re-read when the file changes (e.g. after a rebuild)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.files: Dict[str, str] = {}
+        self.hashed = frozenset()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return
+        files = {}
+        if mtime is not None:
+            with open(self.path, encoding='utf-8') as f:
+                files = json.load(f)
+        self.mtime, self.files, self.hashed = mtime, files, frozenset(files.values())
+
+    def lookup(self, filename: str) -> Optional[str]:
+        self.refresh()
+        return self.files.get(filename)
+
+    def is_hashed(self, filename: str) -> bool:
+        self.refresh()
+        return filename in self.hashed
+
+
+def asset_url(filename: str, **values) -> str:
+    """url_for('static', ...) for the fingerprinted copy of a file, when built"""
+    manifest = current_app.extensions.get('asset_manifest')
+    hashed = manifest.lookup(filename) if manifest is not None else None
+    return url_for('static', filename=hashed or filename, **values)
+
+
+def _accepted_encoding(static_root: str, filename: str) -> Optional[tuple]:
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(os.path.join(static_root, *(filename + suffix).split('/'))):
+            return encoding, suffix
+    return None
+
+
+def init_assets(app):
+    """Serve static files from STATIC_ROOT, with immutable caching for hashed names"""
+    static_root = app.config.get('STATIC_ROOT') or app.static_folder
+    app.static_folder = static_root
+    manifest = AssetManifest(os.path.join(static_root, app.config.get('ASSET_BUILD_DIR', 'build'), MANIFEST_NAME))
+    app.extensions['asset_manifest'] = manifest
+    app.jinja_env.globals['asset_url'] = asset_url
+    max_age = app.config.get('ASSET_MAX_AGE', 31536000)
+
+    def serve_static(filename):
+        if not manifest.is_hashed(filename):
+            return app.send_static_file(filename)
+        variant = _accepted_encoding(static_root, filename)
+        path = filename + variant[1] if variant else filename
+        response = send_from_directory(static_root, path, max_age=max_age,
+                                       mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if variant:
+            response.headers['Content-Encoding'] = variant[0]
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = serve_static
@@ -1,6 +1,5 @@
 from flask import Blueprint, redirect, url_for, session, request, current_app, render_template, flash
 from flask_login import login_user, logout_user, current_user, login_required
-from authlib.integrations.flask_client import OAuth
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Email, EqualTo, Length
@@ -8,18 +7,29 @@ from app.models import db, User
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
-oauth = OAuth()
 
 def init_oauth(app):
-    """Initialize OAuth with app context"""
-    oauth.init_app(app)
-    oauth.register(
-        name='google',
-        client_id=app.config['GOOGLE_CLIENT_ID'],
-        client_secret=app.config['GOOGLE_CLIENT_SECRET'],
-        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-        client_kwargs={'scope': 'openid email profile'},
-    )
+    """Initialize OAuth eagerly (optional - get_oauth() sets it up on first use)"""
+    with app.app_context():
+        get_oauth()
+
+def get_oauth():
+    """
+    OAuth registry for the current app, created on first use so authlib
+    is only imported by workers that actually handle a Google login.
+    """
+    oauth = current_app.extensions.get('authlib.integrations.flask_client')
+    if oauth is None:
+        from authlib.integrations.flask_client import OAuth
+        oauth = OAuth(current_app)
+        oauth.register(
+            name='google',
+            client_id=current_app.config['GOOGLE_CLIENT_ID'],
+            client_secret=current_app.config['GOOGLE_CLIENT_SECRET'],
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={'scope': 'openid email profile'},
+        )
+    return oauth
 
 # Forms
 class RegistrationForm(FlaskForm):
@@ -42,13 +52,13 @@ def login_google():
         return redirect(url_for('main.index'))
 
     redirect_uri = url_for('auth.google_callback', _external=True)
-    return oauth.google.authorize_redirect(redirect_uri)
+    return get_oauth().google.authorize_redirect(redirect_uri)
 
 @auth_bp.route('/auth/google/callback')
 def google_callback():
     """Handle Google OAuth callback"""
     try:
-        token = oauth.google.authorize_access_token()
+        token = get_oauth().google.authorize_access_token()
         user_info = token.get('userinfo')
 
         if not user_info:
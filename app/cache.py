@@ -0,0 +1,267 @@
+"""
+In-process caching
+A small thread-safe TTL cache for rendered fragments and hot lookups, plus
+named generations that are bumped when the underlying data changes.
+Cache keys embed the generation, so a bump invalidates every derived entry
+at once; stale entries simply age out.
+
+Generations live in the cache_generations table and are bumped in the same
+transaction as the change, so commits from worker.py or another web
+process invalidate this process's entries too. They are read once per
+request (or app context) on first use.
+
+Templates cache their heavy tables with the {% cache %} tag:
+
+    {% cache 'standings', tournament.id, tournament.current_round, depends='tournaments' %}
+        ...
+    {% endcache %}
+
+The body is rendered once per key and generation and then served as HTML.
+A tournament's own page keys its fragments on tournaments.cache_version
+instead, which only that tournament's changes bump, so a result reported
+in one tournament leaves every other tournament's page cached.
+Compiled templates are kept in a bytecode cache on disk, so new worker
+processes skip parsing and compiling.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+from flask import g, has_app_context
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from app.models import db, CacheGeneration, Tournament, TournamentPlayer, Match, Player, Deck, User
+
+# Generation names
+TOURNAMENTS = 'tournaments'
+RATINGS = 'ratings'
+PLAYER_NAMES = 'player_names'
+DECKS = 'decks'
+METAGAME = 'metagame'
+USERS = 'users'
+
+# Player columns that feed leaderboards and rating-derived views
+RATING_COLUMNS = ('name', 'elo', 'peak_elo', 'games_played', 'wins', 'losses', 'ties')
+DECK_RATING_COLUMNS = ('elo', 'games_played', 'wins')
+# Deck columns shown beside ratings or used to filter and group decks
+DECK_COLUMNS = ('name', 'parent_id', 'natures')
+
+# Models whose changes show up in tournament pages, standings and pairings
+TOURNAMENT_MODELS = (Tournament, TournamentPlayer, Match)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a timeout"""
+
+    def __init__(self, default_timeout=300, max_entries=1024):
+        self.default_timeout = default_timeout
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_set(self, key, factory, timeout=None):
+        """Return the cached value, building and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, timeout)
+        return value
+
+
+fragment_cache = TTLCache()
+
+
+
+def generations() -> Dict[str, int]:
+    """Every generation counter, read once per app context"""
+    if has_app_context() and 'cache_generations' in g:
+        return g.cache_generations
+    values = dict(db.session.execute(select(CacheGeneration.name, CacheGeneration.value)).all())
+    if has_app_context():
+        g.cache_generations = values
+    return values
+
+
+def generation(name: str) -> int:
+    """Current generation of a named data set"""
+    return generations().get(name, 0)
+
+
+def bump_generation(*names: str, session=None):
+    """Invalidate everything cached against the given generations when the session (db.session) commits"""
+    (session or db.session).info.setdefault('cache_generations', set()).update(names)
+
+
+def _write_generations(session, names):
+    """Increment the counters inside the committing transaction (sorted, so lock order is stable)"""
+    table = CacheGeneration.__table__
+    conn = session.connection()
+    for name in sorted(names):
+        updated = conn.execute(
+            table.update().where(table.c.name == name).values(value=table.c.value + 1)
+        ).rowcount
+        if not updated:
+            conn.execute(table.insert().values(name=name, value=1))
+
+
+def cache_key(prefix: str, *generation_names: str) -> str:
+    """Build a cache key that changes whenever any of the generations is bumped"""
+    return ':'.join([prefix] + [f'{name}{generation(name)}' for name in generation_names])
+
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache key_part, ... [, depends=generation or (generations)] %}...{% endcache %}
+    Caches the rendered body in fragment_cache under the key parts and the
+    current value of each generation it depends on.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts, kwargs = [], []
+        while parser.stream.current.type != 'block_end':
+            if parts or kwargs:
+                parser.stream.expect('comma')
+            if parser.stream.current.type == 'name' and parser.stream.look().type == 'assign':
+                key = next(parser.stream).value
+                next(parser.stream)
+                kwargs.append(nodes.Keyword(key, parser.parse_expression()))
+            else:
+                parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(parts)], kwargs), [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller, depends=()):
+        if isinstance(depends, str):
+            depends = (depends,)
+        key = cache_key('tpl:' + ':'.join(map(str, parts)), *depends)
+        return Markup(fragment_cache.get_or_set(key, lambda: str(caller())))
+
+
+def init_cache(app):
+    """Configure cache sizes from app config and set up template caching"""
+    fragment_cache.default_timeout = app.config.get('FRAGMENT_CACHE_TIMEOUT', 300)
+    fragment_cache.max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 1024)
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config.get('JINJA_BYTECODE_CACHE'):
+        directory = os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def _changed_generations(session):
+    """Generations affected by the pending changes in a session"""
+    changed = set()
+    for obj in session.new | session.deleted:
+        if isinstance(obj, TOURNAMENT_MODELS):
+            changed.add(TOURNAMENTS)
+        elif isinstance(obj, Player):
+            changed.update((RATINGS, PLAYER_NAMES))
+        elif isinstance(obj, Deck):
+            changed.add(DECKS)
+        elif isinstance(obj, User) and obj in session.deleted:
+            changed.add(USERS)
+    for obj in session.dirty:
+        if isinstance(obj, TOURNAMENT_MODELS) and session.is_modified(obj, include_collections=False):
+            changed.add(TOURNAMENTS)
+        elif isinstance(obj, Player):
+            state = inspect(obj)
+            if any(state.attrs[column].history.has_changes() for column in RATING_COLUMNS):
+                changed.add(RATINGS)
+            if state.attrs.name.history.has_changes():
+                changed.add(PLAYER_NAMES)
+        elif isinstance(obj, Deck):
+            state = inspect(obj)
+            if any(state.attrs[column].history.has_changes() for column in DECK_RATING_COLUMNS):
+                changed.add(RATINGS)
+            if any(state.attrs[column].history.has_changes() for column in DECK_COLUMNS):
+                changed.add(DECKS)
+        elif isinstance(obj, User) and session.is_modified(obj, include_collections=False):
+            changed.add(USERS)
+    return changed
+
+
+def _changed_tournaments(session):
+    """Ids of the tournaments whose row, participants or matches have pending changes"""
+    changed = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Tournament):
+            changed.add(obj.id)
+        elif isinstance(obj, (TournamentPlayer, Match)):
+            changed.add(obj.tournament_id)
+    changed.discard(None)
+    return changed
+
+
+def _write_tournament_versions(session, tournament_ids):
+    table = Tournament.__table__
+    session.connection().execute(
+        table.update().where(table.c.id.in_(sorted(tournament_ids)))
+        .values(cache_version=func.coalesce(table.c.cache_version, 0) + 1)
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_invalidations(session, flush_context):
+    session.info.setdefault('cache_generations', set()).update(_changed_generations(session))
+    session.info.setdefault('cache_tournaments', set()).update(_changed_tournaments(session))
+
+
+@event.listens_for(Session, 'before_commit')
+def _apply_invalidations(session):
+    # Flush first: changes flushed by commit itself would otherwise be missed
+    session.flush()
+    changed = session.info.pop('cache_generations', None)
+    if changed:
+        _write_generations(session, changed)
+    tournaments = session.info.pop('cache_tournaments', None)
+    if tournaments:
+        _write_tournament_versions(session, tournaments)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_generations(session):
+    if has_app_context():
+        g.pop('cache_generations', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('cache_generations', None)
+    session.info.pop('cache_tournaments', None)
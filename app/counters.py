@@ -0,0 +1,117 @@
+"""
+Dashboard counters
+Keeps the dashboard counts of users, tournaments, players and matches in
+step with inserts and deletes. Each flush that adds or removes such rows
+inserts a site_counter_deltas row in the same transaction, so writers never
+queue on one hot counters row. Reads add the pending deltas to the
+site_counters row. The counters.fold job folds them in after each rated
+tournament, and a read that finds more than FOLD_THRESHOLD pending rows
+folds them itself, so sites without completed tournaments stay bounded too.
+refresh_counters() recounts from scratch for drift from raw SQL.
+"""
+from datetime import datetime
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app.jobs import task
+from app.models import db, User, Tournament, Player, Match, SiteCounters, SiteCounterDelta
+
+SITE_COUNTERS_ID = 1
+FOLD_COUNTERS = 'counters.fold'
+FOLD_THRESHOLD = 1000  # pending delta rows that make a read fold them
+
+COUNTED_MODELS = {
+    User: 'users',
+    Tournament: 'tournaments',
+    Player: 'players',
+    Match: 'matches',
+}
+
+
+def count_rows(conn) -> dict:
+    """Full COUNT(*) of every counted table"""
+    return {
+        column: conn.execute(select(func.count()).select_from(model.__table__)).scalar()
+        for model, column in COUNTED_MODELS.items()
+    }
+
+
+def refresh_counters(conn):
+    """Recount every table and write the counters row, dropping pending deltas (caller commits)"""
+    table = SiteCounters.__table__
+    conn.execute(SiteCounterDelta.__table__.delete())
+    values = {**count_rows(conn), 'refreshed_at': datetime.utcnow()}
+    updated = conn.execute(table.update().where(table.c.id == SITE_COUNTERS_ID).values(**values)).rowcount
+    if not updated:
+        conn.execute(table.insert().values(id=SITE_COUNTERS_ID, **values))
+    return values
+
+
+def get_counters() -> SiteCounters:
+    """
+    Dashboard counts (a transient SiteCounters) from the counters row plus
+    pending deltas in one query, recounting if the row is missing and
+    folding the deltas once more than FOLD_THRESHOLD are pending
+    """
+    table, deltas = SiteCounters.__table__, SiteCounterDelta.__table__
+    columns = list(COUNTED_MODELS.values())
+    pending = select(func.count()).select_from(deltas).scalar_subquery().label('pending')
+    stmt = select(table.c.refreshed_at, pending, *(
+        (table.c[column] + select(func.coalesce(func.sum(deltas.c[column]), 0)).scalar_subquery()).label(column)
+        for column in columns
+    )).where(table.c.id == SITE_COUNTERS_ID)
+    row = db.session.execute(stmt).first()
+    if row is None:
+        refresh_counters(db.session.connection())
+        db.session.commit()
+        row = db.session.execute(stmt).first()
+    elif row.pending > FOLD_THRESHOLD:
+        # Totals are unchanged by folding, so the row just read stays valid
+        fold_counter_deltas(db.session.connection())
+        db.session.commit()
+    return SiteCounters(id=SITE_COUNTERS_ID, refreshed_at=row.refreshed_at,
+                        **{column: row._mapping[column] for column in columns})
+
+
+def fold_counter_deltas(conn) -> int:
+    """
+    Add pending deltas to the counters row and delete them (caller commits).
+    DELETE ... RETURNING claims each delta row once, so concurrent folds
+    cannot count a row twice. Returns the number of deltas folded.
+    """
+    deltas = SiteCounterDelta.__table__
+    columns = list(COUNTED_MODELS.values())
+    rows = conn.execute(deltas.delete().returning(*(deltas.c[column] for column in columns))).all()
+    totals = {column: sum(row[i] for row in rows) for i, column in enumerate(columns)}
+    totals = {column: total for column, total in totals.items() if total}
+    if totals:
+        table = SiteCounters.__table__
+        conn.execute(
+            table.update()
+            .where(table.c.id == SITE_COUNTERS_ID)
+            .values({column: table.c[column] + total for column, total in totals.items()})
+        )
+    return len(rows)
+
+
+@task(FOLD_COUNTERS)
+def fold_counters():
+    """Fold pending dashboard counter deltas into the counters row"""
+    fold_counter_deltas(db.session.connection())
+
+
+def _pending_deltas(session) -> dict:
+    deltas = dict.fromkeys(COUNTED_MODELS.values(), 0)
+    for objects, step in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            column = COUNTED_MODELS.get(type(obj))
+            if column:
+                deltas[column] += step
+    return {column: delta for column, delta in deltas.items() if delta}
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_counter_deltas(session, flush_context):
+    deltas = _pending_deltas(session)
+    if not deltas:
+        return
+    session.connection().execute(SiteCounterDelta.__table__.insert().values(**deltas))
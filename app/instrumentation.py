@@ -0,0 +1,166 @@
+"""
+Per-request SQL instrumentation
+Opt-in (SQL_INSTRUMENTATION = True). Hooks SQLAlchemy cursor events and
+the Flask request/template lifecycle to record, per request, the query
+count, total SQL time, template render time and slowest statements.
+Records are kept in a bounded in-memory ring buffer per process and
+summarized per endpoint for the admin dashboard.
+"""
+import heapq
+import threading
+import time
+from collections import deque, defaultdict
+from datetime import datetime
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from app.models import db
+
+STATEMENT_PREVIEW_LENGTH = 300
+
+
+class RequestLog:
+    """Thread-safe ring buffer of per-request profiles"""
+
+    def __init__(self, maxlen=500):
+        self._records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def resize(self, maxlen):
+        with self._lock:
+            self._records = deque(self._records, maxlen=maxlen)
+
+    def append(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+request_log = RequestLog()
+
+
+def summarize(records=None):
+    """Aggregate records per endpoint, slowest average SQL time first"""
+    records = request_log.records() if records is None else records
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[record['endpoint']].append(record)
+
+    summary = []
+    for endpoint, rows in grouped.items():
+        n = len(rows)
+        slowest = sorted((s for r in rows for s in r['slowest']), key=lambda s: s['ms'], reverse=True)
+        summary.append({
+            'endpoint': endpoint,
+            'requests': n,
+            'avg_queries': sum(r['sql_count'] for r in rows) / n,
+            'max_queries': max(r['sql_count'] for r in rows),
+            'avg_sql_ms': sum(r['sql_ms'] for r in rows) / n,
+            'avg_render_ms': sum(r['render_ms'] for r in rows) / n,
+            'avg_total_ms': sum(r['total_ms'] for r in rows) / n,
+            'slowest': slowest[:3]
+        })
+    summary.sort(key=lambda s: s['avg_sql_ms'], reverse=True)
+    return summary
+
+
+def _profile():
+    """Current request's profile, or None outside an instrumented request"""
+    if not has_request_context():
+        return None
+    return g.get('sql_profile')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the execution context, so a statement that
+    # raises (and never reaches after_cursor_execute) leaves nothing behind
+    if context is not None and _profile() is not None:
+        context.sql_profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile()
+    start = getattr(context, 'sql_profile_start', None)
+    if profile is None or start is None:
+        return
+    elapsed = (time.perf_counter() - start) * 1000
+    profile['sql_count'] += 1
+    profile['sql_ms'] += elapsed
+    # Min-heap of the slowest statements; the sequence number breaks ties
+    entry = (elapsed, profile['sql_count'], statement)
+    if len(profile['slowest']) < profile['slow_count']:
+        heapq.heappush(profile['slowest'], entry)
+    elif profile['slowest'] and elapsed > profile['slowest'][0][0]:
+        heapq.heapreplace(profile['slowest'], entry)
+
+
+def _before_render(sender, template, context, **extra):
+    profile = _profile()
+    if profile is not None:
+        profile['render_starts'].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    profile = _profile()
+    if profile is not None and profile['render_starts']:
+        start = profile['render_starts'].pop()
+        # Only count the outermost render so nested renders are not double counted
+        if not profile['render_starts']:
+            profile['render_ms'] += (time.perf_counter() - start) * 1000
+
+
+def init_instrumentation(app):
+    """Attach engine and request hooks when SQL_INSTRUMENTATION is enabled"""
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return
+    request_log.resize(app.config.get('SQL_INSTRUMENTATION_BUFFER', 500))
+    slow_count = app.config.get('SQL_INSTRUMENTATION_SLOWEST', 5)
+
+    with app.app_context():
+        engines = [db.engine]
+    if 'sqlite_read_engine' in app.extensions:
+        engines.append(app.extensions['sqlite_read_engine'])
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_profile():
+        g.sql_profile = {
+            'started': time.perf_counter(),
+            'sql_count': 0,
+            'sql_ms': 0.0,
+            'render_ms': 0.0,
+            'render_starts': [],
+            'slow_count': slow_count,
+            'slowest': []
+        }
+
+    @app.after_request
+    def record_profile(response):
+        profile = g.pop('sql_profile', None)
+        if profile is None or request.endpoint == 'static':
+            return response
+        slowest = sorted(profile['slowest'], reverse=True)
+        request_log.append({
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'endpoint': request.endpoint or request.path,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': (time.perf_counter() - profile['started']) * 1000,
+            'sql_count': profile['sql_count'],
+            'sql_ms': profile['sql_ms'],
+            'render_ms': profile['render_ms'],
+            'slowest': [{'ms': ms, 'statement': statement[:STATEMENT_PREVIEW_LENGTH]} for ms, _, statement in slowest]
+        })
+        return response
@@ -0,0 +1,271 @@
+"""
+Background jobs
+A small job queue stored in the jobs table, so slow post-tournament work
+runs outside the request without an external broker. Tasks register with
+@task(name) and are enqueued in the caller's transaction. A job therefore
+only becomes visible once the change that triggered it commits.
+
+Workers claim jobs with a conditional UPDATE, so any number of worker
+threads and processes can share one queue. A claim is a lease
+(locked_until) that the running worker renews from a heartbeat thread;
+only jobs whose lease ran out, because their worker died, go back to the
+queue. A task and its job status commit together, and only while the
+worker still holds the lease, which makes retries safe. Failed attempts
+are retried with exponential backoff up to max_attempts.
+
+Due jobs are claimed by priority, then in FIFO order. Urgent jobs (round
+pairings an organizer is waiting on) also have their own worker lane that
+claims nothing else, so a bulk import or ELO replay already running in the
+regular lane cannot hold them back.
+"""
+import json
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Job
+
+DEFAULT_MAX_ATTEMPTS = 3
+PRIORITY_NORMAL = 0
+PRIORITY_URGENT = 10
+ERROR_MAX_LENGTH = 4000
+
+TASKS: Dict[str, Callable] = {}
+
+
+def task(name: str):
+    """
+    Register a function as a job task; it receives the job payload as keyword
+    arguments. A JSON-serializable return value is stored as the job result.
+    """
+    def decorator(f):
+        TASKS[name] = f
+        return f
+    return decorator
+
+
+def enqueue(name: str, payload: Optional[dict] = None, idempotency_key: Optional[str] = None,
+            max_attempts: int = DEFAULT_MAX_ATTEMPTS, priority: int = PRIORITY_NORMAL) -> Job:
+    """
+    Add a job to the current session (caller commits).
+    With an idempotency key, an existing job with that key is returned instead.
+    """
+    if name not in TASKS:
+        raise LookupError(f'unknown task: {name}')
+    if idempotency_key:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+
+    job = Job(name=name, payload=json.dumps(payload or {}), idempotency_key=idempotency_key,
+              max_attempts=max_attempts, priority=priority)
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        # Another request enqueued the same key first
+        return Job.query.filter_by(idempotency_key=idempotency_key).one()
+    return job
+
+
+def lease_seconds() -> int:
+    return current_app.config.get('JOB_LEASE', 60)
+
+
+def claim_next(worker_id: str, min_priority: Optional[int] = None) -> Optional[int]:
+    """
+    Mark the next due job (highest priority first) as running for this
+    worker and return its id; min_priority restricts the claim to a lane
+    """
+    now = datetime.utcnow()
+
+    # Jobs whose worker stopped renewing the lease go back to the queue (or fail when out of attempts)
+    db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_until < now, Job.attempts < Job.max_attempts)
+        .values(status='queued', locked_by=None, locked_until=None)
+    )
+    db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_until < now, Job.attempts >= Job.max_attempts)
+        .values(status='failed', finished_at=now, last_error='Timed out', locked_until=None)
+    )
+
+    due = select(Job.id).where(Job.status == 'queued', Job.run_after <= now)
+    if min_priority is not None:
+        due = due.where(Job.priority >= min_priority)
+    job_id = db.session.scalar(due.order_by(Job.priority.desc(), Job.run_after, Job.id).limit(1))
+    claimed = job_id is not None and db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == 'queued')
+        .values(status='running', locked_by=worker_id, started_at=now, attempts=Job.attempts + 1,
+                locked_until=now + timedelta(seconds=lease_seconds()))
+    ).rowcount == 1
+    db.session.commit()
+    return job_id if claimed else None
+
+
+class Heartbeat:
+    """Renews a running job's lease on its own connection every third of the lease"""
+
+    def __init__(self, job_id: int, worker_id: str):
+        self.app = current_app._get_current_object()
+        self.engine = db.engine
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease = lease_seconds()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=f'job-heartbeat-{job_id}', daemon=True)
+
+    def _loop(self):
+        jobs = Job.__table__
+        while not self._stop.wait(self.lease / 3):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        jobs.update()
+                        .where(jobs.c.id == self.job_id, jobs.c.status == 'running',
+                               jobs.c.locked_by == self.worker_id)
+                        .values(locked_until=datetime.utcnow() + timedelta(seconds=self.lease))
+                    )
+            except Exception:
+                # A missed renewal is retried next beat; the lease check at commit keeps it safe
+                self.app.logger.warning(f'Job {self.job_id} lease renewal failed', exc_info=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def finish(job_id: int, worker_id: str, **values) -> bool:
+    """Set a job's final state if this worker still holds its lease (caller commits)"""
+    return db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == 'running', Job.locked_by == worker_id)
+        .values(locked_until=None, **values)
+    ).rowcount == 1
+
+
+def run_job(job_id: int, worker_id: str):
+    """
+    Execute a claimed job; the task's changes and the job status commit
+    together. If the lease was lost meanwhile, both are rolled back.
+    """
+    job = db.session.get(Job, job_id)
+    name = job.name
+    try:
+        f = TASKS.get(name)
+        if f is None:
+            raise LookupError(f'unknown task: {name}')
+        with Heartbeat(job_id, worker_id):
+            value = f(**json.loads(job.payload))
+        result = json.dumps(value) if value is not None else None
+        if not finish(job_id, worker_id, status='succeeded', last_error=None, result=result,
+                      finished_at=datetime.utcnow()):
+            db.session.rollback()
+            current_app.logger.warning(f"Job {job_id} ({name}) lost its lease; its changes were discarded")
+            return
+        db.session.commit()
+    except Exception:
+        error = traceback.format_exc()[-ERROR_MAX_LENGTH:]
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        if job.attempts < job.max_attempts:
+            delay = current_app.config.get('JOB_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+            values = {'status': 'queued', 'run_after': datetime.utcnow() + timedelta(seconds=delay)}
+        else:
+            values = {'status': 'failed', 'finished_at': datetime.utcnow()}
+        if not finish(job_id, worker_id, last_error=error, locked_by=None, **values):
+            db.session.rollback()
+            return
+        db.session.commit()
+        current_app.logger.error(f"Job {job_id} ({name}) attempt {job.attempts} failed:\n{error}")
+
+
+class JobWorker:
+    """Pool of threads that poll the jobs table and run due jobs (of at least min_priority)"""
+
+    def __init__(self, app, threads: int = 1, poll_interval: float = 2.0, min_priority: Optional[int] = None):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.min_priority = min_priority
+        self.lane = 'job-worker' if min_priority is None else 'job-urgent'
+        self._stop = threading.Event()
+        self._threads = []
+
+    def worker_id(self) -> str:
+        return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'[:100]
+
+    def run_pending(self) -> int:
+        """Run due jobs in the calling thread until the queue is empty; returns the number run"""
+        count = 0
+        while not self._stop.is_set():
+            with self.app.app_context():
+                worker_id = self.worker_id()
+                job_id = claim_next(worker_id, self.min_priority)
+                if job_id is None:
+                    return count
+                run_job(job_id, worker_id)
+            count += 1
+        return count
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                self.app.logger.exception('Job worker poll failed')
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._loop, name=f'{self.lane}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+def init_jobs(app):
+    """
+    Start in-process worker threads on the first request when
+    JOB_WORKER_THREADS > 0, plus JOB_URGENT_THREADS for urgent jobs.
+    Starting lazily keeps threads out of the reloader parent and out of
+    pre-fork masters. Production runs worker.py processes instead.
+    """
+    threads = app.config.get('JOB_WORKER_THREADS', 0)
+    if not threads:
+        return
+    urgent_threads = app.config.get('JOB_URGENT_THREADS', 1)
+    poll_interval = app.config.get('JOB_POLL_INTERVAL', 2)
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_job_worker():
+        if 'job_workers' in app.extensions:
+            return
+        with lock:
+            if 'job_workers' not in app.extensions:
+                workers = [JobWorker(app, threads, poll_interval)]
+                if urgent_threads:
+                    workers.append(JobWorker(app, urgent_threads, poll_interval, min_priority=PRIORITY_URGENT))
+                for worker in workers:
+                    worker.start()
+                app.extensions['job_workers'] = workers
@@ -3,17 +3,60 @@ Main routes - home page and general pages
 """
 from flask import render_template, jsonify
 from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy.orm import undefer
 from app.main import main_bp
+from app.models import db, User, Tournament, Player
+from app.cache import fragment_cache, cache_key, TOURNAMENTS, RATINGS
+
+UPCOMING_LIMIT = 3
+TOP_PLAYERS_LIMIT = 5
+
+
+def render_live_fragment():
+    """Live tournaments with participant counts from one aggregate subquery"""
+    live = (
+        Tournament.query
+        .options(undefer(Tournament.participant_count))
+        .filter(Tournament.status == 'live')
+        .order_by(Tournament.date, Tournament.id)
+        .all()
+    )
+    return render_template('fragments/home_live.html', live=live)
+
+
+def render_upcoming_fragment():
+    """Next upcoming tournaments with organizer names joined in"""
+    upcoming = (
+        db.session.query(Tournament, User.username)
+        .join(User, Tournament.organizer_id == User.id)
+        .filter(Tournament.status == 'upcoming')
+        .order_by(Tournament.date, Tournament.id)
+        .limit(UPCOMING_LIMIT)
+        .all()
+    )
+    return render_template('fragments/home_upcoming.html', upcoming=upcoming)
+
+
+def render_top_players_fragment():
+    """Top players by ELO"""
+    top_players = Player.query.order_by(Player.elo.desc()).limit(TOP_PLAYERS_LIMIT).all()
+    return render_template('fragments/home_top_players.html', top_players=top_players)
+
+
+def cached_fragment(name, render, *generations):
+    """Rendered HTML for a home page fragment, cached until its data changes"""
+    html = fragment_cache.get_or_set(cache_key(f'home:{name}', *generations), render)
+    return Markup(html)
+
 
 @main_bp.route('/')
 def index():
     """Home page with tournament highlights and top players"""
-    # TODO: Fetch live and upcoming tournaments from database
-    # TODO: Fetch top players by ELO
     return render_template('index.html',
-                          live=[],
-                          upcoming=[],
-                          top_players=[])
+                          live_html=cached_fragment('live', render_live_fragment, TOURNAMENTS),
+                          upcoming_html=cached_fragment('upcoming', render_upcoming_fragment, TOURNAMENTS),
+                          top_players_html=cached_fragment('top_players', render_top_players_fragment, RATINGS))
 
 @main_bp.route('/debug/user')
 def debug_user():
@@ -0,0 +1,340 @@
+"""
+Schema migrations
+Numbered, idempotent schema steps recorded in the schema_migrations table.
+Every step uses portable DDL so the same migrations run on SQLite and PostgreSQL.
+"""
+from datetime import date, datetime, timedelta
+from typing import Callable, List, NamedTuple, Optional
+from sqlalchemy import func, inspect, or_, select, text, tuple_
+from sqlalchemy.schema import CreateIndex
+from app.models import (db, User, Season, Player, Deck, Tournament, TournamentPlayer, Match, ELOHistory,
+                        HeadToHead, SiteCounters, Job, ELOHistorySummary, ELOHistoryArchive, DeckNature,
+                        MetagameTournament, MetagameSeason, CacheGeneration,
+                        SiteCounterDelta, ExportTombstone, RatingCheckpoint)
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(200), nullable=False),
+    db.Column('applied_at', db.DateTime, default=datetime.utcnow)
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a schema step. Steps must be safe to re-run on a partially migrated database."""
+    def decorator(f):
+        MIGRATIONS.append(Migration(version, description, f))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return f
+    return decorator
+
+
+def create_indexes(conn, *indexes):
+    """CREATE INDEX IF NOT EXISTS for each index (supported by SQLite and PostgreSQL 9.5+)"""
+    for index in indexes:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def get_index(model, name):
+    return next(index for index in model.__table__.indexes if index.name == name)
+
+
+def add_column(conn, model, name) -> bool:
+    """ALTER TABLE ... ADD COLUMN for a model column the table lacks; False when it already exists"""
+    table = model.__table__
+    if name in {column['name'] for column in inspect(conn).get_columns(table.name)}:
+        return False
+    column = table.c[name]
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    return True
+
+
+@migration(1, 'Baseline schema')
+def _baseline(conn):
+    db.metadata.create_all(conn, tables=[
+        User.__table__, Season.__table__, Player.__table__, Deck.__table__,
+        Tournament.__table__, TournamentPlayer.__table__, Match.__table__, ELOHistory.__table__
+    ])
+
+
+@migration(2, 'Indexes for hot query paths')
+def _hot_path_indexes(conn):
+    create_indexes(
+        conn,
+        get_index(Match, 'ix_matches_tournament_round'),
+        get_index(ELOHistory, 'ix_elo_history_player_timestamp'),
+        get_index(TournamentPlayer, 'ix_tournament_players_player'),
+        get_index(TournamentPlayer, 'ix_tournament_players_tournament_player'),
+        get_index(Player, 'ix_players_elo'),
+        get_index(Deck, 'ix_decks_elo'),
+    )
+
+
+@migration(3, 'Tournament status/date index for home page and list filters')
+def _tournament_status_index(conn):
+    create_indexes(conn, get_index(Tournament, 'ix_tournaments_status_date'))
+
+
+@migration(4, 'Tournament date index for keyset pagination')
+def _tournament_date_index(conn):
+    create_indexes(conn, get_index(Tournament, 'ix_tournaments_date'))
+
+
+@migration(5, 'Head-to-head aggregate table')
+def _head_to_head(conn):
+    from app.analytics import head_to_head
+    HeadToHead.__table__.create(conn, checkfirst=True)
+    head_to_head.rebuild(conn)
+
+
+@migration(6, 'Dashboard counters table and recent users index')
+def _site_counters(conn):
+    from app.counters import refresh_counters
+    SiteCounters.__table__.create(conn, checkfirst=True)
+    # refresh_counters() clears pending deltas; their table is otherwise added by migration 13
+    SiteCounterDelta.__table__.create(conn, checkfirst=True)
+    create_indexes(conn, get_index(User, 'ix_users_created_at'))
+    refresh_counters(conn)
+
+
+@migration(7, 'Background job queue table')
+def _jobs(conn):
+    Job.__table__.create(conn, checkfirst=True)
+
+
+@migration(8, 'ELO history summary and archive tables for compaction')
+def _elo_history_compaction(conn):
+    ELOHistorySummary.__table__.create(conn, checkfirst=True)
+    ELOHistoryArchive.__table__.create(conn, checkfirst=True)
+
+
+@migration(9, 'Match indexes on ELO history for opponent lookups')
+def _elo_history_match_indexes(conn):
+    create_indexes(conn, get_index(ELOHistory, 'ix_elo_history_match'),
+                   get_index(ELOHistoryArchive, 'ix_elo_history_archive_match'))
+
+
+@migration(10, 'Deck nature tag table, filled from decks.natures')
+def _deck_natures(conn):
+    from app.analytics.deck_natures import rebuild_deck_natures
+    DeckNature.__table__.create(conn, checkfirst=True)
+    rebuild_deck_natures(conn)
+
+
+@migration(11, 'Metagame tables per deck and tournament/season, filled from completed tournaments')
+def _metagame(conn):
+    from sqlalchemy.orm import Session
+    from app.analytics.metagame import rebuild_metagame
+    MetagameTournament.__table__.create(conn, checkfirst=True)
+    MetagameSeason.__table__.create(conn, checkfirst=True)
+    rebuild_metagame(Session(bind=conn))
+
+
+@migration(12, 'Shared cache generation counters')
+def _cache_generations(conn):
+    from app.cache import TOURNAMENTS, RATINGS, PLAYER_NAMES
+    CacheGeneration.__table__.create(conn, checkfirst=True)
+    # create_all() or an earlier bump may have written some of the rows already
+    existing = set(conn.execute(select(CacheGeneration.name)).scalars())
+    missing = [name for name in (TOURNAMENTS, RATINGS, PLAYER_NAMES) if name not in existing]
+    if missing:
+        conn.execute(CacheGeneration.__table__.insert(), [{'name': name, 'value': 0} for name in missing])
+
+
+@migration(13, 'Dashboard counter delta rows')
+def _site_counter_deltas(conn):
+    SiteCounterDelta.__table__.create(conn, checkfirst=True)
+
+
+@migration(14, 'Write-time updated_at on exported tables and export tombstones')
+def _export_cursor(conn):
+    # Existing rows are stamped with the time they describe, the best guess at when they were written
+    tournament_time = (select(func.coalesce(Tournament.completed_at, Tournament.created_at))
+                       .where(Tournament.id == TournamentPlayer.tournament_id).scalar_subquery())
+    backfill = (
+        (Match, func.coalesce(Match.completed_at, Match.created_at), 'ix_matches_updated_at'),
+        (TournamentPlayer, tournament_time, 'ix_tournament_players_updated_at'),
+        (Deck, Deck.created_at, 'ix_decks_updated_at'),
+        (ELOHistory, ELOHistory.timestamp, 'ix_elo_history_updated_at'),
+        (ELOHistorySummary, ELOHistorySummary.timestamp, 'ix_elo_history_summary_updated_at'),
+        (ELOHistoryArchive, ELOHistoryArchive.timestamp, None),
+    )
+    now = datetime.utcnow()
+    for model, written_at, index_name in backfill:
+        if add_column(conn, model, 'updated_at'):
+            table = model.__table__
+            conn.execute(table.update().values(updated_at=func.coalesce(written_at, now)))
+        if index_name:
+            create_indexes(conn, get_index(model, index_name))
+    ExportTombstone.__table__.create(conn, checkfirst=True)
+
+
+@migration(15, 'Job leases and tournament rating markers')
+def _job_leases(conn):
+    from app.jobs import lease_seconds
+    if add_column(conn, Job, 'locked_until'):
+        # Jobs running now keep their claim for one lease, then requeue if their worker is gone
+        conn.execute(Job.__table__.update().where(Job.status == 'running')
+                     .values(locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds())))
+    if add_column(conn, Tournament, 'rated_at'):
+        rated = or_(select(ELOHistory.id).where(ELOHistory.tournament_id == Tournament.id).exists(),
+                    select(ELOHistorySummary.id).where(ELOHistorySummary.tournament_id == Tournament.id).exists())
+        conn.execute(Tournament.__table__.update()
+                     .where(Tournament.status == 'completed', rated)
+                     .values(rated_at=func.coalesce(Tournament.completed_at, Tournament.created_at)))
+
+
+@migration(16, 'Job results for pairing tickets')
+def _job_results(conn):
+    add_column(conn, Job, 'result')
+
+
+@migration(17, 'Per-tournament rating checkpoints for as-of leaderboards')
+def _rating_checkpoints(conn):
+    from app.analytics.rating_as_of import record_checkpoints
+    RatingCheckpoint.__table__.create(conn, checkfirst=True)
+    create_indexes(conn, get_index(ELOHistory, 'ix_elo_history_tournament'))
+    record_checkpoints(conn)
+
+
+@migration(18, 'Job priorities for the urgent worker lane')
+def _job_priorities(conn):
+    if add_column(conn, Job, 'priority'):
+        conn.execute(Job.__table__.update().values(priority=0))
+
+
+@migration(19, 'Per-tournament cache versions for tournament page fragments')
+def _tournament_cache_versions(conn):
+    if add_column(conn, Tournament, 'cache_version'):
+        conn.execute(Tournament.__table__.update().values(cache_version=0))
+
+
+def current_version(conn) -> int:
+    """Highest applied migration version, 0 for an unmanaged database"""
+    schema_migrations.create(conn, checkfirst=True)
+    versions = conn.execute(select(schema_migrations.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def upgrade(target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply pending migrations up to target (default: latest).
+    Each step runs in its own transaction together with its version record.
+    Returns the migrations that were applied.
+    """
+    applied = []
+    for step in MIGRATIONS:
+        if target is not None and step.version > target:
+            break
+        with db.engine.begin() as conn:
+            if step.version <= current_version(conn):
+                continue
+            step.apply(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=step.version,
+                description=step.description,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(step)
+    return applied
+
+
+def status() -> List[dict]:
+    """List every known migration with whether it has been applied"""
+    with db.engine.begin() as conn:
+        version = current_version(conn)
+    return [
+        {'version': m.version, 'description': m.description, 'applied': m.version <= version}
+        for m in MIGRATIONS
+    ]
+
+
+# Hot queries and the index each one is expected to use
+HOT_QUERIES = [
+    ('Matches by tournament round', 'ix_matches_tournament_round',
+     lambda: select(Match).where(Match.tournament_id == 1, Match.round_number == 1)),
+    ('Player ELO history', 'ix_elo_history_player_timestamp',
+     lambda: select(ELOHistory).where(ELOHistory.player_id == 1)
+     .order_by(ELOHistory.timestamp.desc()).limit(50)),
+    ('Player tournament participations', 'ix_tournament_players_player',
+     lambda: select(TournamentPlayer).where(TournamentPlayer.player_id == 1)),
+    ('Tournament participant lookup', 'ix_tournament_players_tournament_player',
+     lambda: select(TournamentPlayer).where(TournamentPlayer.tournament_id == 1,
+                                            TournamentPlayer.player_id == 1)),
+    ('Player leaderboard', 'ix_players_elo',
+     lambda: select(Player).order_by(Player.elo.desc()).limit(100)),
+    ('Deck leaderboard', 'ix_decks_elo',
+     lambda: select(Deck).order_by(Deck.elo.desc()).limit(20)),
+    ('Tournaments by status', 'ix_tournaments_status_date',
+     lambda: select(Tournament).where(Tournament.status == 'upcoming').order_by(Tournament.date).limit(3)),
+    ('Tournament list page', 'ix_tournaments_date',
+     lambda: select(Tournament).where(tuple_(Tournament.date, Tournament.id) < tuple_(date(2025, 1, 1), 1))
+     .order_by(Tournament.date.desc(), Tournament.id.desc()).limit(30)),
+    ('Job queue polling', 'ix_jobs_status_run_after',
+     lambda: select(Job.id).where(Job.status == 'queued', Job.run_after <= datetime(2025, 1, 1))
+     .order_by(Job.priority.desc(), Job.run_after, Job.id).limit(1)),
+    ('Recent users', 'ix_users_created_at',
+     lambda: select(User).order_by(User.created_at.desc()).limit(10)),
+    ('ELO history rows of a match', 'ix_elo_history_match',
+     lambda: select(ELOHistory).where(ELOHistory.match_id == 1)),
+    ('Decks by nature', 'ix_deck_natures_name_deck',
+     lambda: select(DeckNature.deck_id).where(DeckNature.name == 'Meta Deck')),
+    ('Compacted rating as of', 'ix_elo_history_summary_player_timestamp',
+     lambda: select(ELOHistorySummary.id).where(ELOHistorySummary.player_id == 1,
+                                                ELOHistorySummary.timestamp <= datetime(2025, 1, 1))
+     .order_by(ELOHistorySummary.timestamp.desc()).limit(1)),
+    ('Rating checkpoints as of', 'ix_rating_checkpoints_timestamp',
+     lambda: select(RatingCheckpoint.player_id).where(RatingCheckpoint.timestamp <= datetime(2025, 1, 1))),
+    ('Raw history of a tournament', 'ix_elo_history_tournament',
+     lambda: select(ELOHistory.elo_after).where(ELOHistory.tournament_id == 1)),
+    ('Metagame trend of a deck', 'ix_metagame_tournament_deck_date',
+     lambda: select(MetagameTournament).where(MetagameTournament.deck_id == 1,
+                                              MetagameTournament.date >= date(2025, 1, 1))),
+    ('Incremental match export', 'ix_matches_updated_at',
+     lambda: select(Match.id).where(Match.updated_at > datetime(2025, 1, 1))),
+    ('Metagame trend of an archetype', 'ix_metagame_tournament_archetype_date',
+     lambda: select(MetagameTournament).where(MetagameTournament.archetype_id == 1,
+                                              MetagameTournament.date >= date(2025, 1, 1))),
+]
+
+
+def explain(conn, stmt) -> str:
+    """Return the query plan for a statement as text"""
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text('EXPLAIN QUERY PLAN ' + sql)).all()
+        return '\n'.join(row[-1] for row in rows)
+    rows = conn.execute(text('EXPLAIN ' + sql)).all()
+    return '\n'.join(row[0] for row in rows)
+
+
+def check_indexes() -> List[dict]:
+    """
+    EXPLAIN every hot query and report whether its index appears in the plan.
+    On PostgreSQL sequential scans are disabled for the check so small
+    tables do not hide a missing index.
+    """
+    results = []
+    with db.engine.connect() as conn:
+        with conn.begin():
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text('SET LOCAL enable_seqscan = off'))
+            for name, index_name, build in HOT_QUERIES:
+                plan = explain(conn, build())
+                results.append({
+                    'query': name,
+                    'index': index_name,
+                    'used': index_name in plan,
+                    'plan': plan
+                })
+    return results
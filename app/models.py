@@ -8,6 +8,9 @@ db = SQLAlchemy()
 class User(UserMixin, db.Model):
     """User accounts for authentication"""
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -67,6 +70,9 @@ class Season(db.Model):
 class Player(db.Model):
     """Players in tournaments (separate from user accounts)"""
     __tablename__ = 'players'
+    __table_args__ = (
+        db.Index('ix_players_elo', 'elo'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -110,12 +116,16 @@ class Player(db.Model):
 class Deck(db.Model):
     """Deck database with hierarchical structure"""
     __tablename__ = 'decks'
+    __table_args__ = (
+        db.Index('ix_decks_elo', 'elo'),
+        db.Index('ix_decks_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     parent_id = db.Column(db.Integer, db.ForeignKey('decks.id'), nullable=True)
 
-    # Nature tags (comma-separated)
+    # Nature tags (comma-separated); mirrored into deck_natures for indexed filtering
     natures = db.Column(db.String(200))  # "Meta Deck,Box Deck"
 
     # Stats
@@ -124,9 +134,12 @@ class Deck(db.Model):
     wins = db.Column(db.Integer, default=0)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Write time, the export cursor; deferred since only exports read it
+    updated_at = db.deferred(db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow))
 
     # Relationships
     parent = db.relationship('Deck', remote_side=[id], backref='variants')
+    nature_tags = db.relationship('DeckNature', backref='deck', cascade='all, delete-orphan')
 
     @property
     def win_rate(self):
@@ -139,9 +152,23 @@ class Deck(db.Model):
             return []
         return [n.strip() for n in self.natures.split(',')]
 
+class DeckNature(db.Model):
+    """One nature tag of a deck, kept in sync with Deck.natures"""
+    __tablename__ = 'deck_natures'
+    __table_args__ = (
+        db.Index('ix_deck_natures_name_deck', 'name', 'deck_id'),
+    )
+
+    deck_id = db.Column(db.Integer, db.ForeignKey('decks.id'), primary_key=True)
+    name = db.Column(db.String(50), primary_key=True)
+
 class Tournament(db.Model):
     """Tournament instances"""
     __tablename__ = 'tournaments'
+    __table_args__ = (
+        db.Index('ix_tournaments_status_date', 'status', 'date', 'id'),
+        db.Index('ix_tournaments_date', 'date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -159,6 +186,11 @@ class Tournament(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
+    # Set once, by whichever rating run claims the tournament first
+    rated_at = db.deferred(db.Column(db.DateTime, nullable=True))
+    # Bumped on every commit that changes the tournament, its participants or
+    # matches (see app.cache); keys the tournament page's cached fragments
+    cache_version = db.deferred(db.Column(db.Integer, nullable=False, default=0))
 
     # Relationships
     participants = db.relationship('TournamentPlayer', backref='tournament', lazy=True, cascade='all, delete-orphan')
@@ -167,6 +199,11 @@ class Tournament(db.Model):
 class TournamentPlayer(db.Model):
     """Player participation in a specific tournament"""
     __tablename__ = 'tournament_players'
+    __table_args__ = (
+        db.Index('ix_tournament_players_player', 'player_id'),
+        db.Index('ix_tournament_players_tournament_player', 'tournament_id', 'player_id'),
+        db.Index('ix_tournament_players_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
@@ -189,13 +226,30 @@ class TournamentPlayer(db.Model):
     dropped = db.Column(db.Boolean, default=False)
     dropped_round = db.Column(db.Integer, nullable=True)
 
+    # Write time, the export cursor; deferred since only exports read it
+    updated_at = db.deferred(db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow))
+
     # Relationships
     player = db.relationship('Player', backref='tournament_participations')
     deck = db.relationship('Deck', backref='tournament_usages')
 
+# Participant count as a deferred correlated subquery; undefer() it to load
+# counts with a tournament query instead of touching the participants collection
+Tournament.participant_count = db.column_property(
+    db.select(db.func.count(TournamentPlayer.id))
+    .where(TournamentPlayer.tournament_id == Tournament.id)
+    .correlate_except(TournamentPlayer)
+    .scalar_subquery(),
+    deferred=True
+)
+
 class Match(db.Model):
     """Match records"""
     __tablename__ = 'matches'
+    __table_args__ = (
+        db.Index('ix_matches_tournament_round', 'tournament_id', 'round_number'),
+        db.Index('ix_matches_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
@@ -213,14 +267,31 @@ class Match(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
+    # Write time, the export cursor; deferred since only exports read it
+    updated_at = db.deferred(db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow))
 
     # Relationships
     player1 = db.relationship('TournamentPlayer', foreign_keys=[player1_id], backref='matches_as_p1')
     player2 = db.relationship('TournamentPlayer', foreign_keys=[player2_id], backref='matches_as_p2')
 
+# Match count, deferred like participant_count
+Tournament.match_count = db.column_property(
+    db.select(db.func.count(Match.id))
+    .where(Match.tournament_id == Tournament.id)
+    .correlate_except(Match)
+    .scalar_subquery(),
+    deferred=True
+)
+
 class ELOHistory(db.Model):
     """Track ELO changes over time"""
     __tablename__ = 'elo_history'
+    __table_args__ = (
+        db.Index('ix_elo_history_player_timestamp', 'player_id', 'timestamp'),
+        db.Index('ix_elo_history_match', 'match_id'),
+        db.Index('ix_elo_history_tournament', 'tournament_id'),
+        db.Index('ix_elo_history_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
@@ -232,8 +303,245 @@ class ELOHistory(db.Model):
     elo_change = db.Column(db.Float, nullable=False)
 
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Write time (timestamp is the match time), the export cursor; deferred since only exports read it
+    updated_at = db.deferred(db.Column(db.DateTime, default=datetime.utcnow))
 
     # Relationships
     player = db.relationship('Player', backref='elo_history')
     match = db.relationship('Match', backref='elo_records')
     tournament = db.relationship('Tournament', backref='elo_changes')
+
+class ELOHistorySummary(db.Model):
+    """ELO history rolled up per player per tournament once older than the compaction horizon"""
+    __tablename__ = 'elo_history_summary'
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'tournament_id', name='uq_elo_history_summary_player_tournament'),
+        db.Index('ix_elo_history_summary_player_timestamp', 'player_id', 'timestamp'),
+        db.Index('ix_elo_history_summary_updated_at', 'updated_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
+
+    elo_before = db.Column(db.Float, nullable=False)  # before the player's first match
+    elo_after = db.Column(db.Float, nullable=False)   # after the player's last match
+    elo_change = db.Column(db.Float, nullable=False)
+    matches_played = db.Column(db.Integer, nullable=False)
+
+    first_timestamp = db.Column(db.DateTime, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)  # last match, so rows sort like ELOHistory
+    last_history_id = db.Column(db.Integer, nullable=False)  # id of the last raw row, orders same-time events
+    # Write time (timestamp is the match time), the export cursor; deferred since only exports read it
+    updated_at = db.deferred(db.Column(db.DateTime, default=datetime.utcnow))
+
+    player = db.relationship('Player')
+    tournament = db.relationship('Tournament')
+
+class RatingCheckpoint(db.Model):
+    """A player's rating after each tournament they played, for as-of leaderboards"""
+    __tablename__ = 'rating_checkpoints'
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'tournament_id', name='uq_rating_checkpoints_player_tournament'),
+        db.Index('ix_rating_checkpoints_timestamp', 'timestamp'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
+
+    first_timestamp = db.Column(db.DateTime, nullable=False)  # player's first match of the tournament
+    timestamp = db.Column(db.DateTime, nullable=False)        # and last, like ELOHistorySummary
+    seq = db.Column(db.Integer, nullable=False)               # id of the last raw history row
+    elo_after = db.Column(db.Float, nullable=False)
+
+class ELOHistoryArchive(db.Model):
+    """Raw elo_history rows moved out of the hot table by compaction (ids preserved)"""
+    __tablename__ = 'elo_history_archive'
+    __table_args__ = (
+        db.Index('ix_elo_history_archive_player_timestamp', 'player_id', 'timestamp'),
+        db.Index('ix_elo_history_archive_match', 'match_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=True)
+
+    elo_before = db.Column(db.Float, nullable=False)
+    elo_after = db.Column(db.Float, nullable=False)
+    elo_change = db.Column(db.Float, nullable=False)
+
+    timestamp = db.Column(db.DateTime)
+    updated_at = db.deferred(db.Column(db.DateTime))  # copied from the hot row
+
+class HeadToHead(db.Model):
+    """Lifetime record between two players, keyed by the unordered pair (lower id first)"""
+    __tablename__ = 'head_to_head'
+    __table_args__ = (
+        db.Index('ix_head_to_head_high', 'player_high_id'),
+    )
+
+    player_low_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    player_high_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+
+    low_wins = db.Column(db.Integer, default=0, nullable=False)
+    high_wins = db.Column(db.Integer, default=0, nullable=False)
+    draws = db.Column(db.Integer, default=0, nullable=False)
+    double_losses = db.Column(db.Integer, default=0, nullable=False)
+    matches_played = db.Column(db.Integer, default=0, nullable=False)
+
+    last_played_at = db.Column(db.DateTime, nullable=True)
+
+    @staticmethod
+    def pair_key(player_a_id, player_b_id):
+        """Primary key for a pair of players in either order"""
+        return (min(player_a_id, player_b_id), max(player_a_id, player_b_id))
+
+    def record_for(self, player_id):
+        """Wins/losses/draws from one player's point of view"""
+        is_low = player_id == self.player_low_id
+        return {
+            'player_id': player_id,
+            'opponent_id': self.player_high_id if is_low else self.player_low_id,
+            'wins': self.low_wins if is_low else self.high_wins,
+            'losses': self.high_wins if is_low else self.low_wins,
+            'draws': self.draws,
+            'double_losses': self.double_losses,
+            'matches_played': self.matches_played,
+            'last_played_at': self.last_played_at.isoformat() if self.last_played_at else None
+        }
+
+
+class MetagameTournament(db.Model):
+    """Usage and results of one deck in one completed tournament"""
+    __tablename__ = 'metagame_tournament'
+    __table_args__ = (
+        db.UniqueConstraint('tournament_id', 'deck_id', name='uq_metagame_tournament_deck'),
+        db.Index('ix_metagame_tournament_deck_date', 'deck_id', 'date'),
+        db.Index('ix_metagame_tournament_archetype_date', 'archetype_id', 'date'),
+        db.Index('ix_metagame_tournament_date', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
+    deck_id = db.Column(db.Integer, db.ForeignKey('decks.id'), nullable=False)
+    archetype_id = db.Column(db.Integer, db.ForeignKey('decks.id'), nullable=False)  # top-level parent deck
+    season_id = db.Column(db.Integer, db.ForeignKey('seasons.id'), nullable=True)
+    date = db.Column(db.Date, nullable=False)
+
+    entries = db.Column(db.Integer, nullable=False)   # players on this deck
+    players = db.Column(db.Integer, nullable=False)   # players with a registered deck
+    top_cut = db.Column(db.Integer, nullable=False)   # entries finishing in the top cut
+    wins = db.Column(db.Integer, nullable=False)
+    losses = db.Column(db.Integer, nullable=False)
+    ties = db.Column(db.Integer, nullable=False)
+    share = db.Column(db.Float, nullable=False)
+    conversion = db.Column(db.Float, nullable=False)
+    win_rate = db.Column(db.Float, nullable=False)
+
+class MetagameSeason(db.Model):
+    """Usage and results of one deck across a season, summed from metagame_tournament"""
+    __tablename__ = 'metagame_season'
+    __table_args__ = (
+        db.UniqueConstraint('season_id', 'deck_id', name='uq_metagame_season_deck'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    season_id = db.Column(db.Integer, db.ForeignKey('seasons.id'), nullable=False)
+    deck_id = db.Column(db.Integer, db.ForeignKey('decks.id'), nullable=False)
+    archetype_id = db.Column(db.Integer, db.ForeignKey('decks.id'), nullable=False)
+
+    tournaments = db.Column(db.Integer, nullable=False)
+    entries = db.Column(db.Integer, nullable=False)
+    players = db.Column(db.Integer, nullable=False)
+    top_cut = db.Column(db.Integer, nullable=False)
+    wins = db.Column(db.Integer, nullable=False)
+    losses = db.Column(db.Integer, nullable=False)
+    ties = db.Column(db.Integer, nullable=False)
+    share = db.Column(db.Float, nullable=False)
+    conversion = db.Column(db.Float, nullable=False)
+    win_rate = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ExportTombstone(db.Model):
+    """An exported row that was deleted; row_id NULL means every row of the dataset written before deleted_at"""
+    __tablename__ = 'export_tombstones'
+    __table_args__ = (
+        db.Index('ix_export_tombstones_deleted_at', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dataset = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=True)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class CacheGeneration(db.Model):
+    """Version counter of a cached data set, shared by every process (see app.cache)"""
+    __tablename__ = 'cache_generations'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class SiteCounters(db.Model):
+    """Single-row table of entity counts for the admin dashboard"""
+    __tablename__ = 'site_counters'
+
+    id = db.Column(db.Integer, primary_key=True)  # always SITE_COUNTERS_ID
+
+    users = db.Column(db.Integer, default=0, nullable=False)
+    tournaments = db.Column(db.Integer, default=0, nullable=False)
+    players = db.Column(db.Integer, default=0, nullable=False)
+    matches = db.Column(db.Integer, default=0, nullable=False)
+
+    refreshed_at = db.Column(db.DateTime, nullable=True)  # last full recount
+
+class SiteCounterDelta(db.Model):
+    """Counter changes from one flush, folded into site_counters by a background job"""
+    __tablename__ = 'site_counter_deltas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    users = db.Column(db.Integer, default=0, nullable=False)
+    tournaments = db.Column(db.Integer, default=0, nullable=False)
+    players = db.Column(db.Integer, default=0, nullable=False)
+    matches = db.Column(db.Integer, default=0, nullable=False)
+
+
+class Job(db.Model):
+    """Background job stored in the database and executed by app.jobs workers"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # registered task name
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=True)
+
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON return value of the task
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher is claimed first
+
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)  # lease, renewed by the running worker
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.last_error.strip().splitlines()[-1] if self.last_error else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,67 @@
+"""
+SQLite tuning
+Applies connection PRAGMAs (WAL, synchronous, cache/mmap sizes, busy
+timeout) to the SQLite engine and optionally opens a separate read-only
+engine for long analytics reads, so leaderboard and profile queries never
+hold up result writes. Only active when the database is SQLite and
+SQLITE_PRAGMAS is configured.
+"""
+from flask import current_app, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from app.models import db
+
+# PRAGMAs that only need to be set by the writer
+WRITE_ONLY_PRAGMAS = ('journal_mode',)
+
+
+def apply_pragmas(engine, pragmas: dict):
+    """Run the given PRAGMAs on every new DB-API connection"""
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def init_sqlite(app):
+    """Tune the SQLite engine and create the read-only analytics engine"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name != 'sqlite' or not pragmas:
+            return
+        apply_pragmas(engine, pragmas)
+
+        # A second pool on the same file; query_only makes its connections
+        # read-only while still sharing the WAL index with the writer
+        if app.config.get('SQLITE_READ_ONLY_ANALYTICS') and engine.url.database not in (None, '', ':memory:'):
+            read_only_pragmas = {k: v for k, v in pragmas.items() if k not in WRITE_ONLY_PRAGMAS}
+            read_only_pragmas['query_only'] = 1
+            read_engine = create_engine(
+                engine.url,
+                **app.config.get('SQLITE_READ_ONLY_ENGINE_OPTIONS', {})
+            )
+            apply_pragmas(read_engine, read_only_pragmas)
+            app.extensions['sqlite_read_engine'] = read_engine
+
+    @app.teardown_appcontext
+    def close_read_session(exception=None):
+        session = g.pop('read_session', None)
+        if session is not None:
+            session.close()
+
+
+def read_session():
+    """
+    Session for read-only analytics queries.
+    Uses the read-only SQLite engine when configured, otherwise db.session.
+    The session lives until the end of the request so templates can lazy-load.
+    """
+    read_engine = current_app.extensions.get('sqlite_read_engine')
+    if read_engine is None:
+        return db.session
+    if 'read_session' not in g:
+        g.read_session = Session(bind=read_engine, autoflush=False)
+    return g.read_session
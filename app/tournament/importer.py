@@ -0,0 +1,355 @@
+"""
+Bulk import of historical tournament results
+Streams match rows from CSV, JSON Lines or XML files, resolves player and
+deck names against in-memory maps, bulk-inserts tournaments, participants
+and matches in batches, then replays ELO once over the whole history.
+
+Every format carries one match per record with these fields:
+    tournament, date (YYYY-MM-DD), round, player1, deck1, player2, deck2,
+    result (player1/player2/draw/double_loss/bye), p1_game_wins,
+    p2_game_wins, and optionally mode (normal/bo3) and draw_points.
+Records of one tournament must be contiguous. Tournaments that already
+exist (same name and date) are skipped, so re-running an import is safe.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from xml.etree.ElementTree import ParseError, iterparse
+from sqlalchemy import insert, select
+from app.models import db, Player, Deck, Tournament, TournamentPlayer, Match
+from app.analytics.elo_calculator import replay_all_elo
+from app.analytics.metagame import rebuild_metagame
+from app.cache import bump_generation, TOURNAMENTS, RATINGS, PLAYER_NAMES
+from app.counters import refresh_counters
+
+BATCH_SIZE = 5000  # matches per bulk insert
+RESULTS = ('player1', 'player2', 'draw', 'double_loss', 'bye')
+MODES = ('normal', 'bo3')
+WIN_POINTS = 3
+
+
+class ImportFormatError(ValueError):
+    """A record that cannot be imported; carries the record number"""
+
+    def __init__(self, record: int, message: str):
+        super().__init__(f'record {record}: {message}')
+        self.record = record
+
+
+class ResultRow(NamedTuple):
+    tournament: str
+    date: date
+    round: int
+    player1: str
+    deck1: Optional[str]
+    player2: Optional[str]
+    deck2: Optional[str]
+    result: str
+    p1_game_wins: int
+    p2_game_wins: int
+    mode: str
+    draw_points: int
+
+
+def read_csv(stream) -> Iterator[dict]:
+    yield from csv.DictReader(stream)
+
+
+def read_json_lines(stream) -> Iterator[dict]:
+    """One JSON object per line (the stdlib has no incremental array parser)"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_xml(stream) -> Iterator[dict]:
+    """<match> elements with fields as attributes or child elements"""
+    for _, elem in iterparse(stream, events=('end',)):
+        if elem.tag == 'match':
+            record = dict(elem.attrib)
+            record.update((child.tag, (child.text or '').strip()) for child in elem)
+            yield record
+            elem.clear()
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json_lines,
+    'jsonl': read_json_lines,
+    'ndjson': read_json_lines,
+    'xml': read_xml,
+}
+
+
+def detect_format(filename: str) -> str:
+    """Format name from a file extension"""
+    return filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+
+def open_records(stream, fmt: str) -> Iterator[dict]:
+    """Records from a binary stream in the given format; unreadable input raises ImportFormatError"""
+    if fmt not in READERS:
+        raise ValueError(f'unsupported format: {fmt}')
+    if fmt == 'xml':
+        records = read_xml(stream)
+    else:
+        records = READERS[fmt](io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    return _checked(records)
+
+
+def _checked(records: Iterator[dict]) -> Iterator[dict]:
+    """Re-raise malformed XML/CSV/JSON and bad UTF-8 as ImportFormatError for the failing record"""
+    number = 0
+    try:
+        for number, record in enumerate(records, start=1):
+            yield record
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(number + 1, f'not valid UTF-8 ({e.reason})') from e
+    except (ParseError, csv.Error, ValueError) as e:
+        raise ImportFormatError(number + 1, f'unreadable input ({e})') from e
+
+
+def _text(record: dict, field: str) -> Optional[str]:
+    value = record.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _int(record: dict, field: str, default: int = 0) -> int:
+    value = _text(record, field)
+    return int(value) if value is not None else default
+
+
+def parse_row(record: dict, number: int) -> ResultRow:
+    """Validate and normalize one raw record"""
+    try:
+        tournament = _text(record, 'tournament')
+        player1 = _text(record, 'player1')
+        result = (_text(record, 'result') or '').lower()
+        if not tournament or not player1:
+            raise ValueError('tournament and player1 are required')
+        if result not in RESULTS:
+            raise ValueError(f'unknown result {result!r}')
+        player2 = _text(record, 'player2')
+        if (result == 'bye') != (player2 is None):
+            raise ValueError('player2 must be empty exactly when the result is a bye')
+        mode = (_text(record, 'mode') or 'normal').lower()
+        if mode not in MODES:
+            raise ValueError(f'unknown mode {mode!r}')
+        return ResultRow(
+            tournament=tournament,
+            date=datetime.strptime(_text(record, 'date') or '', '%Y-%m-%d').date(),
+            round=_int(record, 'round'),
+            player1=player1,
+            deck1=_text(record, 'deck1'),
+            player2=player2,
+            deck2=_text(record, 'deck2'),
+            result=result,
+            p1_game_wins=_int(record, 'p1_game_wins'),
+            p2_game_wins=_int(record, 'p2_game_wins'),
+            mode=mode,
+            draw_points=_int(record, 'draw_points'),
+        )
+    except ValueError as e:
+        raise ImportFormatError(number, str(e)) from e
+
+
+class ResultImporter:
+    """
+    Imports a stream of ResultRow records. Name-to-id maps for players,
+    decks and existing tournaments are loaded once; new players and decks
+    are created in bulk as each batch is flushed.
+    """
+
+    def __init__(self, organizer_id: int, batch_size: int = BATCH_SIZE):
+        self.organizer_id = organizer_id
+        self.batch_size = batch_size
+        self.players: Dict[str, int] = {}
+        self.decks: Dict[str, int] = {}
+        # Lowest id wins when names are duplicated
+        for player_id, name in db.session.execute(select(Player.id, Player.name).order_by(Player.id.desc())):
+            self.players[name.strip()] = player_id
+        for deck_id, name in db.session.execute(select(Deck.id, Deck.name).order_by(Deck.id.desc())):
+            self.decks[name.strip()] = deck_id
+        self.existing = set(db.session.execute(select(Tournament.name, Tournament.date)).tuples())
+        self.finished = set()
+        self.pending: List[List[ResultRow]] = []
+        self.pending_matches = 0
+        self.stats = defaultdict(int)
+
+    def run(self, rows: Iterable[ResultRow]) -> dict:
+        """Import every row, replay ELO and rebuild the metagame once, and commit"""
+        current_key, current = None, []
+        for row in rows:
+            key = (row.tournament, row.date)
+            if key != current_key:
+                self._finish(current_key, current)
+                if key in self.finished:
+                    raise ValueError(f'records for {row.tournament} ({row.date}) are not contiguous')
+                current_key, current = key, []
+            current.append(row)
+        self._finish(current_key, current)
+        self._flush()
+
+        if self.stats['tournaments']:
+            conn = db.session.connection()
+            self.stats['rated_matches'] = replay_all_elo(conn)['matches']
+            rebuild_metagame(db.session)
+            refresh_counters(conn)
+            bump_generation(TOURNAMENTS, RATINGS, PLAYER_NAMES)
+            db.session.commit()
+        return dict(self.stats)
+
+    def _finish(self, key, rows: List[ResultRow]):
+        if key is None:
+            return
+        self.finished.add(key)
+        if key in self.existing:
+            self.stats['skipped_tournaments'] += 1
+            return
+        self.pending.append(rows)
+        self.pending_matches += len(rows)
+        if self.pending_matches >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """Bulk-insert the pending tournaments with their participants and matches"""
+        if not self.pending:
+            return
+        self._create_missing(Player, self.players,
+                             {name for rows in self.pending for row in rows for name in (row.player1, row.player2) if name},
+                             'players_created')
+        self._create_missing(Deck, self.decks,
+                             {name for rows in self.pending for row in rows for name in (row.deck1, row.deck2) if name},
+                             'decks_created')
+
+        # Tournaments
+        tournament_ids = {}
+        result = db.session.execute(
+            insert(Tournament).returning(Tournament.id, Tournament.name, Tournament.date),
+            [self._tournament_values(rows) for rows in self.pending]
+        )
+        for tournament_id, name, played_on in result:
+            tournament_ids[(name, played_on)] = tournament_id
+
+        # Participants with their final records
+        participants = {}
+        for rows in self.pending:
+            tournament_id = tournament_ids[(rows[0].tournament, rows[0].date)]
+            for key, values in self._participant_values(tournament_id, rows).items():
+                participants[key] = values
+        participant_ids = {}
+        result = db.session.execute(
+            insert(TournamentPlayer).returning(TournamentPlayer.id, TournamentPlayer.tournament_id,
+                                               TournamentPlayer.player_id),
+            list(participants.values())
+        )
+        for tp_id, tournament_id, player_id in result:
+            participant_ids[(tournament_id, player_id)] = tp_id
+
+        # Matches
+        match_values = []
+        for rows in self.pending:
+            tournament_id = tournament_ids[(rows[0].tournament, rows[0].date)]
+            played_at = datetime.combine(rows[0].date, time())
+            for row in rows:
+                match_values.append({
+                    'tournament_id': tournament_id,
+                    'round_number': row.round,
+                    'player1_id': participant_ids[(tournament_id, self.players[row.player1])],
+                    'player2_id': participant_ids[(tournament_id, self.players[row.player2])] if row.player2 else None,
+                    'result': row.result,
+                    'p1_game_wins': row.p1_game_wins,
+                    'p2_game_wins': row.p2_game_wins,
+                    'created_at': played_at,
+                    'completed_at': played_at,
+                })
+        db.session.execute(Match.__table__.insert(), match_values)
+
+        self.stats['tournaments'] += len(self.pending)
+        self.stats['participants'] += len(participants)
+        self.stats['matches'] += len(match_values)
+        self.pending, self.pending_matches = [], 0
+
+    def _create_missing(self, model, lookup: Dict[str, int], names: set, stat: str):
+        missing = sorted(names - lookup.keys())
+        if not missing:
+            return
+        result = db.session.execute(insert(model).returning(model.id, model.name),
+                                    [{'name': name} for name in missing])
+        for row_id, name in result:
+            lookup[name] = row_id
+        self.stats[stat] += len(missing)
+
+    def _tournament_values(self, rows: List[ResultRow]) -> dict:
+        first = rows[0]
+        played_at = datetime.combine(first.date, time())
+        return {
+            'name': first.tournament,
+            'date': first.date,
+            'organizer_id': self.organizer_id,
+            'mode': first.mode,
+            'draw_points': first.draw_points,
+            'status': 'completed',
+            'current_round': max(row.round for row in rows),
+            'created_at': played_at,
+            'completed_at': played_at,
+        }
+
+    def _participant_values(self, tournament_id: int, rows: List[ResultRow]) -> Dict[Tuple[int, int], dict]:
+        """Per-player totals for one tournament, keyed by (tournament_id, player_id)"""
+        totals = {}
+
+        def entry(name, deck):
+            player_id = self.players[name]
+            values = totals.get(player_id)
+            if values is None:
+                values = totals[player_id] = {
+                    'tournament_id': tournament_id, 'player_id': player_id, 'deck_id': None,
+                    'points': 0, 'wins': 0, 'losses': 0, 'ties': 0, 'byes': 0,
+                    'game_wins': 0, 'game_losses': 0,
+                }
+            if deck and values['deck_id'] is None:
+                values['deck_id'] = self.decks[deck]
+            return values
+
+        for row in rows:
+            p1 = entry(row.player1, row.deck1)
+            if row.result == 'bye':
+                p1['byes'] += 1
+                p1['points'] += WIN_POINTS
+                continue
+            p2 = entry(row.player2, row.deck2)
+            p1['game_wins'] += row.p1_game_wins
+            p1['game_losses'] += row.p2_game_wins
+            p2['game_wins'] += row.p2_game_wins
+            p2['game_losses'] += row.p1_game_wins
+            if row.result == 'draw':
+                for values in (p1, p2):
+                    values['ties'] += 1
+                    values['points'] += row.draw_points
+            elif row.result == 'double_loss':
+                p1['losses'] += 1
+                p2['losses'] += 1
+            else:
+                winner, loser = (p1, p2) if row.result == 'player1' else (p2, p1)
+                winner['wins'] += 1
+                winner['points'] += WIN_POINTS
+                loser['losses'] += 1
+        return {(tournament_id, player_id): values for player_id, values in totals.items()}
+
+
+def import_results(stream, fmt: str, organizer_id: int, batch_size: int = BATCH_SIZE) -> dict:
+    """Import a result file (binary stream) and return counts of what was created"""
+    rows = (parse_row(record, number) for number, record in enumerate(open_records(stream, fmt), start=1))
+    try:
+        return ResultImporter(organizer_id, batch_size).run(rows)
+    except Exception:
+        db.session.rollback()
+        raise
@@ -5,6 +5,7 @@ Ported from Swiss/main.py - DO NOT MODIFY ORIGINAL
 import random
 from typing import List, Tuple, Optional, Set
 from app.models import TournamentPlayer, Tournament
+from app.tournament.standings import compute_standings
 
 
 class PairingEngine:
@@ -216,57 +217,4 @@ class PairingEngine:
         """
         Calculate current standings with all tiebreakers.
         """
-        participants = self.tournament.participants
-
-        standings = []
-        for player in participants:
-            if player.dropped:
-                continue
-
-            omw = self.calculate_omw(player)
-            oowp = self.calculate_oowp(player)
-
-            if self.tournament.mode == 'bo3':
-                # BO3 mode: use GWP and OGWP
-                total_games = player.game_wins + player.game_losses
-                gwp = max(0.33, player.game_wins / total_games) if total_games > 0 else 0.33
-                # Calculate OGWP (simplified)
-                ogwp = 0.33  # Placeholder - would need opponent game stats
-
-                standings.append({
-                    'player': player,
-                    'points': player.points,
-                    'wins': player.wins,
-                    'losses': player.losses,
-                    'ties': player.ties,
-                    'omw': omw,
-                    'oowp': oowp,
-                    'gwp': gwp,
-                    'ogwp': ogwp,
-                    'tardy': player.is_tardy
-                })
-            else:
-                # Normal mode
-                standings.append({
-                    'player': player,
-                    'points': player.points,
-                    'wins': player.wins,
-                    'losses': player.losses,
-                    'ties': player.ties,
-                    'omw': omw,
-                    'oowp': oowp
-                })
-
-        # Sort by tiebreakers
-        if self.tournament.mode == 'bo3':
-            standings.sort(
-                key=lambda x: (x['points'], not x['tardy'], x['omw'], x['oowp'], x['gwp'], x['ogwp']),
-                reverse=True
-            )
-        else:
-            standings.sort(
-                key=lambda x: (x['points'], x['omw'], x['oowp']),
-                reverse=True
-            )
-
-        return standings
+        return compute_standings(self.tournament)
@@ -0,0 +1,109 @@
+"""
+Pairing service
+Solves Swiss pairings as background jobs (see app.tournament.tasks), so
+league nights with dozens of simultaneous events are spread over
+worker.py processes instead of being serialized behind the GIL in web
+workers. The solver works on plain-data snapshots of a tournament
+(participants and results only), free of the database session. The job id
+is the ticket callers poll, so any web process can answer for it.
+
+The rematch-free search is backtracking and can explode on awkward
+fields; past its time budget the engine falls back to pairings with
+minimal rematches, as it does when no rematch-free pairing exists.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from app.tournament.pairing import PairingEngine
+from app.tournament.standings import build_opponent_index, match_win_percent
+
+
+@dataclass(frozen=True)
+class PlayerRef:
+    name: str
+
+
+@dataclass
+class SnapshotPlayer:
+    """The TournamentPlayer fields the pairing engine reads"""
+    id: int
+    player: PlayerRef
+    points: int
+    wins: int
+    losses: int
+    dropped: bool = False
+
+
+@dataclass
+class SnapshotMatch:
+    player1_id: int
+    player2_id: Optional[int]
+    result: Optional[str]
+
+
+@dataclass
+class TournamentSnapshot:
+    id: int
+    current_round: int
+    participants: List[SnapshotPlayer]
+    matches: List[SnapshotMatch] = field(default_factory=list)
+
+
+def take_snapshot(tournament) -> TournamentSnapshot:
+    """Copy a tournament's participants and results into plain data"""
+    return TournamentSnapshot(
+        id=tournament.id,
+        current_round=tournament.current_round or 0,
+        participants=[
+            SnapshotPlayer(id=tp.id, player=PlayerRef(tp.player.name), points=tp.points or 0,
+                           wins=tp.wins or 0, losses=tp.losses or 0, dropped=bool(tp.dropped))
+            for tp in tournament.participants
+        ],
+        matches=[SnapshotMatch(m.player1_id, m.player2_id, m.result) for m in tournament.matches]
+    )
+
+
+class SnapshotPairingEngine(PairingEngine):
+    """
+    PairingEngine over a TournamentSnapshot. The opponent index is built once,
+    so the rematch check and OMW are lookups instead of scans of every match
+    for each candidate pair during backtracking.
+    """
+
+    def __init__(self, snapshot: TournamentSnapshot, timeout: Optional[float] = None):
+        super().__init__(snapshot)
+        self.deadline = time.monotonic() + timeout if timeout else None
+        opponents = build_opponent_index(snapshot.matches)
+        self.played = {frozenset((pid, opp)) for pid, opps in opponents.items() for opp in opps}
+        by_id = {p.id: p for p in snapshot.participants}
+        self.omw = {}
+        for p in snapshot.participants:
+            opps = [by_id[o] for o in opponents.get(p.id, ()) if o in by_id]
+            self.omw[p.id] = sum(map(match_win_percent, opps)) / len(opps) if opps and snapshot.current_round else 0.0
+        self.bye_counts = {}
+        for match in snapshot.matches:
+            if match.result == 'bye' and match.player1_id in by_id:
+                name = by_id[match.player1_id].player.name
+                self.bye_counts[name] = self.bye_counts.get(name, 0) + 1
+
+    def calculate_omw(self, player) -> float:
+        return self.omw.get(player.id, 0.0)
+
+    def has_played(self, player1, player2) -> bool:
+        return frozenset((player1.id, player2.id)) in self.played
+
+    def get_bye_counts(self) -> dict:
+        return self.bye_counts
+
+    def find_optimal_pairings(self, remaining, current_solution):
+        # Out of time: every open branch fails at once and pair_round falls back
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return None
+        return super().find_optimal_pairings(remaining, current_solution)
+
+
+def solve(snapshot: TournamentSnapshot, round_num: int,
+          timeout: Optional[float] = None) -> Tuple[List[Tuple[int, int]], Optional[int]]:
+    """Pair a round; returns ([(player1_id, player2_id), ...], bye_player_id)"""
+    pairings, bye = SnapshotPairingEngine(snapshot, timeout).pair_round(round_num)
+    return [(p1.id, p2.id) for p1, p2 in pairings], bye.id if bye else None
@@ -1,51 +1,125 @@
 """
 Tournament routes
 """
-from flask import render_template, redirect, url_for, request, flash
+import json
+from flask import render_template, redirect, url_for, request, flash, jsonify, abort
 from flask_login import login_required, current_user
 from datetime import datetime, date
+from itertools import groupby
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.orm import joinedload, load_only, selectinload, undefer
 from app.tournament import tournament_bp
-from app.models import db, Tournament, TournamentPlayer, Player, Match, Season
+from app.models import db, User, Tournament, TournamentPlayer, Player, Match, Season, Job
+from app.jobs import enqueue, PRIORITY_URGENT
+from app.tournament.tasks import PAIR_ROUND, RATE_TOURNAMENT, pairing_payload, pending_pairing, rate_tournament_key
 from app.decorators import organizer_required
+from app.tournament.standings import compute_standings
+from app.analytics.predictions import round_predictions
+
+TOURNAMENTS_PER_PAGE = 30
+TOURNAMENT_STATUSES = ('upcoming', 'live', 'completed')
+BYE_POINTS = 3
+
+
+def parse_cursor(cursor):
+    """Parse a 'YYYY-MM-DD_id' keyset cursor; returns None if missing or malformed"""
+    try:
+        date_str, tournament_id = cursor.split('_')
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), int(tournament_id)
+    except (AttributeError, ValueError):
+        return None
+
 
 @tournament_bp.route('/list')
 def list():
-    """List all tournaments"""
+    """List tournaments, newest first, with keyset pagination on (date, id)"""
     status_filter = request.args.get('status', 'all')
+    cursor = parse_cursor(request.args.get('cursor'))
 
-    query = Tournament.query
-    if status_filter != 'all':
+    query = Tournament.query.options(
+        load_only(Tournament.id, Tournament.name, Tournament.date,
+                  Tournament.status, Tournament.current_round, Tournament.organizer_id),
+        undefer(Tournament.participant_count),
+        joinedload(Tournament.organizer).load_only(User.username)
+    )
+    if status_filter in TOURNAMENT_STATUSES:
         query = query.filter_by(status=status_filter)
+    else:
+        status_filter = 'all'
+    if cursor:
+        query = query.filter(tuple_(Tournament.date, Tournament.id) < tuple_(*cursor))
 
-    tournaments = query.order_by(Tournament.date.desc()).all()
+    # Fetch one extra row to know whether there is a next page
+    tournaments = (
+        query.order_by(Tournament.date.desc(), Tournament.id.desc())
+        .limit(TOURNAMENTS_PER_PAGE + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(tournaments) > TOURNAMENTS_PER_PAGE:
+        tournaments = tournaments[:TOURNAMENTS_PER_PAGE]
+        last = tournaments[-1]
+        next_cursor = f"{last.date.strftime('%Y-%m-%d')}_{last.id}"
 
     return render_template('tournament/list.html',
                           tournaments=tournaments,
-                          status_filter=status_filter)
+                          status_filter=status_filter,
+                          is_first_page=cursor is None,
+                          next_cursor=next_cursor)
+
+def tournament_results(tournament_id):
+    """Standings and matches by round, for a tournament page fragment that missed the cache"""
+    # Load participants (with player and deck) and matches up front so the
+    # template never lazy-loads per row
+    tournament = (
+        Tournament.query
+        .options(
+            selectinload(Tournament.participants).joinedload(TournamentPlayer.player),
+            selectinload(Tournament.participants).joinedload(TournamentPlayer.deck),
+            selectinload(Tournament.matches)
+        )
+        .filter_by(id=tournament_id)
+        .one()
+    )
+
+    # Get standings (sorted by points, then tiebreakers)
+    standings = compute_standings(tournament, include_dropped=True)
+
+    # Get matches for this tournament; match.player1/player2 resolve from
+    # the participants already in the identity map
+    matches = sorted(tournament.matches, key=lambda m: (m.round_number, m.id))
+    matches_by_round = {}
+    for round_number, round_matches in groupby(matches, key=lambda m: m.round_number):
+        matches_by_round[round_number] = [*round_matches]
+    return {'standings': standings, 'matches_by_round': matches_by_round}
 
 @tournament_bp.route('/<int:tournament_id>')
 def view(tournament_id):
     """View tournament details"""
-    tournament = Tournament.query.get_or_404(tournament_id)
-
-    # Get standings (sorted by points, then tiebreakers)
-    participants = sorted(
-        tournament.participants,
-        key=lambda p: (-p.points, -p.wins),  # TODO: Add proper tiebreakers
-        reverse=False
+    tournament = (
+        Tournament.query
+        .options(
+            joinedload(Tournament.organizer),
+            undefer(Tournament.participant_count),
+            undefer(Tournament.match_count),
+            undefer(Tournament.cache_version)
+        )
+        .filter_by(id=tournament_id)
+        .first_or_404()
     )
 
-    # Get matches for this tournament
-    matches_by_round = {}
-    for match in tournament.matches:
-        if match.round_number not in matches_by_round:
-            matches_by_round[match.round_number] = []
-        matches_by_round[match.round_number].append(match)
+    # Standings and matches are only loaded when a fragment is rendered,
+    # not on cache hits; both fragments share one load
+    loaded = {}
+
+    def results():
+        if not loaded:
+            loaded.update(tournament_results(tournament.id))
+        return loaded
 
     return render_template('tournament/view.html',
                           tournament=tournament,
-                          participants=participants,
-                          matches_by_round=matches_by_round)
+                          results=results)
 
 @tournament_bp.route('/create', methods=['GET', 'POST'])
 @login_required
@@ -85,3 +159,155 @@ def create():
     seasons = Season.query.order_by(Season.start_date.desc()).all()
 
     return render_template('tournament/create.html', seasons=seasons)
+
+def managed_tournament(tournament_id, *options):
+    """Tournament the current user may run (its organizer or an admin), or 404/403"""
+    tournament = Tournament.query.options(*options).filter_by(id=tournament_id).first_or_404()
+    if tournament.organizer_id != current_user.id and not current_user.is_admin():
+        abort(403)
+    return tournament
+
+@tournament_bp.route('/<int:tournament_id>/complete', methods=['POST'])
+@login_required
+@organizer_required
+def complete(tournament_id):
+    """Close a live tournament and queue its rating updates"""
+    tournament = managed_tournament(tournament_id)
+    if tournament.status != 'live':
+        flash('只有進行中的賽事可以結束', 'error')
+        return redirect(url_for('tournament.view', tournament_id=tournament.id))
+
+    tournament.status = 'completed'
+    tournament.completed_at = datetime.utcnow()
+    job = enqueue(RATE_TOURNAMENT, {'tournament_id': tournament.id},
+                  idempotency_key=rate_tournament_key(tournament.id))
+    db.session.commit()
+
+    if request.accept_mimetypes.best == 'application/json':
+        response = jsonify(job.to_dict())
+        response.status_code = 202
+        response.headers['Location'] = url_for('tournament.job_status', job_id=job.id)
+        return response
+    flash(f'賽事「{tournament.name}」已結束，ELO 將於背景更新', 'success')
+    return redirect(url_for('tournament.view', tournament_id=tournament.id))
+
+@tournament_bp.route('/jobs/<int:job_id>')
+@login_required
+@organizer_required
+def job_status(job_id):
+    """Poll a background job's status"""
+    job = Job.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+@tournament_bp.route('/<int:tournament_id>/pair', methods=['POST'])
+@login_required
+@organizer_required
+def pair(tournament_id):
+    """Queue pairings for the next round as a background job; returns a ticket to poll"""
+    tournament = managed_tournament(
+        tournament_id,
+        selectinload(Tournament.participants).joinedload(TournamentPlayer.player),
+        selectinload(Tournament.matches)
+    )
+    if tournament.status == 'completed':
+        return jsonify({'error': '賽事已結束'}), 409
+    if any(m.round_number == tournament.current_round and not m.result for m in tournament.matches):
+        return jsonify({'error': '本輪尚有未回報的對戰'}), 409
+    if sum(1 for tp in tournament.participants if not tp.dropped) < 2:
+        return jsonify({'error': '至少需要 2 位參賽者才能配對'}), 400
+
+    round_num = (tournament.current_round or 0) + 1
+    job = pending_pairing(tournament.id, round_num) or enqueue(PAIR_ROUND, pairing_payload(tournament.id, round_num),
+                                                               priority=PRIORITY_URGENT)
+    db.session.commit()
+    response = jsonify({'ticket': job.id, 'round': round_num, 'status': 'pending'})
+    response.status_code = 202
+    response.headers['Location'] = url_for('tournament.pairing_status', ticket=job.id)
+    return response
+
+def poll_pairing(ticket):
+    """Status of a pairing job the current user may run: pending, done (with pairings) or failed"""
+    job = db.session.get(Job, ticket)
+    if job is None or job.name != PAIR_ROUND:
+        abort(404)
+    payload = json.loads(job.payload)
+    managed_tournament(payload['tournament_id'])
+    status = {'ticket': job.id, 'tournament_id': payload['tournament_id'], 'round': payload['round_num']}
+    if job.status == 'failed':
+        return {**status, 'status': 'failed', 'error': job.to_dict()['error']}
+    if job.status != 'succeeded':
+        return {**status, 'status': 'pending'}
+    return {**status, 'status': 'done', **json.loads(job.result)}
+
+@tournament_bp.route('/pairings/<int:ticket>')
+@login_required
+@organizer_required
+def pairing_status(ticket):
+    """Poll a pairing ticket; finished pairings include player names"""
+    result = poll_pairing(ticket)
+    if result['status'] == 'done':
+        ids = [pid for pairing in result['pairings'] for pid in pairing] + [result['bye']]
+        names = dict(
+            db.session.query(TournamentPlayer.id, Player.name)
+            .join(Player, TournamentPlayer.player_id == Player.id)
+            .filter(TournamentPlayer.id.in_([pid for pid in ids if pid]))
+            .all()
+        )
+        result['pairings'] = [
+            {'player1_id': p1, 'player1': names.get(p1), 'player2_id': p2, 'player2': names.get(p2)}
+            for p1, p2 in result['pairings']
+        ]
+        result['bye'] = {'player_id': result['bye'], 'player': names.get(result['bye'])} if result['bye'] else None
+    return jsonify(result)
+
+@tournament_bp.route('/pairings/<int:ticket>/publish', methods=['POST'])
+@login_required
+@organizer_required
+def publish_pairings(ticket):
+    """Create the round's matches from a finished pairing ticket"""
+    result = poll_pairing(ticket)
+    if result['status'] != 'done':
+        return jsonify({'error': '配對尚未完成', 'status': result['status']}), 409
+
+    # Advance the round only from the one the ticket was solved for, so two
+    # publishes (of this or another ticket) cannot both create the round
+    advanced = db.session.execute(
+        update(Tournament)
+        .where(Tournament.id == result['tournament_id'],
+               func.coalesce(Tournament.current_round, 0) == result['round'] - 1)
+        .values(current_round=result['round'])
+        .execution_options(synchronize_session='fetch')
+    ).rowcount == 1
+    if not advanced:
+        db.session.rollback()
+        return jsonify({'error': '賽事已進入其他回合，請重新配對'}), 409
+
+    tournament = db.session.get(Tournament, result['tournament_id'])
+    now = datetime.utcnow()
+    for player1_id, player2_id in result['pairings']:
+        db.session.add(Match(tournament_id=tournament.id, round_number=result['round'],
+                             player1_id=player1_id, player2_id=player2_id))
+    if result['bye']:
+        db.session.add(Match(tournament_id=tournament.id, round_number=result['round'],
+                             player1_id=result['bye'], result='bye', completed_at=now))
+        bye_player = db.session.get(TournamentPlayer, result['bye'])
+        bye_player.points += BYE_POINTS
+        bye_player.byes += 1
+    if tournament.status == 'upcoming':
+        tournament.status = 'live'
+    db.session.commit()
+    # Warm the round's predictions for broadcast overlays polling right after publish
+    round_predictions(tournament.id, tournament.current_round)
+
+    return jsonify({'tournament_id': tournament.id, 'round': tournament.current_round,
+                    'matches': len(result['pairings']) + bool(result['bye']),
+                    'predictions': url_for('tournament.round_predictions_api', tournament_id=tournament.id,
+                                           round_number=tournament.current_round)}), 201
+
+@tournament_bp.route('/<int:tournament_id>/rounds/<int:round_number>/predictions')
+def round_predictions_api(tournament_id, round_number):
+    """Win probability and rating swing for every paired table of a round"""
+    tables = round_predictions(tournament_id, round_number)
+    if tables is None:
+        abort(404)
+    return jsonify({'tournament_id': tournament_id, 'round': round_number, 'tables': tables})
@@ -0,0 +1,127 @@
+"""
+Tournament standings with Swiss tiebreakers.
+Builds an opponent index (and, for BO3, per-player game tallies) in a
+single pass over the match list so OMW, OOWP, GWP and OGWP are dictionary
+lookups instead of per-player match rescans.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.models import Tournament, TournamentPlayer, Match
+
+MIN_WIN_PERCENT = 0.25        # OMW floor (official PTCG rules)
+MIN_GAME_WIN_PERCENT = 0.33   # GWP floor for BO3
+
+
+def build_match_index(matches: Iterable[Match],
+                      count_games: bool = False) -> Tuple[Dict[int, List[int]], Dict[int, List[int]]]:
+    """
+    Map each TournamentPlayer id to the ids of the opponents they have
+    finished a match against and, with count_games, to their
+    [games won, games played] in those matches. Byes and unreported
+    matches are skipped.
+    """
+    opponents = defaultdict(list)
+    games = defaultdict(lambda: [0, 0])
+    for match in matches:
+        if not match.result or match.player2_id is None:
+            continue
+        opponents[match.player1_id].append(match.player2_id)
+        opponents[match.player2_id].append(match.player1_id)
+        if count_games:
+            p1_games, p2_games = match.p1_game_wins or 0, match.p2_game_wins or 0
+            games[match.player1_id][0] += p1_games
+            games[match.player2_id][0] += p2_games
+            for pid in (match.player1_id, match.player2_id):
+                games[pid][1] += p1_games + p2_games
+    return opponents, games
+
+
+def build_opponent_index(matches: Iterable[Match]) -> Dict[int, List[int]]:
+    """Opponent ids per TournamentPlayer id (see build_match_index)"""
+    return build_match_index(matches)[0]
+
+
+def match_win_percent(player: TournamentPlayer) -> float:
+    """Match win percentage with the 25% floor"""
+    matches_played = player.wins + player.losses
+    if matches_played == 0:
+        return MIN_WIN_PERCENT
+    return max(MIN_WIN_PERCENT, player.wins / matches_played)
+
+
+def game_win_percent(won: int, played: int) -> float:
+    """Game win percentage with the 33% floor"""
+    if played == 0:
+        return MIN_GAME_WIN_PERCENT
+    return max(MIN_GAME_WIN_PERCENT, won / played)
+
+
+def compute_standings(tournament: Tournament,
+                      participants: Optional[List[TournamentPlayer]] = None,
+                      matches: Optional[List[Match]] = None,
+                      include_dropped: bool = False) -> List[dict]:
+    """
+    Calculate standings with all tiebreakers.
+    Dropped players are excluded unless include_dropped is set, in which
+    case they are listed after every active player.
+    """
+    if participants is None:
+        participants = tournament.participants
+    if matches is None:
+        matches = tournament.matches
+
+    by_id = {p.id: p for p in participants}
+    bo3 = tournament.mode == 'bo3'
+    opponents, games = build_match_index(matches, count_games=bo3)
+    started = bool(tournament.current_round)
+
+    # OMW per player, then OOWP as the mean of opponents' OMW
+    mwp = {pid: match_win_percent(p) for pid, p in by_id.items()}
+    omw = {}
+    for pid in by_id:
+        opps = [o for o in opponents.get(pid, ()) if o in mwp]
+        omw[pid] = sum(mwp[o] for o in opps) / len(opps) if started and opps else 0.0
+    # BO3: GWP from reported game scores, OGWP as the mean of opponents' GWP
+    gwp = {pid: game_win_percent(*games[pid]) for pid in by_id} if bo3 else {}
+
+    standings = []
+    for player in participants:
+        if player.dropped and not include_dropped:
+            continue
+
+        opps = [o for o in opponents.get(player.id, ()) if o in omw]
+        oowp = sum(omw[o] for o in opps) / len(opps) if started and opps else 0.0
+
+        row = {
+            'player': player,
+            'points': player.points,
+            'wins': player.wins,
+            'losses': player.losses,
+            'ties': player.ties,
+            'omw': omw[player.id],
+            'oowp': oowp,
+            'dropped': bool(player.dropped)
+        }
+
+        if bo3:
+            row['gwp'] = gwp[player.id]
+            # Opponents without a reported game (0-0 results) would only add the floor
+            game_opps = [o for o in opps if games[o][1]]
+            row['ogwp'] = sum(gwp[o] for o in game_opps) / len(game_opps) if started and game_opps else 0.0
+            row['tardy'] = player.is_tardy
+
+        standings.append(row)
+
+    # Sort by tiebreakers, dropped players last
+    if bo3:
+        standings.sort(
+            key=lambda x: (not x['dropped'], x['points'], not x['tardy'], x['omw'], x['oowp'], x['gwp'], x['ogwp']),
+            reverse=True
+        )
+    else:
+        standings.sort(
+            key=lambda x: (not x['dropped'], x['points'], x['omw'], x['oowp']),
+            reverse=True
+        )
+
+    return standings
@@ -0,0 +1,99 @@
+"""
+Tournament background tasks
+Round pairings, post-completion rating work and uploaded result imports,
+run by app.jobs workers instead of the organizer's request.
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Optional
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.orm import selectinload
+from app.analytics.elo_calculator import ELOCalculator, update_all_radar_attributes
+from app.analytics.history_compaction import compact_older_than
+from app.analytics.metagame import record_tournament
+from app.counters import FOLD_COUNTERS
+from app.tournament.importer import import_results
+from app.tournament.pairing_service import solve, take_snapshot
+from app.jobs import enqueue, task
+from app.models import db, Job, Tournament, TournamentPlayer
+
+PAIR_ROUND = 'tournament.pair'
+RATE_TOURNAMENT = 'tournament.rate'
+COMPACT_HISTORY = 'elo_history.compact'
+IMPORT_RESULTS = 'results.import'
+
+
+def pairing_payload(tournament_id: int, round_num: int) -> dict:
+    return {'tournament_id': tournament_id, 'round_num': round_num}
+
+
+def pending_pairing(tournament_id: int, round_num: int) -> Optional[Job]:
+    """The queued or running pairing job for a round, so repeated requests share one ticket"""
+    return Job.query.filter(
+        Job.name == PAIR_ROUND, Job.status.in_(('queued', 'running')),
+        Job.payload == json.dumps(pairing_payload(tournament_id, round_num))
+    ).order_by(Job.id.desc()).first()
+
+
+@task(PAIR_ROUND)
+def pair_round(tournament_id: int, round_num: int) -> dict:
+    """Solve a round from the tournament's current results; the pairings become the job result"""
+    tournament = Tournament.query.options(
+        selectinload(Tournament.participants).joinedload(TournamentPlayer.player),
+        selectinload(Tournament.matches)
+    ).filter_by(id=tournament_id).one()
+    pairings, bye = solve(take_snapshot(tournament), round_num, current_app.config.get('PAIRING_TIMEOUT', 10))
+    return {'pairings': pairings, 'bye': bye}
+
+
+def rate_tournament_key(tournament_id: int) -> str:
+    """Idempotency key: a tournament is rated at most once"""
+    return f'{RATE_TOURNAMENT}:{tournament_id}'
+
+
+@task(RATE_TOURNAMENT)
+def rate_tournament(tournament_id: int):
+    """Player ELO, deck ELO, radar attributes and metagame rows for a completed tournament (one transaction)"""
+    tournament = db.session.get(Tournament, tournament_id)
+    if tournament is None or tournament.status != 'completed':
+        return
+    # Claim the rating in this transaction: a concurrent run blocks on the row
+    # and then matches nothing. Already rated (e.g. by a bulk replay): only
+    # refresh radar attributes
+    claimed = db.session.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id, Tournament.rated_at.is_(None))
+        .values(rated_at=datetime.utcnow())
+    ).rowcount == 1
+    if claimed:
+        calculator = ELOCalculator()
+        calculator.update_tournament_elo(tournament, commit=False)
+        calculator.calculate_deck_elo(tournament, commit=False)
+    update_all_radar_attributes(commit=False, player_ids=[tp.player_id for tp in tournament.participants])
+    record_tournament(db.session, tournament)
+
+    # History compaction piggybacks on tournament completion, at most once a day
+    enqueue(COMPACT_HISTORY, idempotency_key=f'{COMPACT_HISTORY}:{date.today().isoformat()}')
+    # So do the dashboard counter deltas written while the tournament ran
+    enqueue(FOLD_COUNTERS, idempotency_key=f'{FOLD_COUNTERS}:{tournament_id}')
+
+
+@task(COMPACT_HISTORY)
+def compact_history():
+    """Roll ELO history older than ELO_HISTORY_HORIZON_DAYS into summaries"""
+    compact_older_than(db.session.connection(), current_app.config.get('ELO_HISTORY_HORIZON_DAYS', 365),
+                       current_app.config.get('ELO_HISTORY_ARCHIVE', True))
+
+
+@task(IMPORT_RESULTS)
+def import_result_file(path: str, fmt: str, organizer_id: int, filename: str = ''):
+    """Import an uploaded result file (commits itself); the file is removed afterwards"""
+    try:
+        with open(path, 'rb') as stream:
+            stats = import_results(stream, fmt, organizer_id)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    current_app.logger.info(f'Imported {filename or path}: {stats}')
@@ -0,0 +1,41 @@
+"""
+Cached user loading for Flask-Login
+Column values of recently seen users are kept in a short-TTL cache keyed by
+(user id, users generation). A cache hit rebuilds a detached User and
+attaches it to the session without loading the row. Any committed change
+to a user (role promotion, ban, profile update, login timestamp) bumps the
+shared users generation in the same transaction, so every process stops
+serving its cached copies from its next request on.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from app.models import db, User
+from app.cache import TTLCache, generation, USERS
+
+user_cache = TTLCache(default_timeout=30, max_entries=4096)
+
+
+def snapshot(user: User) -> dict:
+    """Column values of a loaded user"""
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+
+def load_user(user_id: int):
+    """Return the user for a session id, from cache when possible"""
+    key = (user_id, generation(USERS))
+    values = user_cache.get(key)
+    if values is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        user_cache.set(key, snapshot(user))
+        return user
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def init_user_cache(app):
+    """Configure cache lifetime from app config"""
+    user_cache.default_timeout = app.config.get('USER_CACHE_TIMEOUT', 30)
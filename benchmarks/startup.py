@@ -0,0 +1,71 @@
+"""
+Cold-start benchmark for the application entry points
+Spawns a fresh interpreter per run so imports and create_app() are measured cold.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--env development]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    'run.py': 'run',
+    'wsgi.py': 'wsgi',
+}
+
+# Optional integrations that should not be imported at boot
+LAZY_MODULES = ('authlib',)
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'modules': len(sys.modules),
+    'lazy_loaded': [m for m in {lazy!r} if m in sys.modules]
+}}))
+"""
+
+
+def measure(module, env, runs):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, 'FLASK_ENV': env},
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold start time of run.py and wsgi.py')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--env', default='development', help='FLASK_ENV for the child processes')
+    args = parser.parse_args()
+
+    print(f"=== Cold start ({args.runs} runs, FLASK_ENV={args.env}) ===")
+    for name, module in ENTRY_POINTS.items():
+        samples = measure(module, args.env, args.runs)
+        times = [s['seconds'] * 1000 for s in samples]
+        eager = sorted({m for s in samples for m in s['lazy_loaded']})
+        print(f"{name:10s} median {statistics.median(times):7.1f} ms | "
+              f"min {min(times):7.1f} ms | max {max(times):7.1f} ms | "
+              f"modules {samples[-1]['modules']}"
+              + (f" | eagerly imported: {', '.join(eager)}" if eager else ""))
+
+
+if __name__ == '__main__':
+    main()
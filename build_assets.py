@@ -0,0 +1,25 @@
+"""
+Static asset build
+Usage:
+    python build_assets.py [--no-clean]
+
+Copies every file under STATIC_ROOT to content-hashed names in
+STATIC_ROOT/ASSET_BUILD_DIR, precompresses text assets (.gz, plus .br when
+the brotli package is installed) and writes the manifest used by
+asset_url(). Run after every deploy that changes static files.
+"""
+import argparse
+import os
+from app import create_app
+from app.assets import build_assets
+
+parser = argparse.ArgumentParser(description='Fingerprint and precompress static assets')
+parser.add_argument('--no-clean', action='store_true', help='Keep files from previous builds')
+args = parser.parse_args()
+
+app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+manifest = build_assets(app.config['STATIC_ROOT'], app.config.get('ASSET_BUILD_DIR', 'build'), clean=not args.no_clean)
+for source, target in sorted(manifest.items()):
+    print(f'  {source} -> {target}')
+print(f'✓ Built {len(manifest)} assets')
@@ -0,0 +1,27 @@
+"""
+ELO history compaction
+Usage:
+    python compact_history.py [--days N] [--no-archive]
+
+Rolls every tournament whose ELO history is older than N days (default:
+ELO_HISTORY_HORIZON_DAYS) into per-player summary rows and moves the raw
+rows to elo_history_archive (or drops them with --no-archive).
+"""
+import argparse
+import os
+from app import create_app
+from app.models import db
+from app.analytics.history_compaction import compact_older_than
+
+parser = argparse.ArgumentParser(description='Compact old ELO history')
+parser.add_argument('--days', type=int, default=None, help='Horizon in days (default: ELO_HISTORY_HORIZON_DAYS)')
+parser.add_argument('--no-archive', action='store_true', help='Delete raw rows instead of archiving them')
+args = parser.parse_args()
+
+app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+with app.app_context():
+    days = args.days if args.days is not None else app.config.get('ELO_HISTORY_HORIZON_DAYS', 365)
+    stats = compact_older_than(db.session.connection(), days, archive=not args.no_archive)
+    db.session.commit()
+    print(f"✓ Compacted {stats['tournaments']} tournaments: {stats['rows']} rows -> {stats['summaries']} summaries")
@@ -8,6 +8,9 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Create missing tables in create_app(); production runs migrate.py instead
+    SCHEMA_AUTO_CREATE = True
+
     # Google OAuth
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
@@ -19,6 +22,48 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 86400  # 24 hours
 
+    # Rendered fragment cache (per process; invalidated through the shared cache_generations table)
+    FRAGMENT_CACHE_TIMEOUT = 300  # seconds
+    FRAGMENT_CACHE_MAX_ENTRIES = 1024
+    # Compiled templates kept in instance/jinja_cache across restarts
+    JINJA_BYTECODE_CACHE = True
+
+    # Per-request SQL/render profiling shown on the admin dashboard (opt-in)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION') == '1'
+    SQL_INSTRUMENTATION_BUFFER = 500     # requests kept per process
+    SQL_INSTRUMENTATION_SLOWEST = 5      # statements kept per request
+
+    # Background jobs (app.jobs): worker threads started in each web process
+    # on first request; set to 0 when running worker.py separately
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 1))
+    JOB_URGENT_THREADS = 1       # extra in-process threads that only run urgent jobs (pairings)
+    JOB_POLL_INTERVAL = 2        # seconds between polls when the queue is empty
+    JOB_LEASE = 60               # seconds a claim lasts unless the running worker renews it
+    JOB_RETRY_DELAY = 30         # seconds, doubled on every failed attempt
+
+    # Pairing jobs: seconds of rematch-free search before falling back to minimal rematches
+    PAIRING_TIMEOUT = 10
+
+    # Uploaded result files wait here for the import job; must be visible to worker.py
+    IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR')  # default: instance/imports
+
+    # ELO history compaction: tournaments older than the horizon are kept as
+    # per-player summaries; raw rows move to elo_history_archive
+    ELO_HISTORY_HORIZON_DAYS = 365
+    ELO_HISTORY_ARCHIVE = True
+
+    # Static assets (app.assets): python build_assets.py writes fingerprinted,
+    # precompressed copies to STATIC_ROOT/ASSET_BUILD_DIR, served with this max-age
+    STATIC_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    ASSET_BUILD_DIR = 'build'
+    ASSET_MAX_AGE = 31536000  # one year; hashed names change with their content
+
+    # Per-player rating series cache (app.analytics.rating_series), per process
+    RATING_SERIES_CACHE_BYTES = 32 * 1024 * 1024
+
+    # Flask-Login user cache (invalidated through the shared cache_generations table)
+    USER_CACHE_TIMEOUT = 30  # seconds
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
@@ -30,16 +75,53 @@ class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SESSION_COOKIE_SECURE = True  # Require HTTPS
+    SCHEMA_AUTO_CREATE = False
+    # Jobs run in worker.py processes, not in web workers
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 0))
+
+class SQLiteProductionConfig(ProductionConfig):
+    """Production on a single SQLite file (event nights)"""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///ptcg.db'
+
+    # Applied to every connection: WAL lets readers run alongside the writer,
+    # NORMAL sync is durable in WAL mode, and busy_timeout waits out short
+    # write locks instead of failing with "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,       # 64 MB page cache per connection
+        'mmap_size': 268435456,     # 256 MB memory-mapped I/O
+        'busy_timeout': 5000,       # ms
+        'temp_store': 'MEMORY',
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 8,
+        'max_overflow': 4,
+        'pool_timeout': 10,
+        'pool_recycle': 3600,
+        'connect_args': {'timeout': 5, 'check_same_thread': False},
+    }
+
+    # Route long analytics reads to a separate query_only connection pool
+    SQLITE_READ_ONLY_ANALYTICS = True
+    SQLITE_READ_ONLY_ENGINE_OPTIONS = {
+        'pool_size': 4,
+        'max_overflow': 4,
+        'connect_args': {'timeout': 5, 'check_same_thread': False},
+    }
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///test_ptcg.db'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'  # in memory, fresh for every app
     WTF_CSRF_ENABLED = False
+    JOB_WORKER_THREADS = 0
+    JINJA_BYTECODE_CACHE = False
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'production-sqlite': SQLiteProductionConfig,
     'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,56 @@
+"""
+Bulk data export for offline analysis
+Usage:
+    python export_data.py DATASET [--format ndjson|csv|parquet] [--since ISO] [--output PATH]
+
+DATASET is one of matches, elo_history, elo_history_summary,
+tournament_players, decks, deletions.
+With --since only rows written after that time are written; the upper
+bound used is printed so the next run can pass it as --since. The
+deletions dataset lists rows removed by rating replays and history
+compaction; apply it before the other datasets of the same window.
+Parquet output requires pyarrow.
+"""
+import argparse
+import os
+import sys
+from app import create_app
+from app.models import db
+from app.analytics.export import DATASETS, STREAMERS, export_until, parse_since, write_parquet
+
+parser = argparse.ArgumentParser(description='Export PTCG Arena data')
+parser.add_argument('dataset', choices=sorted(DATASETS))
+parser.add_argument('--format', choices=(*STREAMERS, 'parquet'), default='ndjson')
+parser.add_argument('--since', default=None, help='Only rows changed after this ISO date/time')
+parser.add_argument('--output', default=None, help='Output file (default: stdout; required for parquet)')
+args = parser.parse_args()
+
+try:
+    since = parse_since(args.since)
+except ValueError:
+    print(f"✗ Invalid --since value: {args.since}", file=sys.stderr)
+    sys.exit(1)
+
+app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+with app.app_context():
+    until = export_until()
+    if args.format == 'parquet':
+        if not args.output:
+            print("✗ --output is required for parquet", file=sys.stderr)
+            sys.exit(1)
+        try:
+            rows = write_parquet(db.session, args.dataset, args.output, since, until)
+        except ImportError:
+            print("✗ Parquet export requires pyarrow (pip install pyarrow)", file=sys.stderr)
+            sys.exit(1)
+        print(f"✓ Wrote {rows} rows to {args.output}", file=sys.stderr)
+    else:
+        out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            for chunk in STREAMERS[args.format](db.session, args.dataset, since, until):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+    print(f"✓ Exported up to {until.isoformat()} (use as --since for the next pull)", file=sys.stderr)
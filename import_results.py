@@ -0,0 +1,47 @@
+"""
+Bulk import of historical tournament results
+Usage:
+    python import_results.py FILE [FILE ...] [--format csv|json|xml] [--organizer EMAIL] [--batch-size N]
+
+Each file is imported in one transaction and followed by a full ELO replay.
+See app/tournament/importer.py for the record fields.
+"""
+import argparse
+import os
+import sys
+import time
+from app import create_app
+from app.models import User
+from app.tournament.importer import BATCH_SIZE, ImportFormatError, detect_format, import_results
+
+parser = argparse.ArgumentParser(description='Import historical tournament results')
+parser.add_argument('files', nargs='+', help='CSV, JSON Lines or XML result files')
+parser.add_argument('--format', choices=('csv', 'json', 'xml'), default=None,
+                    help='File format (default: from the file extension)')
+parser.add_argument('--organizer', default=None, help='Organizer email for imported tournaments (default: first admin)')
+parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Matches per bulk insert')
+args = parser.parse_args()
+
+app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+with app.app_context():
+    if args.organizer:
+        organizer = User.query.filter_by(email=args.organizer).first()
+    else:
+        organizer = User.query.filter_by(role='admin').order_by(User.id).first()
+    if organizer is None:
+        print("✗ Organizer not found")
+        sys.exit(1)
+
+    for path in args.files:
+        started = time.perf_counter()
+        try:
+            with open(path, 'rb') as stream:
+                stats = import_results(stream, args.format or detect_format(path), organizer.id, args.batch_size)
+        except (ImportFormatError, ValueError) as e:
+            print(f"✗ {path}: {e}")
+            sys.exit(1)
+        elapsed = time.perf_counter() - started
+        print(f"✓ {path}: {stats.get('tournaments', 0)} tournaments, {stats.get('matches', 0)} matches, "
+              f"{stats.get('players_created', 0)} new players, {stats.get('decks_created', 0)} new decks, "
+              f"{stats.get('skipped_tournaments', 0)} skipped ({elapsed:.1f}s)")
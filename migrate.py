@@ -0,0 +1,47 @@
+"""
+Database schema management
+Usage:
+    python migrate.py upgrade [--to VERSION]   Apply pending migrations
+    python migrate.py status                   Show applied/pending migrations
+    python migrate.py check-indexes            EXPLAIN hot queries and verify index usage
+"""
+import argparse
+import os
+import sys
+from app import create_app
+from app import migrations
+
+parser = argparse.ArgumentParser(description='PTCG Arena schema migrations')
+subparsers = parser.add_subparsers(dest='command', required=True)
+upgrade_parser = subparsers.add_parser('upgrade', help='Apply pending migrations')
+upgrade_parser.add_argument('--to', type=int, default=None, help='Target version (default: latest)')
+subparsers.add_parser('status', help='Show migration status')
+check_parser = subparsers.add_parser('check-indexes', help='Verify hot queries use their indexes')
+check_parser.add_argument('--verbose', action='store_true', help='Print full query plans')
+args = parser.parse_args()
+
+app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+with app.app_context():
+    if args.command == 'upgrade':
+        applied = migrations.upgrade(args.to)
+        for step in applied:
+            print(f"✓ Applied {step.version:03d}: {step.description}")
+        if not applied:
+            print("✓ Database is up to date")
+
+    elif args.command == 'status':
+        for step in migrations.status():
+            mark = '✓' if step['applied'] else '·'
+            print(f"{mark} {step['version']:03d}: {step['description']}")
+
+    elif args.command == 'check-indexes':
+        failures = 0
+        for result in migrations.check_indexes():
+            mark = '✓' if result['used'] else '✗'
+            print(f"{mark} {result['query']} -> {result['index']}")
+            if args.verbose or not result['used']:
+                for line in result['plan'].splitlines():
+                    print(f"    {line}")
+            failures += not result['used']
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,18 @@
+"""
+Shared fixtures - an app on a fresh in-memory database per test
+"""
+import pytest
+from app import create_app
+from app.cache import fragment_cache
+from app.models import db
+from app.user_cache import user_cache
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    fragment_cache.clear()
+    user_cache.clear()
+    with app.app_context():
+        yield app
+        db.session.remove()
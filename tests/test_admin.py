@@ -0,0 +1,85 @@
+"""
+Test admin user management - keyset pages and the streamed CSV export
+"""
+import csv
+import io
+import re
+import pytest
+from app.admin import routes
+from app.models import db, User
+
+
+@pytest.fixture
+def admin_client(app, client):
+    admin = User(email='root@example.com', username='root', role='admin')
+    db.session.add(admin)
+    db.session.add_all(User(email=f'member{i}@example.com', username=f'member-{i}', role=role)
+                       for i, role in enumerate(['player', 'viewer', 'player', 'organizer', 'player'], start=1))
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+    return client
+
+
+def user_pages(client, **params):
+    """Usernames on every page, following the next links"""
+    pages = []
+    while True:
+        html = client.get('/admin/users', query_string=params).get_data(as_text=True)
+        pages.append(re.findall(r'member-\d+', html))
+        after = re.search(r'after=(\d+)', html)
+        if after is None:
+            return pages
+        params = {**params, 'after': after.group(1)}
+
+
+def export(client, **params):
+    response = client.get('/admin/users/export.csv', query_string=params)
+    assert response.mimetype == 'text/csv'
+    return list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+
+def test_user_pages_follow_the_id_cursor(admin_client, monkeypatch):
+    """Every user is listed once across pages, and the last page has no next link"""
+    monkeypatch.setattr(routes, 'USERS_PER_PAGE', 2)
+    assert user_pages(admin_client) == [['member-1'], ['member-2', 'member-3'], ['member-4', 'member-5']]
+    assert user_pages(admin_client, role='player') == [['member-1', 'member-3'], ['member-5']]
+    assert user_pages(admin_client, q='member4@') == [['member-4']]
+
+
+def test_export_streams_every_matching_user(admin_client, monkeypatch):
+    """Rows span several cursor chunks and follow the page filters"""
+    monkeypatch.setattr(routes, 'EXPORT_CHUNK_SIZE', 2)
+    rows = export(admin_client)
+    assert rows[0] == list(routes.USER_EXPORT_COLUMNS)
+    assert [row[1] for row in rows[1:]] == ['root'] + [f'member-{i}' for i in range(1, 6)]
+    assert [row[1] for row in export(admin_client, role='player')[1:]] == ['member-1', 'member-3', 'member-5']
+
+
+def test_export_escapes_formulas(admin_client):
+    """User-controlled cells that a spreadsheet would evaluate are quoted"""
+    db.session.add_all([User(email='+1@example.com', username='=HYPERLINK("http://x")', role='viewer'),
+                        User(email='a@example.com', username='@SUM(A1)', role='viewer'),
+                        User(email='b@example.com', username='-2+3', role='viewer')])
+    db.session.commit()
+    assert [(row[1], row[2]) for row in export(admin_client, role='viewer')[1:]] == [
+        ('member-2', 'member2@example.com'),
+        ("'=HYPERLINK(\"http://x\")", "'+1@example.com"),
+        ("'@SUM(A1)", 'a@example.com'),
+        ("'-2+3", 'b@example.com'),
+    ]
+
+
+def test_users_requires_admin(app, client):
+    """Organizers cannot list or export users"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    db.session.add(organizer)
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(organizer.id)
+    assert client.get('/admin/users').status_code == 403
+    assert client.get('/admin/users/export.csv').status_code == 403
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
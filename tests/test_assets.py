@@ -0,0 +1,63 @@
+"""
+Test static asset fingerprinting, precompression and cache headers
+"""
+import gzip
+import pytest
+from flask import Flask, render_template_string
+from app.assets import build_assets, init_assets
+
+
+@pytest.fixture
+def static_root(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'main.css').write_text('body { color: red; }\n' * 100)
+    return tmp_path
+
+
+def make_app(static_root):
+    app = Flask(__name__)
+    app.config['STATIC_ROOT'] = str(static_root)
+    init_assets(app)
+    return app
+
+
+def test_build_writes_hashed_and_gzipped_copies(static_root):
+    """Hashed names change with content and ship with a .gz sibling"""
+    manifest = build_assets(str(static_root))
+    hashed = manifest['css/main.css']
+    assert hashed.startswith('build/css/main.') and hashed.endswith('.css')
+    assert gzip.decompress((static_root / (hashed + '.gz')).read_bytes()) == (static_root / 'css' / 'main.css').read_bytes()
+
+    (static_root / 'css' / 'main.css').write_text('body { color: blue; }\n')
+    assert build_assets(str(static_root))['css/main.css'] != hashed
+
+
+def test_hashed_assets_are_immutable_and_precompressed(static_root):
+    """asset_url links the hashed file, served compressed with a far-future max-age"""
+    app = make_app(static_root)
+    manifest = build_assets(str(static_root))
+    with app.test_request_context():
+        url = render_template_string("{{ asset_url('css/main.css') }}")
+    assert url == '/static/' + manifest['css/main.css']
+
+    response = app.test_client().get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    assert response.mimetype == 'text/css'
+
+
+def test_unbuilt_assets_fall_back_to_plain_static(static_root):
+    """Without a manifest the plain file is linked and revalidated as before"""
+    app = make_app(static_root)
+    with app.test_request_context():
+        url = render_template_string("{{ asset_url('css/main.css') }}")
+    assert url == '/static/css/main.css'
+    response = app.test_client().get(url)
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,46 @@
+"""
+Test app startup - production boot without create_all and lazy OAuth
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+from sqlalchemy import inspect
+from app import create_app
+from app.models import db
+from config import ProductionConfig
+
+
+def test_production_boot_leaves_schema_to_migrations(monkeypatch):
+    """Production configs never call create_all(); migrate.py owns the schema"""
+    monkeypatch.setattr(ProductionConfig, 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    monkeypatch.setattr(ProductionConfig, 'JINJA_BYTECODE_CACHE', False)
+    monkeypatch.setattr(type(db), 'create_all', lambda *args, **kwargs: pytest.fail('create_all() called'))
+    app = create_app('production')
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+
+
+def test_authlib_is_imported_on_first_oauth_use():
+    """Booting and serving pages leave authlib unimported until a Google login needs it"""
+    script = textwrap.dedent("""
+        import sys
+        from app import create_app
+        from app.auth import get_oauth
+        app = create_app('testing')
+        client = app.test_client()
+        assert client.get('/').status_code == 200
+        assert client.get('/auth/login').status_code == 200
+        assert 'authlib' not in sys.modules, 'imported at boot'
+        with app.app_context():
+            assert get_oauth().google is not None
+        assert 'authlib' in sys.modules
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,83 @@
+"""
+Test in-process TTL cache and generation-based invalidation
+"""
+import pytest
+from flask import g
+from jinja2 import Environment
+from sqlalchemy.orm import Session
+from app.cache import TTLCache, FragmentCacheExtension, bump_generation, cache_key, generation, RATINGS
+from app.models import db, Player
+
+
+def test_entries_expire():
+    """Entries past their timeout should be dropped"""
+    cache = TTLCache(default_timeout=60)
+    cache.set('a', 1)
+    cache.set('b', 2, timeout=-1)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+
+
+def test_lru_eviction():
+    """Least recently used entries are evicted past max_entries"""
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_generation_bump_changes_key(app):
+    """Bumping a generation should produce a fresh cache key once the session commits"""
+    before = cache_key('home:live', 'test_generation')
+    bump_generation('test_generation')
+    assert cache_key('home:live', 'test_generation') == before
+    db.session.commit()
+    assert cache_key('home:live', 'test_generation') != before
+
+
+def test_generations_are_shared_through_the_database(app):
+    """A bump committed by another session (e.g. worker.py) invalidates this process's keys"""
+    before = cache_key('leaderboard', RATINGS)
+    with Session(db.engine) as other:
+        other.add(Player(name='Alice'))
+        other.commit()
+    g.pop('cache_generations', None)  # next request
+    assert generation(RATINGS) == 1
+    assert cache_key('leaderboard', RATINGS) != before
+
+
+def test_rollback_discards_bumps(app):
+    """Changes that roll back leave the generations alone"""
+    db.session.add(Player(name='Bob'))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert generation(RATINGS) == 0
+
+
+def test_cache_tag_renders_body_once_per_generation(app):
+    """The {% cache %} body is reused until a generation it depends on is bumped"""
+    env = Environment(extensions=[FragmentCacheExtension])
+    template = env.from_string(
+        "{% cache 'test_tag', table_id, depends='test_tag_generation' %}{{ rows() }}{% endcache %}"
+    )
+    calls = []
+
+    def rows():
+        calls.append(1)
+        return f'<tr>{len(calls)}</tr>'
+
+    assert template.render(table_id=1, rows=rows) == '<tr>1</tr>'
+    assert template.render(table_id=1, rows=rows) == '<tr>1</tr>'
+    assert template.render(table_id=2, rows=rows) == '<tr>2</tr>'
+    bump_generation('test_tag_generation')
+    db.session.commit()
+    assert template.render(table_id=1, rows=rows) == '<tr>3</tr>'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
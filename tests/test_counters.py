@@ -0,0 +1,55 @@
+"""
+Test dashboard counters - delta rows and folding
+"""
+import pytest
+from app import counters
+from app.counters import fold_counter_deltas, get_counters
+from app.models import db, Player, SiteCounters, SiteCounterDelta
+
+
+def test_writes_add_delta_rows_not_counter_updates(app):
+    """Inserts leave the counters row alone; reads add the pending deltas"""
+    get_counters()
+    db.session.add_all([Player(name='Alice'), Player(name='Bob')])
+    db.session.commit()
+    db.session.delete(db.session.query(Player).filter_by(name='Bob').one())
+    db.session.commit()
+
+    assert db.session.get(SiteCounters, 1).players == 0
+    assert db.session.query(SiteCounterDelta).count() == 2
+    assert get_counters().players == 1
+
+
+def test_fold_moves_deltas_into_the_counters_row(app):
+    """Folding keeps the totals and empties the delta table"""
+    get_counters()
+    db.session.add(Player(name='Carol'))
+    db.session.commit()
+
+    assert fold_counter_deltas(db.session.connection()) == 1
+    db.session.commit()
+    assert db.session.query(SiteCounterDelta).count() == 0
+    assert db.session.get(SiteCounters, 1).players == 1
+    assert get_counters().players == 1
+    assert fold_counter_deltas(db.session.connection()) == 0
+
+
+def test_read_folds_past_the_threshold(app, monkeypatch):
+    """Without a rated tournament to fold them, reads keep the pending deltas bounded"""
+    monkeypatch.setattr(counters, 'FOLD_THRESHOLD', 2)
+    get_counters()
+    for name in ('Alice', 'Bob'):
+        db.session.add(Player(name=name))
+        db.session.commit()
+    assert get_counters().players == 2
+    assert db.session.query(SiteCounterDelta).count() == 2
+
+    db.session.add(Player(name='Carol'))
+    db.session.commit()
+    assert get_counters().players == 3
+    assert db.session.query(SiteCounterDelta).count() == 0
+    assert db.session.get(SiteCounters, 1).players == 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,90 @@
+"""
+Test deck nature tags - sync from Deck.natures, filtering and rebuilds
+"""
+import pytest
+from sqlalchemy import select
+from app.analytics.deck_natures import filter_by_nature, nature_names, rebuild_deck_natures
+from app.cache import generation, DECKS
+from app.models import db, Deck, DeckNature
+
+
+def tags(deck):
+    return list(db.session.execute(
+        select(DeckNature.name).where(DeckNature.deck_id == deck.id).order_by(DeckNature.name)
+    ).scalars())
+
+
+def test_new_deck_tags(app):
+    """Creating a deck writes one tag row per distinct, trimmed nature"""
+    deck = Deck(name='Lugia', natures=' Meta Deck, Box Deck,Meta Deck,, ')
+    db.session.add(deck)
+    db.session.commit()
+    assert tags(deck) == ['Box Deck', 'Meta Deck']
+
+
+def test_edited_deck_tags(app):
+    """Adding, removing, reordering and duplicating natures keeps the rows in step"""
+    deck = Deck(name='Lugia', natures='A,B')
+    db.session.add(deck)
+    db.session.commit()
+
+    deck.natures = 'A,B,C'
+    db.session.commit()
+    assert tags(deck) == ['A', 'B', 'C']
+
+    deck.natures = 'C,A'
+    db.session.commit()
+    assert tags(deck) == ['A', 'C']
+
+    deck.natures = 'A,C,A,C'
+    db.session.commit()
+    assert tags(deck) == ['A', 'C']
+
+    deck.natures = None
+    db.session.commit()
+    assert tags(deck) == []
+
+
+def test_filter_by_nature(app):
+    """The nature filter is a join on the tag index"""
+    db.session.add_all([Deck(name='Lugia', natures='Meta Deck'), Deck(name='Gardevoir', natures='Box Deck,Meta Deck'),
+                        Deck(name='Snorlax', natures='Box Deck'), Deck(name='Pikachu')])
+    db.session.commit()
+
+    query = filter_by_nature(db.session.query(Deck), 'Meta Deck')
+    assert 'deck_natures' in str(query.statement)
+    assert sorted(deck.name for deck in query) == ['Gardevoir', 'Lugia']
+    assert filter_by_nature(db.session.query(Deck), None).count() == 4
+    assert filter_by_nature(db.session.query(Deck), 'Unknown').count() == 0
+    assert nature_names(db.session) == ['Box Deck', 'Meta Deck']
+
+
+def test_rebuild_existing_rows(app):
+    """Rows written without the ORM (imports, old databases) are tagged by a rebuild"""
+    conn = db.session.connection()
+    conn.execute(Deck.__table__.insert(), [{'id': 1, 'name': 'Lugia', 'natures': 'A, B, A'},
+                                           {'id': 2, 'name': 'Snorlax', 'natures': None}])
+    conn.execute(DeckNature.__table__.insert(), [{'deck_id': 2, 'name': 'Stale'}])
+
+    assert rebuild_deck_natures(conn) == 2
+    assert sorted(conn.execute(select(DeckNature.deck_id, DeckNature.name))) == [(1, 'A'), (1, 'B')]
+
+
+def test_nature_change_bumps_decks_generation(app):
+    """Cached deck leaderboards are invalidated when a deck's natures change, not when others do"""
+    deck = Deck(name='Lugia', natures='A')
+    db.session.add(deck)
+    db.session.commit()
+    before = generation(DECKS)
+
+    deck.natures = 'A,B'
+    db.session.commit()
+    assert generation(DECKS) == before + 1
+
+    deck.elo = 1600.0
+    db.session.commit()
+    assert generation(DECKS) == before + 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -2,15 +2,19 @@
 Test ELO Calculator - Verify ported logic matches original
 """
 import pytest
+from types import SimpleNamespace
+from app.analytics import elo_calculator
 from app.analytics.elo_calculator import (
     get_k_factor,
     expected_score,
+    update_all_radar_attributes,
     ELOCalculator,
     STARTING_ELO,
     K_FACTOR_NEW,
     K_FACTOR_ESTABLISHED,
     K_FACTOR_VETERAN
 )
+from app.models import db, Player
 
 
 def test_k_factor_calculation():
@@ -78,5 +82,21 @@ def test_k_factors_match_original():
     assert K_FACTOR_VETERAN == 16
 
 
+
+def test_radar_update_reads_series_only_for_given_players(app, monkeypatch):
+    """Clutch is recomputed for the tournament's players; others keep theirs while skill moves"""
+    players = [Player(name=name, elo=elo, games_played=10, wins=5, clutch=70.0)
+               for name, elo in (('Alice', 1600.0), ('Bob', 1500.0), ('Carol', 1400.0))]
+    db.session.add_all(players)
+    db.session.commit()
+    loaded = []
+    monkeypatch.setattr(elo_calculator, 'get_rating_series',
+                        lambda player_id: loaded.append(player_id) or SimpleNamespace(clutch=lambda: None))
+
+    update_all_radar_attributes(player_ids=[players[0].id])
+    assert loaded == [players[0].id]
+    assert [(p.skill, p.clutch) for p in players] == [(100.0, 50.0), (66.7, 70.0), (33.3, 70.0)]
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
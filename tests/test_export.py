@@ -0,0 +1,72 @@
+"""
+Test incremental exports - write-time cursor and deletion tombstones
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from app.analytics.elo_calculator import replay_all_elo
+from app.analytics.export import export_query
+from app.analytics.history_compaction import compact_history
+from app.models import db, Deck, Match, Player, Tournament, TournamentPlayer, User
+
+
+def exported(dataset, since, until=None):
+    return db.session.execute(export_query(dataset, since, until)).all()
+
+
+def make_tournament():
+    """A completed 2020 tournament with one rated match, as an import would write it"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    deck = Deck(name='Deck A')
+    tournament = Tournament(name='Old Cup', date=date(2020, 5, 1), organizer=organizer,
+                            status='completed', created_at=datetime(2020, 5, 1), completed_at=datetime(2020, 5, 1))
+    p1 = TournamentPlayer(tournament=tournament, player=Player(name='Alice'), deck=deck)
+    p2 = TournamentPlayer(tournament=tournament, player=Player(name='Bob'), deck=deck)
+    match = Match(tournament=tournament, round_number=1, player1=p1, player2=p2, result='player1',
+                  created_at=datetime(2020, 5, 1, 10), completed_at=datetime(2020, 5, 1, 11))
+    db.session.add_all([tournament, match])
+    db.session.commit()
+    return tournament, match
+
+
+def test_backdated_rows_export_by_write_time(app):
+    """Imported rows carry old match times but are picked up by the next pull"""
+    since = datetime.utcnow() - timedelta(seconds=1)
+    tournament, match = make_tournament()
+
+    assert [row.id for row in exported('matches', since)] == [match.id]
+    assert len(exported('tournament_players', since)) == 2
+
+    # Later rating changes resync the deck and participants rows
+    until = datetime.utcnow()
+    assert exported('decks', until) == []
+    deck = db.session.query(Deck).one()
+    deck.elo = 1520.0
+    tournament.participants[0].points = 3
+    db.session.commit()
+    assert [row.elo for row in exported('decks', until)] == [1520.0]
+    assert [row.points for row in exported('tournament_players', until)] == [3]
+
+
+def test_replay_and_compaction_leave_tombstones(app):
+    """Replays reset history datasets; compaction tombstones each moved row"""
+    make_tournament()
+    since = datetime.utcnow() - timedelta(seconds=1)
+    replay_all_elo(db.session.connection())
+    db.session.commit()
+
+    resets = exported('deletions', since)
+    assert sorted((row.dataset, row.row_id) for row in resets) == [('elo_history', None),
+                                                                   ('elo_history_summary', None)]
+    history_ids = [row.id for row in exported('elo_history', since)]
+    assert len(history_ids) == 2
+    assert all(row.updated_at >= resets[0].deleted_at for row in exported('elo_history', since))
+
+    until = datetime.utcnow()
+    compact_history(db.session.connection(), datetime(2021, 1, 1))
+    db.session.commit()
+    assert sorted(row.row_id for row in exported('deletions', until)) == sorted(history_ids)
+    assert len(exported('elo_history_summary', until)) == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,41 @@
+"""
+Test head-to-head tallying - unordered pair keys and result attribution
+"""
+import pytest
+from app.analytics.head_to_head import tally_results
+from app.models import HeadToHead
+
+
+def test_pair_key_is_unordered():
+    """Both orders of a pair should map to the same key"""
+    assert HeadToHead.pair_key(7, 3) == HeadToHead.pair_key(3, 7) == (3, 7)
+
+
+def test_tally_attributes_wins_to_pair_sides():
+    """Wins are counted for the lower/higher id regardless of seat"""
+    tally = tally_results([
+        (3, 7, 'player1', None),   # 3 beats 7
+        (7, 3, 'player1', None),   # 7 beats 3
+        (7, 3, 'player2', None),   # 3 beats 7
+        (3, 7, 'draw', None),
+        (3, None, 'bye', None),
+    ])
+    counts = tally[(3, 7)]
+    assert counts['low_wins'] == 2
+    assert counts['high_wins'] == 1
+    assert counts['draws'] == 1
+    assert counts['matches_played'] == 4
+    assert len(tally) == 1
+
+
+def test_record_for_either_player():
+    """record_for flips wins and losses for the higher id"""
+    row = HeadToHead(player_low_id=3, player_high_id=7, low_wins=2, high_wins=1,
+                     draws=0, double_losses=0, matches_played=3)
+    assert row.record_for(3)['wins'] == 2
+    assert row.record_for(7)['wins'] == 1
+    assert row.record_for(7)['opponent_id'] == 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,123 @@
+"""
+Test ELO history compaction - summaries, archive moves and the horizon
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+from app.analytics.history_compaction import compact_history, compact_older_than
+from app.models import (db, ELOHistory, ELOHistoryArchive, ELOHistorySummary, ExportTombstone, Player,
+                        RatingCheckpoint, Tournament, User)
+
+CUTOFF = datetime(2024, 6, 1)
+
+
+def history_rows(model, **filters):
+    table = model.__table__
+    query = select(*(table.c[column.name] for column in ELOHistory.__table__.columns))
+    for name, value in filters.items():
+        query = query.where(table.c[name] == value)
+    return sorted(db.session.execute(query).all())
+
+
+@pytest.fixture
+def history(app):
+    """Two players over an old tournament (two matches each) and a recent one"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    alice, bob = Player(name='Alice'), Player(name='Bob')
+    old, recent = (Tournament(name=name, date=day.date(), organizer=organizer, status='completed')
+                   for name, day in (('Old', datetime(2024, 1, 6)), ('Recent', CUTOFF + timedelta(days=10))))
+    db.session.add_all([alice, bob, old, recent])
+    db.session.flush()
+    rows = [
+        (old, datetime(2024, 1, 6, 10), alice, 1500, 1516), (old, datetime(2024, 1, 6, 10), bob, 1500, 1484),
+        (old, datetime(2024, 1, 6, 11), alice, 1516, 1530), (old, datetime(2024, 1, 6, 11), bob, 1484, 1470),
+        (recent, CUTOFF + timedelta(days=10), alice, 1530, 1515),
+    ]
+    for tournament, at, player, before, after in rows:
+        db.session.add(ELOHistory(player_id=player.id, tournament_id=tournament.id, timestamp=at,
+                                  elo_before=before, elo_after=after, elo_change=after - before))
+        db.session.flush()
+    db.session.commit()
+    return old, recent, alice, bob
+
+
+def test_summary_values(history):
+    """One summary per player: first and last timestamps, final rating and the last raw row"""
+    old, recent, alice, bob = history
+    last_alice = db.session.scalar(select(func.max(ELOHistory.id))
+                                   .where(ELOHistory.player_id == alice.id, ELOHistory.tournament_id == old.id))
+    stats = compact_history(db.session.connection(), CUTOFF)
+    db.session.commit()
+    assert stats == {'tournaments': 1, 'summaries': 2, 'rows': 4}
+
+    summary = db.session.execute(select(ELOHistorySummary).filter_by(player_id=alice.id)).scalar_one()
+    assert summary.tournament_id == old.id
+    assert (summary.elo_before, summary.elo_after, summary.elo_change) == (1500, 1530, 30)
+    assert summary.matches_played == 2
+    assert (summary.first_timestamp, summary.timestamp) == (datetime(2024, 1, 6, 10), datetime(2024, 1, 6, 11))
+    assert summary.last_history_id == last_alice
+
+    # Checkpoints are rewritten from the summaries
+    checkpoint = db.session.execute(
+        select(RatingCheckpoint).filter_by(player_id=alice.id, tournament_id=old.id)).scalar_one()
+    assert (checkpoint.elo_after, checkpoint.seq, checkpoint.timestamp) == (1530, last_alice, summary.timestamp)
+
+
+def test_archive_keeps_the_deleted_rows(history):
+    """Raw rows move to the archive unchanged and leave export tombstones; recent rows stay hot"""
+    old, recent = history[:2]
+    before = history_rows(ELOHistory, tournament_id=old.id)
+    compact_history(db.session.connection(), CUTOFF)
+    db.session.commit()
+
+    assert history_rows(ELOHistoryArchive) == before
+    assert history_rows(ELOHistory, tournament_id=old.id) == []
+    assert len(history_rows(ELOHistory, tournament_id=recent.id)) == 1
+    assert sorted(db.session.execute(select(ExportTombstone.row_id).filter_by(dataset='elo_history')).scalars()) \
+        == [row.id for row in before]
+
+
+def test_without_archive(history):
+    """ELO_HISTORY_ARCHIVE=False drops the raw rows but still writes summaries"""
+    old = history[0]
+    stats = compact_history(db.session.connection(), CUTOFF, archive=False)
+    db.session.commit()
+    assert stats['rows'] == 4
+    assert history_rows(ELOHistoryArchive) == []
+    assert history_rows(ELOHistory, tournament_id=old.id) == []
+    assert db.session.query(ELOHistorySummary).count() == 2
+
+
+def test_rerun_is_a_no_op(history):
+    """Compacted tournaments have no hot rows left, so a second run changes nothing"""
+    compact_history(db.session.connection(), CUTOFF)
+    db.session.commit()
+    assert compact_history(db.session.connection(), CUTOFF) == {'tournaments': 0, 'summaries': 0, 'rows': 0}
+    db.session.commit()
+    assert db.session.query(ELOHistorySummary).count() == 2
+    assert db.session.query(ELOHistoryArchive).count() == 4
+
+
+def test_horizon_counts_whole_tournaments(app):
+    """compact_older_than() leaves tournaments with any match inside the horizon alone"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    player = Player(name='Alice')
+    done, spanning = (Tournament(name=name, date=date(2024, 1, 1), organizer=organizer, status='completed')
+                      for name in ('Done', 'Spanning'))
+    db.session.add_all([player, done, spanning])
+    db.session.flush()
+    now = datetime.utcnow()
+    for tournament, days_ago in ((done, 40), (done, 31), (spanning, 40), (spanning, 29)):
+        db.session.add(ELOHistory(player_id=player.id, tournament_id=tournament.id,
+                                  timestamp=now - timedelta(days=days_ago),
+                                  elo_before=1500, elo_after=1500, elo_change=0))
+    db.session.commit()
+
+    assert compact_older_than(db.session.connection(), 30)['tournaments'] == 1
+    db.session.commit()
+    assert [row.tournament_id for row in db.session.query(ELOHistorySummary)] == [done.id]
+    assert db.session.query(ELOHistory).filter_by(tournament_id=spanning.id).count() == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
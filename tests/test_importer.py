@@ -0,0 +1,56 @@
+"""
+Test result import parsing - record validation and streaming readers
+"""
+import io
+import pytest
+from datetime import date
+from app.tournament.importer import ImportFormatError, open_records, parse_row
+
+
+def test_parse_row_normalizes_fields():
+    """Whitespace is stripped, numbers parsed and defaults applied"""
+    row = parse_row({'tournament': ' City League ', 'date': '2024-05-04', 'round': '2',
+                     'player1': '小明', 'deck1': '', 'player2': 'Alice', 'deck2': 'Lost Box',
+                     'result': 'Player1', 'p1_game_wins': '2', 'p2_game_wins': '1'}, 1)
+    assert row.tournament == 'City League'
+    assert row.date == date(2024, 5, 4)
+    assert row.round == 2
+    assert row.deck1 is None
+    assert row.result == 'player1'
+    assert row.mode == 'normal'
+
+
+def test_parse_row_rejects_bye_with_opponent():
+    """A bye must not name a second player, and errors carry the record number"""
+    with pytest.raises(ImportFormatError) as excinfo:
+        parse_row({'tournament': 'T', 'date': '2024-05-04', 'round': '1',
+                   'player1': 'A', 'player2': 'B', 'result': 'bye'}, 7)
+    assert excinfo.value.record == 7
+
+
+def test_readers_yield_same_records():
+    """CSV, JSON Lines and XML carry the same fields"""
+    csv_data = b'tournament,date,round,player1,player2,result\nT,2024-05-04,1,A,B,draw\n'
+    json_data = b'{"tournament": "T", "date": "2024-05-04", "round": 1, "player1": "A", "player2": "B", "result": "draw"}\n'
+    xml_data = b'<results><match tournament="T" date="2024-05-04" round="1"><player1>A</player1>' \
+               b'<player2>B</player2><result>draw</result></match></results>'
+    rows = [
+        parse_row(next(open_records(io.BytesIO(data), fmt)), 1)
+        for data, fmt in ((csv_data, 'csv'), (json_data, 'json'), (xml_data, 'xml'))
+    ]
+    assert rows[0] == rows[1] == rows[2]
+
+
+
+@pytest.mark.parametrize('data, fmt, message', [
+    (b'<results><match tournament="T"><player1>A</player1></match><match', 'xml', 'record 2: unreadable input'),
+    (b'tournament,date\nT,2024-05-04\n\xff\xfe\n', 'csv', 'not valid UTF-8'),
+])
+def test_unreadable_input_is_a_format_error(data, fmt, message):
+    """Malformed XML and bad UTF-8 surface as ImportFormatError, not a crash"""
+    with pytest.raises(ImportFormatError, match=message):
+        list(open_records(io.BytesIO(data), fmt))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,86 @@
+"""
+Test per-request SQL instrumentation - statement counts, the slowest cap and exports
+"""
+import csv
+import io
+import pytest
+from flask import render_template_string
+from sqlalchemy import text
+from app import create_app
+from app.instrumentation import request_log
+from app.models import db, User
+from config import TestingConfig
+
+
+@pytest.fixture
+def instrumented(monkeypatch):
+    """An instrumented app keeping three requests and two slow statements each, with a probe route"""
+    monkeypatch.setattr(TestingConfig, 'SQL_INSTRUMENTATION', True)
+    monkeypatch.setattr(TestingConfig, 'SQL_INSTRUMENTATION_BUFFER', 3)
+    monkeypatch.setattr(TestingConfig, 'SQL_INSTRUMENTATION_SLOWEST', 2)
+    request_log.clear()
+    app = create_app('testing')
+
+    @app.route('/_probe/<int:statements>')
+    def probe(statements):
+        for i in range(statements):
+            db.session.execute(text(f'SELECT {i}'))
+        return render_template_string('{{ n }} statements', n=statements)
+
+    with app.app_context():
+        yield app
+        db.session.remove()
+    request_log.clear()
+
+
+def test_request_profile(instrumented):
+    """Every statement is counted, but only the slowest few are kept, slowest first"""
+    client = instrumented.test_client()
+    assert client.get('/_probe/5').status_code == 200
+
+    record, = request_log.records()
+    assert (record['endpoint'], record['method'], record['path'], record['status']) == \
+        ('probe', 'GET', '/_probe/5', 200)
+    assert record['sql_count'] == 5
+    assert len(record['slowest']) == 2
+    assert record['slowest'][0]['ms'] >= record['slowest'][1]['ms']
+    assert all(entry['statement'].startswith('SELECT ') for entry in record['slowest'])
+    assert record['sql_ms'] >= sum(entry['ms'] for entry in record['slowest'])
+    assert record['render_ms'] > 0
+
+
+def test_ring_buffer_keeps_the_latest_requests(instrumented):
+    """Older profiles drop out once SQL_INSTRUMENTATION_BUFFER requests are kept"""
+    client = instrumented.test_client()
+    for statements in range(5):
+        client.get(f'/_probe/{statements}')
+    assert [record['sql_count'] for record in request_log.records()] == [2, 3, 4]
+
+
+def test_exports(instrumented):
+    """Admins download the profiles as CSV rows or as JSON with per-endpoint summaries"""
+    admin = User(email='root@example.com', username='root', role='admin')
+    db.session.add(admin)
+    db.session.commit()
+    client = instrumented.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+    client.get('/_probe/1')
+    client.get('/_probe/3')
+
+    records = request_log.records()
+    assert [record['path'] for record in records] == ['/_probe/1', '/_probe/3']
+
+    rows = list(csv.DictReader(io.StringIO(
+        client.get('/admin/instrumentation/export?format=csv').get_data(as_text=True))))
+    assert [(row['path'], int(row['sql_count']), row['slowest_statement']) for row in rows] == [
+        (record['path'], record['sql_count'], record['slowest'][0]['statement']) for record in records
+    ]
+
+    summary = {row['endpoint']: row for row in client.get('/admin/instrumentation/export').get_json()['endpoints']}
+    assert summary['probe']['requests'] == 2
+    assert summary['probe']['max_queries'] == max(record['sql_count'] for record in records)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,87 @@
+"""
+Test the job queue - leases, lost leases and idempotent rating
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from app.jobs import claim_next, enqueue, run_job, task, PRIORITY_URGENT
+from app.models import db, Job, Player, Tournament, TournamentPlayer, Match, User
+from app.tournament.tasks import rate_tournament
+
+
+@task('test.record')
+def record(value):
+    db.session.add(Player(name=value))
+
+
+def test_running_job_is_requeued_only_after_its_lease_expires(app):
+    """A long job keeps its claim while the lease is current"""
+    job = enqueue('test.record', {'value': 'a'})
+    db.session.commit()
+    assert claim_next('w1') == job.id
+
+    # Well past the old fixed timeout, but the lease is still current
+    db.session.query(Job).update({'started_at': datetime.utcnow() - timedelta(hours=1)})
+    db.session.commit()
+    assert claim_next('w2') is None
+
+    db.session.query(Job).update({'locked_until': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    assert claim_next('w2') == job.id
+    assert db.session.get(Job, job.id).locked_by == 'w2'
+
+
+def test_urgent_jobs_are_claimed_first(app):
+    """Priority beats queue order, and the urgent lane claims only urgent jobs"""
+    replay = enqueue('test.record', {'value': 'replay'})
+    pairing = enqueue('test.record', {'value': 'pairing'}, priority=PRIORITY_URGENT)
+    db.session.commit()
+
+    assert claim_next('w1') == pairing.id
+    assert claim_next('urgent', PRIORITY_URGENT) is None
+    assert claim_next('w2') == replay.id
+
+
+def test_lost_lease_discards_the_task_changes(app):
+    """A worker that lost its job to another does not commit the task"""
+    job = enqueue('test.record', {'value': 'lost'})
+    db.session.commit()
+    claim_next('w1')
+    db.session.query(Job).update({'locked_by': 'w2'})
+    db.session.commit()
+
+    run_job(job.id, 'w1')
+    assert db.session.query(Player).filter_by(name='lost').count() == 0
+    assert db.session.get(Job, job.id).status == 'running'
+
+    db.session.query(Job).update({'locked_by': 'w1'})
+    db.session.commit()
+    run_job(job.id, 'w1')
+    assert db.session.query(Player).filter_by(name='lost').count() == 1
+    job = db.session.get(Job, job.id)
+    assert job.status == 'succeeded' and job.locked_until is None
+
+
+def test_rate_tournament_applies_ratings_once(app):
+    """A second run of the rating task leaves ratings untouched"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    tournament = Tournament(name='Cup', date=date(2025, 5, 1), organizer=organizer, status='completed',
+                            current_round=1)
+    p1 = TournamentPlayer(tournament=tournament, player=Player(name='Alice'))
+    p2 = TournamentPlayer(tournament=tournament, player=Player(name='Bob'))
+    db.session.add_all([tournament, Match(tournament=tournament, round_number=1, player1=p1, player2=p2,
+                                          result='player1')])
+    db.session.commit()
+
+    rate_tournament(tournament.id)
+    db.session.commit()
+    elo = p1.player.elo
+    assert elo > 1500
+
+    rate_tournament(tournament.id)
+    db.session.commit()
+    assert p1.player.elo == elo
+    assert len(p1.player.elo_history) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
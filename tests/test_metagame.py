@@ -0,0 +1,148 @@
+"""
+Test metagame rows - share, top-cut conversion and archetype roll-up
+"""
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from sqlalchemy import select
+from app.analytics import metagame
+from app.analytics.metagame import rates, record_tournament, refresh_season, tournament_rows
+from app.models import db, Deck, MetagameSeason, Player, Season, Tournament, TournamentPlayer, User
+
+
+def make_entry(pid, deck_id, points, wins=0, losses=0, dropped=False):
+    return SimpleNamespace(id=pid, deck_id=deck_id, points=points, wins=wins, losses=losses, ties=0,
+                           game_wins=0, game_losses=0, is_tardy=False, dropped=dropped)
+
+
+def make_decks():
+    """An archetype with a variant tagged differently, and a second archetype"""
+    lugia = Deck(name='Lugia', natures='Meta Deck')
+    variant = Deck(name='Lugia Archeops', parent=lugia, natures='Box Deck')
+    snorlax = Deck(name='Snorlax', natures='Box Deck')
+    db.session.add_all([lugia, variant, snorlax])
+    return lugia, variant, snorlax
+
+
+def record(season, day, decks, organizer):
+    """Rate-time metagame rows for a completed tournament with one entry per deck (wins, losses)"""
+    tournament = Tournament(name=f'Cup {day}', date=date(2025, 3, day), season=season, organizer=organizer,
+                            status='completed', current_round=2)
+    for i, (deck, wins, losses) in enumerate(decks):
+        db.session.add(TournamentPlayer(tournament=tournament, player=Player(name=f'P{day}-{i}'), deck=deck,
+                                        points=3 * wins, wins=wins, losses=losses))
+    db.session.add(tournament)
+    db.session.flush()
+    db.session.refresh(tournament)
+    record_tournament(db.session, tournament)
+    db.session.commit()
+    return tournament
+
+
+@pytest.fixture
+def field(app):
+    lugia, variant, snorlax = make_decks()
+    season = Season(name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    first = record(season, 1, [(lugia, 2, 0), (variant, 1, 1), (snorlax, 0, 2)], organizer)
+    second = record(season, 8, [(lugia, 1, 1), (snorlax, 1, 1)], organizer)
+    return SimpleNamespace(lugia=lugia, variant=variant, snorlax=snorlax, season=season, organizer=organizer,
+                           tournaments=[first, second])
+
+
+def trend(client, **params):
+    return client.get('/analytics/api/metagame/trend', query_string=params).get_json()['series']
+
+
+def test_rates_without_games():
+    """Empty counts give zero rates instead of dividing by zero"""
+    assert rates(0, 0, 0, 0, 0, 0) == {'share': 0.0, 'conversion': 0.0, 'win_rate': 0.0}
+
+
+def test_tournament_rows(monkeypatch):
+    """Undecked players are left out of the field; variants roll up to their archetype"""
+    monkeypatch.setattr(metagame, 'TOP_CUT_SIZE', 2)
+    tournament = SimpleNamespace(id=5, season_id=1, date=date(2025, 3, 1), mode='normal', current_round=2, matches=[],
+                                 participants=[
+                                     make_entry(1, 10, 6, wins=2),
+                                     make_entry(2, 11, 3, wins=1, losses=1),
+                                     make_entry(3, 10, 0, losses=2),
+                                     make_entry(4, None, 9, wins=3),
+                                 ])
+    rows = {row['deck_id']: row for row in tournament_rows(tournament, {10: 10, 11: 10})}
+    assert rows[10]['entries'] == 2
+    assert rows[10]['players'] == 3
+    assert rows[10]['share'] == pytest.approx(2 / 3)
+    # Player 4 has no deck but still takes a top-cut seat
+    assert rows[10]['top_cut'] == 1
+    assert rows[10]['conversion'] == 0.5
+    assert rows[10]['win_rate'] == 0.5
+    assert rows[11]['archetype_id'] == 10
+    assert rows[11]['top_cut'] == 0
+
+
+def test_refresh_season(field):
+    """Season rows sum their tournaments; players counts every entry of the season"""
+    rows = {row.deck_id: row for row in db.session.execute(select(MetagameSeason)).scalars()}
+    lugia = rows[field.lugia.id]
+    assert (lugia.tournaments, lugia.entries, lugia.players) == (2, 2, 5)
+    assert (lugia.wins, lugia.losses) == (3, 1)
+    assert lugia.share == pytest.approx(2 / 5)
+    assert rows[field.variant.id].archetype_id == field.lugia.id
+
+    # Rerunning replaces the season's rows instead of adding to them
+    refresh_season(db.session.connection(), field.season.id)
+    db.session.commit()
+    assert db.session.query(MetagameSeason).count() == 3
+
+
+def test_trend_by_deck_and_archetype(field, client):
+    """Archetype series combine their variants, per tournament or per season"""
+    series = {row['name']: row for row in trend(client)}
+    assert [point['entries'] for point in series['Lugia']['points']] == [1, 1]
+    assert series['Lugia']['points'][0]['share'] == pytest.approx(1 / 3)
+
+    series = {row['name']: row for row in trend(client, group='archetype')}
+    assert set(series) == {'Lugia', 'Snorlax'}
+    assert [point['entries'] for point in series['Lugia']['points']] == [2, 1]
+    assert series['Lugia']['points'][0]['win_rate'] == pytest.approx(3 / 4)
+
+    season = {row['name']: row for row in trend(client, group='archetype', period='season')}
+    assert season['Lugia']['points'] == [{
+        'season_id': field.season.id, 'date': '2025-01-01', 'entries': 3,
+        **rates(3, 5, 3, 4, 2, 0),
+    }]
+
+    assert [len(row['points']) for row in trend(client, start='2025-03-02')] == [1, 1]
+    assert client.get('/analytics/api/metagame/trend?group=player').status_code == 400
+
+
+def test_trend_nature_filter_uses_the_group_key(field, client):
+    """Grouped by archetype, only the archetype deck's own tags count"""
+    assert {row['name'] for row in trend(client, nature='Box Deck')} == {'Lugia Archeops', 'Snorlax'}
+    assert {row['name'] for row in trend(client, group='archetype', nature='Box Deck')} == {'Snorlax'}
+    assert {row['name'] for row in trend(client, group='archetype', nature='Meta Deck')} == {'Lugia'}
+
+
+def test_trend_cache_follows_metagame_rewrites(field, client):
+    """A newly rated tournament shows up in a trend that was already cached"""
+    assert len(trend(client, group='archetype')[0]['points']) == 2
+    record(field.season, 15, [(field.lugia, 1, 0)], field.organizer)
+    assert len(trend(client, group='archetype')[0]['points']) == 3
+
+    field.snorlax.natures = 'Meta Deck'
+    db.session.commit()
+    assert {row['name'] for row in trend(client, group='archetype', nature='Meta Deck')} == {'Lugia', 'Snorlax'}
+
+
+def test_season_breakdown(field, client):
+    """One season's decks, most played first; unknown seasons are 404"""
+    response = client.get(f'/analytics/api/metagame/seasons/{field.season.id}').get_json()
+    assert response['name'] == '2025'
+    assert [deck['name'] for deck in response['decks']] == ['Lugia', 'Snorlax', 'Lugia Archeops']
+    assert response['decks'][2]['archetype_id'] == field.lugia.id
+    assert client.get('/analytics/api/metagame/seasons/999').status_code == 404
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,47 @@
+"""
+Test schema migrations - a full upgrade of an empty database
+"""
+import pytest
+from sqlalchemy import inspect
+from app import create_app
+from app import migrations
+from app.cache import RATINGS
+from app.models import db, CacheGeneration, Player
+from config import TestingConfig
+
+
+@pytest.fixture
+def empty_app(monkeypatch):
+    """An app on an empty in-memory database, as production boots without create_all()"""
+    monkeypatch.setattr(TestingConfig, 'SCHEMA_AUTO_CREATE', False)
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def test_upgrade_empty_database(empty_app):
+    """Every migration applies in order on a database without tables"""
+    assert inspect(db.engine).get_table_names() == []
+    applied = migrations.upgrade()
+
+    assert [step.version for step in applied] == [step.version for step in migrations.MIGRATIONS]
+    assert set(db.metadata.tables) <= set(inspect(db.engine).get_table_names())
+    assert all(step['applied'] for step in migrations.status())
+    assert migrations.upgrade() == []
+
+
+def test_upgrade_after_create_all(app):
+    """Tables and generation rows created before migrating (SCHEMA_AUTO_CREATE) are kept"""
+    db.session.add(Player(name='Alice'))
+    db.session.commit()
+    assert db.session.get(CacheGeneration, RATINGS).value == 1
+
+    assert len(migrations.upgrade()) == len(migrations.MIGRATIONS)
+    db.session.expire_all()
+    assert db.session.get(CacheGeneration, RATINGS).value == 1
+    assert db.session.query(CacheGeneration).count() == 3
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -2,7 +2,11 @@
 Test Swiss Pairing Algorithm - Verify ported logic matches original
 """
 import pytest
+from datetime import date
+from app.jobs import JobWorker, PRIORITY_URGENT
+from app.models import db, Match, Player, Tournament, TournamentPlayer, User
 from app.tournament.pairing import PairingEngine
+from app.tournament.pairing_service import PlayerRef, SnapshotMatch, SnapshotPlayer, TournamentSnapshot, solve
 
 
 def test_rematch_prevention():
@@ -30,5 +34,66 @@ def test_omw_calculation():
     pass
 
 
+def make_snapshot(match_results, points, round_played):
+    """Snapshot with four players, the given points and completed matches"""
+    players = [SnapshotPlayer(i, PlayerRef(f'P{i}'), points[i], points[i] // 3, round_played - points[i] // 3)
+               for i in range(len(points))]
+    matches = [SnapshotMatch(p1, p2, result) for p1, p2, result in match_results]
+    return TournamentSnapshot(1, round_played, players, matches)
+
+
+def test_snapshot_engine_avoids_rematches():
+    """Snapshot pairing never repeats a finished pairing when an alternative exists"""
+    snapshot = make_snapshot([(0, 1, 'player1'), (2, 3, 'player1')], [3, 0, 3, 0], 1)
+    pairings, bye = solve(snapshot, 2)
+    played = {frozenset((0, 1)), frozenset((2, 3))}
+    assert bye is None
+    assert len(pairings) == 2
+    assert not any(frozenset(pair) in played for pair in pairings)
+
+
+def test_snapshot_engine_gives_bye_to_player_without_one():
+    """With an odd field the bye goes to a player who has not had one"""
+    snapshot = make_snapshot([(0, 1, 'player1'), (2, None, 'bye')], [3, 0, 3], 1)
+    pairings, bye = solve(snapshot, 2)
+    assert bye == 1
+    assert pairings == [(0, 2)] or pairings == [(2, 0)]
+
+
+
+def test_solve_falls_back_when_out_of_time():
+    """An exhausted search budget still pairs everyone, allowing rematches"""
+    snapshot = make_snapshot([(0, 1, 'player1'), (2, 3, 'player1')], [3, 0, 3, 0], 1)
+    pairings, bye = solve(snapshot, 2, timeout=1e-9)
+    assert bye is None
+    assert sorted(pid for pair in pairings for pid in pair) == [0, 1, 2, 3]
+
+
+def test_pairing_ticket_is_a_job_published_once(app, client):
+    """Any process can poll the ticket; a second publish does not create the round again"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    tournament = Tournament(name='Cup', date=date(2025, 5, 1), organizer=organizer, current_round=0)
+    db.session.add_all([tournament] + [TournamentPlayer(tournament=tournament, player=Player(name=f'P{i}'))
+                                       for i in range(5)])
+    db.session.commit()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(organizer.id)
+
+    ticket = client.post(f'/tournament/{tournament.id}/pair').get_json()['ticket']
+    assert client.post(f'/tournament/{tournament.id}/pair').get_json()['ticket'] == ticket
+    assert client.get(f'/tournament/pairings/{ticket}').get_json()['status'] == 'pending'
+
+    # Pairings run in the urgent lane
+    assert JobWorker(app, min_priority=PRIORITY_URGENT).run_pending() == 1
+    result = client.get(f'/tournament/pairings/{ticket}').get_json()
+    assert result['status'] == 'done'
+    assert len(result['pairings']) == 2 and result['bye']['player'].startswith('P')
+
+    assert client.post(f'/tournament/pairings/{ticket}/publish').status_code == 201
+    assert client.post(f'/tournament/pairings/{ticket}/publish').status_code == 409
+    assert db.session.query(Match).count() == 3
+    assert db.session.get(Tournament, tournament.id).current_round == 1
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,49 @@
+"""
+Test player name search - normalization and ranking
+"""
+import pytest
+from app.analytics.player_search import PlayerNameIndex, normalize_name
+
+
+@pytest.fixture
+def index():
+    return PlayerNameIndex([
+        (1, '陳大文'),
+        (2, '陳小明'),
+        (3, 'Alice Wang'),
+        (4, 'Alicia'),
+        (5, '林志玲'),
+    ])
+
+
+def test_normalize_name():
+    """Full-width forms, case and spacing should normalize away"""
+    assert normalize_name('ＡＬＩＣＥ  Wang') == 'alicewang'
+    assert normalize_name('陳 大文') == '陳大文'
+    assert normalize_name('') == ''
+
+
+def test_single_cjk_character(index):
+    """A surname alone should find every player with it"""
+    ids = [r['id'] for r in index.search('陳')]
+    assert sorted(ids) == [1, 2]
+
+
+def test_prefix_ranks_first(index):
+    """Prefix matches should outrank fuzzy matches"""
+    results = index.search('alic')
+    assert [r['id'] for r in results][:2] == [4, 3]
+
+
+def test_fuzzy_match(index):
+    """Small typos should still find the player"""
+    assert index.search('alice wnag')[0]['id'] == 3
+    assert index.search('大文')[0]['id'] == 1
+
+
+def test_limit(index):
+    assert len(index.search('陳', limit=1)) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,74 @@
+"""
+Test round predictions - win probabilities and rating swings
+"""
+import pytest
+from datetime import date
+from app.analytics import predictions
+from app.analytics.predictions import predict_round, round_predictions, round_rows
+from app.models import db, Deck, Match, Player, Tournament, TournamentPlayer, User
+
+
+def test_predict_round(monkeypatch):
+    """Deck gaps shift the win probability; swings follow player ratings and K-factors"""
+    monkeypatch.setattr(predictions, 'round_rows', lambda *args: [
+        # match, then (tournament player, player, name, elo, games, deck, deck elo) per side
+        (7, 1, 11, 'Alice', 1600.0, 40, 'Deck A', 1550.0, 2, 12, 'Bob', 1400.0, 5, 'Deck B', 1450.0),
+        (8, 3, 13, 'Carol', 1500.0, 20, None, None, 4, 14, 'Dave', 1500.0, 20, 'Deck B', 1450.0),
+    ])
+    first, second = predict_round(None, 1, 1)
+
+    assert first['table'] == 1
+    assert first['player1']['win_probability'] == pytest.approx(1 / (1 + 10 ** (-300 / 400)), abs=1e-4)
+    assert first['player1']['win_probability'] + first['player2']['win_probability'] == pytest.approx(1)
+    assert first['deck_expected'] == pytest.approx(0.6401, abs=1e-4)
+    # Veteran K=16 for Alice, new-player K=40 for Bob
+    assert first['player1']['swing']['win'] == pytest.approx(16 * (1 - 0.7597), abs=0.01)
+    assert first['player2']['swing']['win'] == pytest.approx(40 * 0.7597, abs=0.01)
+
+    # Only one side registered a deck: players alone decide
+    assert second['deck_expected'] is None
+    assert second['player1']['win_probability'] == 0.5
+    assert second['player1']['swing'] == {'win': 12.0, 'draw': 0.0, 'loss': -12.0}
+
+
+def test_unrated_player_counts_as_zero(monkeypatch):
+    """A NULL rating falls back to 0 on the side as well as in the math"""
+    monkeypatch.setattr(predictions, 'round_rows', lambda *args: [
+        (7, 1, 11, 'Alice', None, None, None, None, 2, 12, 'Bob', 0.0, 0, None, None),
+    ])
+    table, = predict_round(None, 1, 1)
+    assert table['player1']['elo'] == 0.0
+    assert table['player1']['win_probability'] == 0.5
+
+
+def test_round_rows(app):
+    """Both sides with their decks, in table order; byes and other rounds are left out"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    tournament = Tournament(name='Cup', date=date(2025, 5, 1), organizer=organizer, current_round=2)
+    deck = Deck(name='Deck A', elo=1550.0)
+    alice, bob, carol, dave, erin = (
+        TournamentPlayer(tournament=tournament, player=Player(name=name, elo=elo, games_played=30), deck=deck_)
+        for name, elo, deck_ in [('Alice', 1600.0, deck), ('Bob', 1400.0, None), ('Carol', 1500.0, deck),
+                                 ('Dave', 1450.0, None), ('Erin', 1500.0, None)]
+    )
+    matches = []
+    for round_number, player1, player2 in [(1, alice, bob), (2, carol, dave), (2, alice, bob), (2, erin, None)]:
+        matches.append(Match(tournament=tournament, round_number=round_number, player1=player1, player2=player2))
+        db.session.add(matches[-1])
+        db.session.flush()  # table order is match id order
+    db.session.commit()
+
+    rows = round_rows(db.session, tournament.id, 2)
+    assert [(row[3], row[10]) for row in rows] == [('Carol', 'Dave'), ('Alice', 'Bob')]
+    assert rows[0][1:8] == (carol.id, carol.player_id, 'Carol', 1500.0, 30, 'Deck A', 1550.0)
+    assert rows[0][8:15] == (dave.id, dave.player_id, 'Dave', 1450.0, 30, None, None)
+
+    # Re-pairing after the first view is reflected in the cached predictions
+    assert [table['player2']['name'] for table in round_predictions(tournament.id, 2)] == ['Dave', 'Bob']
+    db.session.delete(matches[1])
+    db.session.commit()
+    assert [table['player2']['name'] for table in round_predictions(tournament.id, 2)] == ['Bob']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,48 @@
+"""
+Test as-of leaderboards - rating checkpoints and tournaments under way
+"""
+import pytest
+from datetime import date, datetime
+from app.analytics.history_compaction import compact_history
+from app.analytics.rating_as_of import leaderboard_as_of, rating_as_of, record_checkpoints
+from app.models import db, ELOHistory, Player, Tournament, User
+
+
+def board(at):
+    return [(row['name'], row['elo']) for row in leaderboard_as_of(db.session, at)]
+
+
+def test_leaderboard_as_of_matches_single_player_lookups(app):
+    """Checkpoints, mid-tournament moments and compacted tournaments agree with rating_as_of"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    alice, bob = Player(name='Alice'), Player(name='Bob')
+    first, second = (Tournament(name=name, date=date(2024, 1, day), organizer=organizer, status='completed')
+                     for name, day in (('First', 1), ('Second', 8)))
+    db.session.add_all([alice, bob, first, second])
+    db.session.flush()
+    for tournament, hour, alice_after, bob_after in ((first, 10, 1516, 1484), (first, 11, 1500, 1500),
+                                                     (second, 10, 1484, 1516), (second, 11, 1470, 1530)):
+        at = datetime.combine(tournament.date, datetime.min.time()).replace(hour=hour)
+        for player, elo_after in ((alice, alice_after), (bob, bob_after)):
+            db.session.add(ELOHistory(player_id=player.id, tournament_id=tournament.id, timestamp=at,
+                                      elo_before=0, elo_after=elo_after, elo_change=0))
+    db.session.flush()
+    record_checkpoints(db.session.connection())
+    db.session.commit()
+
+    moments = [datetime(2023, 12, 31), datetime(2024, 1, 1, 10, 30), datetime(2024, 1, 5),
+               datetime(2024, 1, 8, 10), datetime(2024, 1, 9)]
+    expected = [[], [('Alice', 1516), ('Bob', 1484)], [('Alice', 1500), ('Bob', 1500)],
+                [('Bob', 1516), ('Alice', 1484)], [('Bob', 1530), ('Alice', 1470)]]
+    assert [board(at) for at in moments] == expected
+    assert rating_as_of(db.session, alice.id, moments[1]) == 1516
+
+    # Compacted tournaments count at their last match, as in rating_as_of
+    compact_history(db.session.connection(), datetime(2024, 1, 5))
+    db.session.commit()
+    assert board(moments[1]) == []
+    assert [board(at) for at in moments[2:]] == expected[2:]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,44 @@
+"""
+Test the packed rating series and its byte-bounded LRU cache
+"""
+import pytest
+from datetime import datetime, timedelta
+from app.analytics.rating_series import RatingSeries, RatingSeriesCache
+
+
+def make_series(*results):
+    """Series from (elo_before, opponent_elo, score) tuples, one day apart"""
+    series = RatingSeries()
+    start = datetime(2024, 1, 1)
+    for i, (before, opponent, score) in enumerate(results, start=1):
+        series.append(i, start + timedelta(days=i), before, before + (score - 0.5) * 20, opponent, score)
+    return series
+
+
+def test_series_stats():
+    """Clutch counts only higher-rated opponents; streaks run back from the latest match"""
+    series = make_series((1500, 1600, 1.0), (1510, 1400, 0.0), (1500, 1550, 0.5), (1500, 1450, 1.0), (1510, 1500, 1.0))
+    assert series.clutch() == pytest.approx(0.75)
+    assert series.current_streak() == 2
+    assert make_series((1500, 1400, 0.0)).clutch() is None
+
+
+def test_cache_appends_in_order_and_evicts_by_size():
+    """Appends extend cached series; out-of-order rows drop it; old entries go past the byte cap"""
+    series = make_series((1500, 1500, 1.0))
+    cache = RatingSeriesCache(max_bytes=series.nbytes * 2)
+    cache.put(1, series)
+    cache.extend(1, [(2, datetime(2024, 2, 1), 1510, 1520, 1500, 1.0)])
+    assert len(cache.get(1)) == 2
+
+    cache.extend(1, [(3, datetime(2023, 1, 1), 1520, 1510, 1500, 0.0)])
+    assert cache.get(1) is None
+
+    for player_id in range(2, 6):
+        cache.put(player_id, make_series((1500, 1500, 1.0)))
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.get(5) is not None and cache.get(2) is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
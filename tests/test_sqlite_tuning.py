@@ -0,0 +1,70 @@
+"""
+Test SQLite tuning - connection PRAGMAs and the read-only analytics engine
+"""
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from app.models import db, Player
+from app.sqlite_tuning import read_session
+from config import SQLiteProductionConfig
+
+
+@pytest.fixture
+def sqlite_app(tmp_path, monkeypatch):
+    """The SQLite production config on a temporary database file"""
+    monkeypatch.setattr(SQLiteProductionConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'ptcg.db'}")
+    monkeypatch.setattr(SQLiteProductionConfig, 'SCHEMA_AUTO_CREATE', True)
+    monkeypatch.setattr(SQLiteProductionConfig, 'JINJA_BYTECODE_CACHE', False)
+    app = create_app('production-sqlite')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+        app.extensions['sqlite_read_engine'].dispose()
+
+
+def pragma(session, name):
+    return session.execute(text(f'PRAGMA {name}')).scalar()
+
+
+def test_pragmas_applied_to_every_connection(sqlite_app):
+    """The writer runs in WAL mode with a busy timeout; the reader shares the timeouts"""
+    assert pragma(db.session, 'journal_mode') == 'wal'
+    assert pragma(db.session, 'busy_timeout') == 5000
+    assert pragma(db.session, 'synchronous') == 1  # NORMAL
+    assert pragma(db.session, 'query_only') == 0
+
+    reader = read_session()
+    assert reader is not db.session
+    assert pragma(reader, 'busy_timeout') == 5000
+    assert pragma(reader, 'query_only') == 1
+
+
+def test_read_only_engine_rejects_writes(sqlite_app):
+    """Analytics reads see committed writes but cannot write themselves"""
+    db.session.add(Player(name='Alice'))
+    db.session.commit()
+    reader = read_session()
+    assert reader.scalars(select(Player.name)).all() == ['Alice']
+
+    reader.add(Player(name='Mallory'))
+    with pytest.raises(OperationalError, match='readonly'):
+        reader.flush()
+    reader.rollback()
+    assert db.session.scalars(select(Player.name)).all() == ['Alice']
+
+
+def test_in_memory_database_has_no_read_engine(monkeypatch):
+    """An in-memory database cannot be shared by a second pool, so reads use db.session"""
+    monkeypatch.setattr(SQLiteProductionConfig, 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+    monkeypatch.setattr(SQLiteProductionConfig, 'SQLALCHEMY_ENGINE_OPTIONS', {})
+    monkeypatch.setattr(SQLiteProductionConfig, 'JINJA_BYTECODE_CACHE', False)
+    app = create_app('production-sqlite')
+    with app.app_context():
+        assert 'sqlite_read_engine' not in app.extensions
+        assert read_session() is db.session
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,106 @@
+"""
+Test tournament standings - opponent index and tiebreakers
+"""
+import pytest
+from types import SimpleNamespace
+from app.tournament.standings import build_match_index, build_opponent_index, compute_standings, match_win_percent
+
+
+def make_player(pid, points=0, wins=0, losses=0, ties=0, dropped=False):
+    return SimpleNamespace(id=pid, points=points, wins=wins, losses=losses, ties=ties,
+                           game_wins=0, game_losses=0, is_tardy=False, dropped=dropped)
+
+
+def make_match(p1, p2, result, p1_games=0, p2_games=0):
+    return SimpleNamespace(player1_id=p1, player2_id=p2, result=result,
+                           p1_game_wins=p1_games, p2_game_wins=p2_games)
+
+
+def test_opponent_index_skips_byes_and_unreported():
+    """Byes and unfinished matches should not count as opponents"""
+    matches = [
+        make_match(1, 2, 'player1'),
+        make_match(3, None, 'bye'),
+        make_match(3, 4, None),
+    ]
+    index = build_opponent_index(matches)
+    assert index[1] == [2]
+    assert index[2] == [1]
+    assert 3 not in index
+
+
+def test_match_win_percent_floor():
+    """Win percentage should never drop below 25%"""
+    assert match_win_percent(make_player(1)) == 0.25
+    assert match_win_percent(make_player(1, wins=0, losses=3)) == 0.25
+    assert match_win_percent(make_player(1, wins=3, losses=1)) == 0.75
+
+
+def test_tiebreaker_ordering():
+    """Players tied on points should be separated by OMW"""
+    players = [
+        make_player(1, points=3, wins=1, losses=0),
+        make_player(2, points=0, wins=0, losses=1),
+        make_player(3, points=3, wins=1, losses=0),
+        make_player(4, points=0, wins=1, losses=1),
+    ]
+    matches = [make_match(1, 2, 'player1'), make_match(3, 4, 'player1')]
+    tournament = SimpleNamespace(mode='normal', current_round=1)
+
+    standings = compute_standings(tournament, players, matches)
+    assert [row['player'].id for row in standings][:2] == [3, 1]
+    assert standings[0]['omw'] == 0.5
+    assert standings[1]['omw'] == 0.25
+
+
+def test_dropped_players_listed_last():
+    """Dropped players are excluded by default and sorted last when included"""
+    players = [make_player(1, points=9, dropped=True), make_player(2, points=0)]
+    tournament = SimpleNamespace(mode='normal', current_round=0)
+
+    assert [row['player'].id for row in compute_standings(tournament, players, [])] == [2]
+    standings = compute_standings(tournament, players, [], include_dropped=True)
+    assert [row['player'].id for row in standings] == [2, 1]
+
+
+def test_bo3_game_win_tiebreakers():
+    """GWP comes from reported game scores and OGWP averages opponents' GWP"""
+    players = [
+        make_player(1, points=3, wins=1),
+        make_player(2, points=0, losses=1),
+        make_player(3, points=3, wins=1),
+        make_player(4, points=0, losses=1),
+    ]
+    matches = [
+        make_match(1, 2, 'player1', 2, 1),
+        make_match(3, 4, 'player1', 2, 0),
+        make_match(1, None, 'bye'),
+    ]
+    opponents, games = build_match_index(matches, count_games=True)
+    assert games[1] == [2, 3]
+    assert games[4] == [0, 2]
+
+    tournament = SimpleNamespace(mode='bo3', current_round=1)
+    standings = {row['player'].id: row for row in compute_standings(tournament, players, matches)}
+    assert standings[1]['gwp'] == pytest.approx(2 / 3)
+    assert standings[4]['gwp'] == 0.33
+    assert standings[1]['ogwp'] == pytest.approx(1 / 3)
+    assert standings[4]['ogwp'] == 1.0
+    # Equal OMW/OOWP, so the 2-0 win puts 3 ahead of 1 on GWP
+    assert [row['player'].id for row in compute_standings(tournament, players, matches)][:2] == [3, 1]
+
+
+def test_bo3_ogwp_skips_opponents_without_games():
+    """A result reported without game scores does not pull OGWP down to the floor"""
+    players = [make_player(1, points=6, wins=2), make_player(2, losses=1), make_player(3, losses=1)]
+    matches = [make_match(1, 2, 'player1', 2, 1), make_match(1, 3, 'player1')]
+    tournament = SimpleNamespace(mode='bo3', current_round=2)
+
+    standings = {row['player'].id: row for row in compute_standings(tournament, players, matches)}
+    assert standings[1]['ogwp'] == pytest.approx(1 / 3)
+    assert standings[1]['omw'] == 0.25
+    assert standings[3]['ogwp'] == pytest.approx(2 / 3)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
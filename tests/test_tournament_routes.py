@@ -0,0 +1,123 @@
+"""
+Test tournament routes - keyset pagination of the tournament list and the
+cached fragments of the tournament page
+"""
+import re
+import pytest
+from datetime import date
+from app.models import db, Tournament, TournamentPlayer, Match, Player, User
+from app.tournament import routes
+from app.tournament.routes import parse_cursor
+from app.tournament.standings import compute_standings
+
+
+@pytest.fixture
+def tournaments(app, monkeypatch):
+    """Five tournaments, three of them on the same day, listed two per page"""
+    monkeypatch.setattr(routes, 'TOURNAMENTS_PER_PAGE', 2)
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    days = [(1, 'completed'), (8, 'completed'), (8, 'live'), (8, 'completed'), (15, 'upcoming')]
+    db.session.add_all(Tournament(name=f'Cup-{i}', date=date(2025, 3, day), organizer=organizer, status=status)
+                       for i, (day, status) in enumerate(days, start=1))
+    db.session.commit()
+
+
+def list_pages(client, **params):
+    """Tournament names on every page, following the next links"""
+    pages = []
+    while True:
+        html = client.get('/tournament/list', query_string=params).get_data(as_text=True)
+        pages.append(re.findall(r'Cup-\d+', html))
+        cursor = re.search(r'cursor=([\w-]+)', html)
+        if cursor is None:
+            return pages
+        params = {**params, 'cursor': cursor.group(1)}
+
+
+def test_pages_continue_across_equal_dates(tournaments, client):
+    """Tournaments sharing a date are split by id, none repeated or skipped; the last page has no next link"""
+    assert list_pages(client) == [['Cup-5', 'Cup-4'], ['Cup-3', 'Cup-2'], ['Cup-1']]
+    assert list_pages(client, status='completed') == [['Cup-4', 'Cup-2'], ['Cup-1']]
+
+
+def test_exact_last_page(tournaments, client, monkeypatch):
+    """A final page that is exactly full offers no empty next page"""
+    monkeypatch.setattr(routes, 'TOURNAMENTS_PER_PAGE', 5)
+    assert list_pages(client) == [['Cup-5', 'Cup-4', 'Cup-3', 'Cup-2', 'Cup-1']]
+
+
+@pytest.mark.parametrize('cursor', ['garbage', '2025-03-08', '2025-13-08_3', '2025-03-08_x', '2025-03-08_3_1'])
+def test_malformed_cursor_starts_over(tournaments, client, cursor):
+    """Unparseable cursors fall back to the first page instead of failing"""
+    assert parse_cursor(cursor) is None
+    response = client.get('/tournament/list', query_string={'cursor': cursor})
+    assert response.status_code == 200
+    assert re.findall(r'Cup-\d+', response.get_data(as_text=True)) == ['Cup-5', 'Cup-4']
+
+
+def test_parse_cursor():
+    """Cursors are 'YYYY-MM-DD_id' of the last tournament shown"""
+    assert parse_cursor('2025-03-08_3') == (date(2025, 3, 8), 3)
+    assert parse_cursor(None) is None
+
+
+@pytest.fixture
+def standings_calls(monkeypatch):
+    """Count compute_standings calls made by the tournament page"""
+    calls = []
+
+    def counting(tournament, **kwargs):
+        calls.append(tournament.id)
+        return compute_standings(tournament, **kwargs)
+
+    monkeypatch.setattr(routes, 'compute_standings', counting)
+    return calls
+
+
+@pytest.fixture
+def two_cups(app):
+    """Two live tournaments with two players each, one round played"""
+    organizer = User(email='org@example.com', username='org', role='organizer')
+    cups = []
+    for name in ('Cup-A', 'Cup-B'):
+        cup = Tournament(name=name, date=date(2025, 3, 1), organizer=organizer, status='live', current_round=1)
+        ash, gary = (TournamentPlayer(tournament=cup, player=Player(name=f'{name}-{who}')) for who in ('Ash', 'Gary'))
+        db.session.add(Match(tournament=cup, round_number=1, player1=ash, player2=gary))
+        cups.append(cup)
+    db.session.commit()
+    return [cup.id for cup in cups]
+
+
+def test_cached_page_skips_standings(two_cups, client, standings_calls):
+    """A fragment cache hit serves the page without computing standings again"""
+    first = client.get(f'/tournament/{two_cups[0]}').get_data(as_text=True)
+    assert standings_calls == [two_cups[0]]
+    assert client.get(f'/tournament/{two_cups[0]}').get_data(as_text=True) == first
+    assert standings_calls == [two_cups[0]]
+
+
+def test_result_invalidates_only_its_tournament(two_cups, client, standings_calls):
+    """Reporting a result re-renders that tournament's page and leaves the others cached"""
+    cup_a, cup_b = two_cups
+    client.get(f'/tournament/{cup_a}')
+    client.get(f'/tournament/{cup_b}')
+    standings_calls.clear()
+
+    versions = dict(db.session.query(Tournament.id, Tournament.cache_version))
+    match = Match.query.filter_by(tournament_id=cup_a).one()
+    match.result = 'p1_win'
+    match.player1.wins, match.player1.points = 1, 3
+    match.player2.losses = 1
+    db.session.commit()
+    assert dict(db.session.query(Tournament.id, Tournament.cache_version)) == {
+        cup_a: versions[cup_a] + 1, cup_b: versions[cup_b]}
+
+    client.get(f'/tournament/{cup_b}')
+    assert standings_calls == []
+    html = client.get(f'/tournament/{cup_a}').get_data(as_text=True)
+    assert standings_calls == [cup_a]
+    assert '1W - 0L - 0T' in html
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,66 @@
+"""
+Test the Flask-Login user cache - shared invalidation across processes
+"""
+import pytest
+from flask import g
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.cache import generation, USERS
+from app.models import db, CacheGeneration, User
+from app.user_cache import load_user
+
+
+@pytest.fixture
+def user(app):
+    user = User(email='alice@example.com', username='alice', role='player')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def next_request():
+    """A new request reads the generations and attaches users afresh"""
+    db.session.remove()
+    g.pop('cache_generations', None)
+
+
+def test_cached_user_skips_the_row(user):
+    """Until a user changes through the ORM, the cached copy is served"""
+    assert load_user(user).role == 'player'
+    db.session.execute(update(User).where(User.id == user).values(username='raw'))
+    db.session.commit()
+    next_request()
+    assert load_user(user).username == 'alice'
+
+
+def test_change_in_another_process_is_not_served_stale(user):
+    """A role change committed by another worker invalidates this process's copy on its next request"""
+    assert load_user(user).role == 'player'
+    with Session(db.engine) as other:
+        other.get(User, user).role = 'viewer'
+        other.commit()
+    # The bump travels through the database, not through this process's memory
+    assert db.session.get(CacheGeneration, USERS).value == 1
+    next_request()
+    assert load_user(user).role == 'viewer'
+
+
+def test_commit_invalidates_and_rollback_does_not(user):
+    """Only committed user changes bump the users generation"""
+    before = generation(USERS)
+    load_user(user).role = 'admin'
+    db.session.flush()
+    db.session.rollback()
+    next_request()
+    assert generation(USERS) == before
+    assert load_user(user).role == 'player'
+
+    load_user(user).role = 'organizer'
+    db.session.commit()
+    next_request()
+    assert generation(USERS) == before + 1
+    assert load_user(user).role == 'organizer'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,60 @@
+"""
+Background job worker
+Usage:
+    python worker.py [--threads N] [--urgent-threads N] [--processes N] [--once]
+
+Runs queued jobs (pairings, tournament rating updates, result imports)
+from the jobs table. Production runs at least one worker.py process and
+keeps JOB_WORKER_THREADS=0 for the web app (the production default).
+Each process also runs --urgent-threads that only claim urgent jobs, so
+round pairings start while a long import or replay holds the other threads.
+"""
+import argparse
+import multiprocessing
+import os
+from app import create_app
+from app.jobs import JobWorker, PRIORITY_URGENT
+
+
+def run(threads: int, urgent_threads: int, once: bool):
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    poll_interval = app.config.get('JOB_POLL_INTERVAL', 2)
+    worker = JobWorker(app, threads, poll_interval)
+    if once:
+        print(f"✓ Ran {worker.run_pending()} jobs")
+        return
+    workers = [worker]
+    if urgent_threads:
+        workers.append(JobWorker(app, urgent_threads, poll_interval, min_priority=PRIORITY_URGENT))
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PTCG Arena background job worker')
+    parser.add_argument('--threads', type=int, default=1, help='Worker threads per process')
+    parser.add_argument('--urgent-threads', type=int, default=1,
+                        help='Threads per process that only run urgent jobs (round pairings)')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes')
+    parser.add_argument('--once', action='store_true', help='Run due jobs and exit')
+    args = parser.parse_args()
+
+    if args.processes <= 1 or args.once:
+        run(args.threads, args.urgent_threads, args.once)
+    else:
+        processes = [multiprocessing.Process(target=run, args=(args.threads, args.urgent_threads, False))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
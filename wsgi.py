@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production servers
+gunicorn: gunicorn wsgi:application
+"""
+import os
+from app import create_app
+
+application = create_app(os.getenv('FLASK_ENV', 'production'))